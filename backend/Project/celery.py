@@ -11,4 +11,14 @@ app = Celery("Project")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks([
     'user.worker',
-])
\ No newline at end of file
+    'adds.worker',
+])
+
+from adds import config as adds_config  # noqa: E402
+
+app.conf.beat_schedule = {
+    'rebuild-ad-assignments': {
+        'task': 'adds.worker.tasks.rebuild_ad_assignments',
+        'schedule': adds_config.ADDS_ASSIGNMENTS_REBUILD_INTERVAL,
+    },
+}
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Non-blocking structured logging for the realtime hot paths.
+
+Records are filtered (sampling / rate limits) and put on a bounded queue in
+the calling thread; a background listener thread formats them as JSON lines
+and writes them out. A slow log pipe can therefore never block the event
+loop: when the queue is full, records are dropped and counted instead.
+"""
+
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# LogRecord attributes that are not user fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class EventLogger:
+    """
+    Thin wrapper that logs an event name plus keyword fields:
+
+        logger.info("connect", "Guest connected", room=room_id, user=name)
+    """
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+
+    def debug(self, event, message="", **fields):
+        self._log(logging.DEBUG, event, message, fields)
+
+    def info(self, event, message="", **fields):
+        self._log(logging.INFO, event, message, fields)
+
+    def warning(self, event, message="", **fields):
+        self._log(logging.WARNING, event, message, fields)
+
+    def error(self, event, message="", **fields):
+        self._log(logging.ERROR, event, message, fields)
+
+    def exception(self, event, message="", **fields):
+        self._log(logging.ERROR, event, message, fields, exc_info=True)
+
+    def _log(self, level, event, message, fields, exc_info=False):
+        if not self.logger.isEnabledFor(level):
+            return
+        self.logger.log(
+            level,
+            message or event,
+            exc_info=exc_info,
+            extra={'event': event, 'fields': fields},
+        )
+
+
+def get_logger(name):
+    return EventLogger(name)
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, msg and fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+
+        # Plain `logger.info(..., extra={...})` callers
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key not in ('event', 'fields') and key not in entry:
+                entry[key] = value
+
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class EventSampler(logging.Filter):
+    """
+    Per-event sampling and rate limits.
+
+    rules: {event: {"sample": 0..1, "rate": per_second, "burst": n}}
+    The "*" rule applies to events without their own rule. Suppressed
+    records are counted and reported on the next record of that event.
+    """
+
+    def __init__(self, rules=None):
+        super().__init__()
+        self.rules = rules or {}
+        self._buckets = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        event = getattr(record, 'event', None)
+        rule = self.rules.get(event) or self.rules.get('*')
+        if not rule:
+            return True
+
+        sample = rule.get('sample', 1.0)
+        if sample < 1.0 and random.random() >= sample:
+            return self._suppress(event)
+
+        rate = rule.get('rate')
+        if rate is not None and not self._take(event, rate, rule.get('burst', rate)):
+            return self._suppress(event)
+
+        suppressed = self._suppressed.pop(event, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _take(self, event, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(event, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            self._buckets[event] = (tokens - 1 if allowed else tokens, now)
+            return allowed
+
+    def _suppress(self, event):
+        with self._lock:
+            self._suppressed[event] = self._suppressed.get(event, 0) + 1
+        return False
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Only used at shutdown: wait for room instead of failing on a full queue
+        self.queue.put(self._sentinel)
+
+
+class BackgroundStreamHandler(QueueHandler):
+    """
+    Queue handler with its own writer thread.
+
+    `emit` only enqueues (never blocks); formatting and the actual write
+    happen in the listener thread. Use in LOGGING like a StreamHandler.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self.listener = _Listener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self._stop_listener)
+
+    def setFormatter(self, fmt):
+        # Formatting happens in the writer thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve args now (they may change after we return); everything
+        # else is left to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.dropped:
+            record.dropped_records, self.dropped = self.dropped, 0
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self._stop_listener()
+        super().close()
+
+    def _stop_listener(self):
+        # Flushes what is queued; safe to call more than once
+        if self.listener._thread is not None:
+            self.listener.stop()
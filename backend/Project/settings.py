@@ -100,21 +100,39 @@ TEMPLATES = [
 ASGI_APPLICATION = 'Project.asgi.application'
 
 
+# Local-first layer: same-process channels and group members are served in
+# memory, only remote members go through the transport.
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "BACKEND": "server.layers.hybrid.HybridChannelLayer",
+        "CONFIG": {
+            "transport": "server.layers.transports.LocalTransport",
+        },
     },
 }
 
+# Multi-process deployment:
 # CHANNEL_LAYERS = {
 #     "default": {
-#         "BACKEND": "channels_redis.core.RedisChannelLayer",
+#         "BACKEND": "server.layers.hybrid.HybridChannelLayer",
 #         "CONFIG": {
-#             "hosts": [env("REDIS_URL")],
+#             "transport": "server.layers.transports.RedisTransport",
+#             "transport_config": {"url": env("REDIS_URL")},
 #         },
 #     },
 # }
 
+# EcoMeets matchmaking / presence. The local backend only matches users
+# connected to the same process; use Redis when running several workers.
+ECOMEETS_BACKEND = {
+    "BACKEND": "ecomeets.backends.local.LocalMatchBackend",
+}
+
+# ECOMEETS_BACKEND = {
+#     "BACKEND": "ecomeets.backends.redis.RedisMatchBackend",
+#     "CONFIG": {"url": env("REDIS_URL")},
+# }
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -215,10 +233,57 @@ DB_PASS = env("DB_PASS", default="changeme")
 USE_REDIS_SOCKETIO = env.bool("USE_REDIS", default=False)
 REDIS_URL = env("REDIS_URL", default="redis://redis:6379/0")
 
+# Shared between processes when Redis is available (precomputed ad
+# assignments are published here); per-process memory otherwise
+if USE_REDIS_SOCKETIO:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+
+# Room history (per node)
+ROOM_HISTORY_NODE_MAX_MB = env.int("ROOM_HISTORY_NODE_MAX_MB", default=64)
+
 # Celery 
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="redis://localhost:6379/0")
 
+# Logging: realtime apps log structured events through a queue drained by a
+# background thread, so slow log shipping never blocks the event loop.
+LOG_LEVEL = env("LOG_LEVEL", default="INFO")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "event_sampler": {
+            "()": "Project.logging.EventSampler",
+            "rules": {
+                "*": {"rate": 200, "burst": 400},
+                "connect": {"rate": 50, "burst": 200},
+                "disconnect": {"rate": 50, "burst": 200},
+                "auth": {"rate": 50, "burst": 200},
+                "match": {"sample": 0.5, "rate": 50, "burst": 100},
+                "queued": {"sample": 0.1, "rate": 20, "burst": 50},
+                "receive_error": {"rate": 10, "burst": 20},
+                "send_failed": {"rate": 10, "burst": 20},
+            },
+        },
+    },
+    "formatters": {
+        "structured": {"()": "Project.logging.StructuredFormatter"},
+    },
+    "handlers": {
+        "background": {
+            "class": "Project.logging.BackgroundStreamHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": "structured",
+            "filters": ["event_sampler"],
+        },
+    },
+    "loggers": {
+        name: {"handlers": ["background"], "level": LOG_LEVEL, "propagate": False}
+        for name in ("server", "ecomeets", "adds")
+    },
+}
+
 STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
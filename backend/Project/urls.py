@@ -17,10 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path , include
 from server.relay.views import TransferMonitorView
+from server.views import RealtimeMetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('admin/transfers/monitor/', TransferMonitorView.as_view(), name='transfer_monitor'),
+    path('admin/realtime/metrics/', RealtimeMetricsView.as_view(), name='realtime_metrics'),
     path("api/user/", include("user.urls")),
     path("api/settings/", include("settings.urls")),
     path("api/adds/", include("adds.urls")),
@@ -1,4 +1,16 @@
 from django.contrib import admin
-from .models import AdConfig
+from .models import AdConfig, AdStat
 
-admin.site.register(AdConfig)
\ No newline at end of file
+
+@admin.register(AdConfig)
+class AdConfigAdmin(admin.ModelAdmin):
+    list_display = ('title', 'screen', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('title', 'screen')
+
+
+@admin.register(AdStat)
+class AdStatAdmin(admin.ModelAdmin):
+    list_display = ('minute', 'screen', 'creative', 'impressions', 'clicks')
+    list_filter = ('screen',)
+    date_hierarchy = 'minute'
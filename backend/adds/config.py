@@ -0,0 +1,64 @@
+import os
+
+from django.conf import settings
+
+# VAST resolution: every screen's tag is fetched concurrently on a shared,
+# bounded thread pool; screens not resolved within DEADLINE seconds get
+# their static fallback. TIMEOUT is the per-fetch (connect, read) timeout.
+ADDS_VAST_WORKERS = getattr(settings, 'ADDS_VAST_WORKERS', 8)
+ADDS_VAST_DEADLINE = getattr(settings, 'ADDS_VAST_DEADLINE', 2.0)
+ADDS_VAST_TIMEOUT = getattr(settings, 'ADDS_VAST_TIMEOUT', (2, 5))
+
+# Resolved creatives are cached per tag: fresh for CACHE_TTL seconds, then
+# served stale for up to STALE_TTL more while one background refresh
+# runs. Failed resolutions are remembered for NEGATIVE_TTL seconds.
+ADDS_VAST_CACHE_TTL = getattr(settings, 'ADDS_VAST_CACHE_TTL', 300)
+ADDS_VAST_STALE_TTL = getattr(settings, 'ADDS_VAST_STALE_TTL', 3600)
+ADDS_VAST_NEGATIVE_TTL = getattr(settings, 'ADDS_VAST_NEGATIVE_TTL', 30)
+ADDS_VAST_CACHE_SIZE = getattr(settings, 'ADDS_VAST_CACHE_SIZE', 1024)
+
+# Wrapper chains longer than this are abandoned (the IAB recommends 5)
+ADDS_VAST_MAX_WRAPPERS = getattr(settings, 'ADDS_VAST_MAX_WRAPPERS', 5)
+
+# MediaFile selection from client hints (viewport size, measured
+# downlink). Hints are rounded to these ladders so results can be cached
+# per (tag, hint bucket). Without hints, files up to DEFAULT_HEIGHT are
+# preferred. Ad video may use BANDWIDTH_SHARE of the measured downlink.
+ADDS_VIDEO_HEIGHTS = getattr(settings, 'ADDS_VIDEO_HEIGHTS', (360, 480, 720, 1080))
+ADDS_VIDEO_BITRATES = getattr(settings, 'ADDS_VIDEO_BITRATES', (500, 1000, 2000, 4000, 8000))
+ADDS_VIDEO_DEFAULT_HEIGHT = getattr(settings, 'ADDS_VIDEO_DEFAULT_HEIGHT', 720)
+ADDS_VIDEO_BANDWIDTH_SHARE = getattr(settings, 'ADDS_VIDEO_BANDWIDTH_SHARE', 0.5)
+
+# Optional local copy of resolved creatives. When enabled, every absolute
+# videoUrl is downloaded in the background into CREATIVE_CACHE_DIR and
+# assignments point at the local copy once it is complete. Least recently
+# served files are evicted above CREATIVE_CACHE_SIZE bytes; files larger
+# than CREATIVE_MAX_FILE are never cached.
+ADDS_CREATIVE_CACHE_ENABLED = getattr(settings, 'ADDS_CREATIVE_CACHE_ENABLED', False)
+ADDS_CREATIVE_CACHE_DIR = getattr(
+    settings, 'ADDS_CREATIVE_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'creatives')
+)
+ADDS_CREATIVE_CACHE_SIZE = getattr(settings, 'ADDS_CREATIVE_CACHE_SIZE', 2 * 1024 ** 3)
+ADDS_CREATIVE_MAX_FILE = getattr(settings, 'ADDS_CREATIVE_MAX_FILE', 200 * 1024 ** 2)
+ADDS_CREATIVE_WORKERS = getattr(settings, 'ADDS_CREATIVE_WORKERS', 2)
+ADDS_CREATIVE_TIMEOUT = getattr(settings, 'ADDS_CREATIVE_TIMEOUT', (5, 30))
+
+# /api/adds/ is served from a precomputed assignment table, rebuilt on
+# AdConfig changes and every REBUILD_INTERVAL seconds by Celery beat. The
+# table is shared through the Django cache; each process checks it for a
+# newer build at most every REFRESH seconds.
+ADDS_ASSIGNMENTS_REBUILD_INTERVAL = getattr(settings, 'ADDS_ASSIGNMENTS_REBUILD_INTERVAL', 60)
+ADDS_ASSIGNMENTS_REFRESH = getattr(settings, 'ADDS_ASSIGNMENTS_REFRESH', 5)
+
+# The serialised ActiveAdListView response is kept in every process and in
+# the Django cache. AdConfig changes invalidate both; other processes
+# notice within REFRESH seconds.
+ADDS_ACTIVE_ADS_REFRESH = getattr(settings, 'ADDS_ACTIVE_ADS_REFRESH', 5)
+
+# Impression/click events are counted in memory per (screen, creative,
+# minute) and upserted into AdStat every FLUSH_INTERVAL seconds, or sooner
+# once MAX_KEYS buckets are pending. A tracking request carries at most
+# MAX_BATCH events.
+ADDS_STATS_FLUSH_INTERVAL = getattr(settings, 'ADDS_STATS_FLUSH_INTERVAL', 10.0)
+ADDS_STATS_MAX_KEYS = getattr(settings, 'ADDS_STATS_MAX_KEYS', 10000)
+ADDS_STATS_MAX_BATCH = getattr(settings, 'ADDS_STATS_MAX_BATCH', 100)
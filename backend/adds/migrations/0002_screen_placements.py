@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adds', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adconfig',
+            name='fallback_click_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='adconfig',
+            name='fallback_video_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='adconfig',
+            name='screen',
+            field=models.CharField(blank=True, db_index=True, help_text='e.g. ad_screen_01', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='adconfig',
+            name='vast_tag_url',
+            field=models.URLField(blank=True, max_length=2000),
+        ),
+        migrations.AlterField(
+            model_name='adconfig',
+            name='script_content',
+            field=models.TextField(blank=True, default='', help_text='The script/html code for the ad'),
+        ),
+    ]
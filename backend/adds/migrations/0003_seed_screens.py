@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# The placements VastAdListView used to hard-code
+SAMPLE_TAG = (
+    "https://pubads.g.doubleclick.net/gampad/ads?sz=640x480&iu=/124319096/external/single_ad_samples"
+    "&ciu_szs=300x250&impl=s&gdfp_req=1&env=vp&output=vast"
+)
+SCREENS = [
+    ("ad_screen_01", SAMPLE_TAG, "/ads/ad1.mp4", "https://example.com/1"),
+    ("ad_screen_02", "", "/ads/ad2.mp4", "https://example.com/2"),
+    ("ad_screen_03", "", "/ads/ad3.mp4", "https://example.com/3"),
+    ("ad_screen_04", "", "/ads/ad4.mp4", "https://example.com/4"),
+    ("ad_screen_05", "", "/ads/ad5.mp4", "https://example.com/5"),
+    ("ad_screen_06", "", "/ads/ad6.mp4", "https://example.com/6"),
+]
+
+
+def seed_screens(apps, schema_editor):
+    AdConfig = apps.get_model('adds', 'AdConfig')
+    for screen, tag, video_url, click_url in SCREENS:
+        if not AdConfig.objects.filter(screen=screen).exists():
+            AdConfig.objects.create(
+                title=screen, screen=screen, vast_tag_url=tag,
+                fallback_video_url=video_url, fallback_click_url=click_url,
+            )
+
+
+def unseed_screens(apps, schema_editor):
+    AdConfig = apps.get_model('adds', 'AdConfig')
+    AdConfig.objects.filter(screen__in=[row[0] for row in SCREENS], script_content='').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adds', '0002_screen_placements'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_screens, unseed_screens),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adds', '0003_seed_screens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('screen', models.CharField(max_length=50)),
+                ('creative', models.CharField(max_length=1000)),
+                ('minute', models.DateTimeField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='adstat',
+            constraint=models.UniqueConstraint(fields=('screen', 'creative', 'minute'), name='adstat_unique_bucket'),
+        ),
+    ]
@@ -2,10 +2,33 @@ from django.db import models
 
 class AdConfig(models.Model):
     title = models.CharField(max_length=100)
-    script_content = models.TextField(help_text="The script/html code for the ad")
+    script_content = models.TextField(blank=True, default='', help_text="The script/html code for the ad")
     is_active = models.BooleanField(default=True)
+    # Video screen placement: the VAST tag to resolve for `screen`, and the
+    # creative shown when it cannot be resolved
+    screen = models.CharField(max_length=50, blank=True, db_index=True, help_text="e.g. ad_screen_01")
+    vast_tag_url = models.URLField(max_length=2000, blank=True)
+    fallback_video_url = models.CharField(max_length=500, blank=True)
+    fallback_click_url = models.CharField(max_length=500, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
+
+
+class AdStat(models.Model):
+    """Impressions and clicks per screen and creative, in one-minute buckets."""
+    screen = models.CharField(max_length=50)
+    creative = models.CharField(max_length=1000)
+    minute = models.DateTimeField()
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['screen', 'creative', 'minute'], name='adstat_unique_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.screen} {self.minute:%Y-%m-%d %H:%M}"
@@ -0,0 +1,71 @@
+import json
+import time
+import hashlib
+import threading
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from adds import config
+from adds.models import AdConfig
+from adds.serializers import AdConfigSerializer
+
+GENERATION_KEY = "adds:active:generation"
+
+
+class ActiveAdsCache:
+    """
+    Serialised list of active script ads with its ETag and Last-Modified.
+
+    Entries live in the Django cache under the current generation, which
+    `invalidate` bumps; an entry built while an invalidation races it is
+    stored under the old generation and never read. Each process keeps
+    its own copy and checks the generation at most every `refresh`
+    seconds, so steady-state requests touch neither the DB nor the cache.
+    """
+
+    def __init__(self, refresh=None, clock=time.monotonic):
+        self.refresh = config.ADDS_ACTIVE_ADS_REFRESH if refresh is None else refresh
+        self.clock = clock
+        self.entry = None         # {"generation", "etag", "last_modified", "data"}
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        now = self.clock()
+        entry = self.entry
+        if entry is not None and now - self.checked_at < self.refresh:
+            return entry
+
+        generation = cache.get(GENERATION_KEY, 0)
+        if entry is None or entry["generation"] != generation:
+            key = f"adds:active:{generation}"
+            entry = cache.get(key)
+            if entry is None:
+                entry = self._build(generation)
+                cache.set(key, entry, None)
+        with self.lock:
+            self.entry, self.checked_at = entry, now
+        return entry
+
+    def invalidate(self):
+        if not cache.add(GENERATION_KEY, 1, None):
+            cache.incr(GENERATION_KEY)
+        with self.lock:
+            self.entry = None
+
+    def _build(self, generation):
+        ads = AdConfig.objects.filter(is_active=True).exclude(script_content='')
+        data = json.loads(json.dumps(AdConfigSerializer(ads, many=True).data))
+        digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+        return {
+            "generation": generation,
+            "etag": f'"{digest}"',
+            # Deletions leave no updated_at behind, so the build time stands in
+            "last_modified": int(timezone.now().timestamp()),
+            "data": data,
+        }
+
+
+# Global singleton instance
+active_ads = ActiveAdsCache()
@@ -0,0 +1,123 @@
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from adds import config
+from adds.models import AdStat
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("impression", "click")
+
+
+class AdStatsBuffer:
+    """
+    In-memory impression/click counts, flushed to AdStat in bulk.
+
+    `record` only bumps counters, so tracking requests never touch the DB.
+    A daemon thread, started on first use, flushes every `interval`
+    seconds (and at exit). Each flush swaps the buffer out and upserts one
+    row per (screen, creative, minute), adding to whatever other processes
+    already wrote. A failed flush puts its counts back for the next one.
+
+    The buffer is per process: every web worker keeps and flushes its own
+    counts, so the database is only complete once all of them have
+    flushed. At `max_keys` buckets the flusher is woken and events for
+    new buckets are discarded (and counted in `discarded`) until it has
+    run, so a flood of distinct screens/creatives cannot grow memory
+    without bound.
+    """
+
+    def __init__(self, interval=None, max_keys=None):
+        self.interval = config.ADDS_STATS_FLUSH_INTERVAL if interval is None else interval
+        self.max_keys = config.ADDS_STATS_MAX_KEYS if max_keys is None else max_keys
+        self.counts = defaultdict(Counter)    # (screen, creative, minute) -> Counter(type)
+        self.discarded = 0                    # events refused since the last flush
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def record(self, events, now=None):
+        """Counts (type, screen, creative) events; returns how many were counted."""
+        minute = (now or timezone.now()).replace(second=0, microsecond=0)
+        counted = 0
+        with self.lock:
+            for typeof, screen, creative in events:
+                if typeof not in EVENT_TYPES:
+                    continue
+                key = (screen, creative, minute)
+                if key not in self.counts and len(self.counts) >= self.max_keys:
+                    self.discarded += 1
+                    continue
+                self.counts[key][typeof] += 1
+                counted += 1
+            full = len(self.counts) >= self.max_keys
+        self._ensure_flusher()
+        if full:
+            self.wake.set()
+        return counted
+
+    def flush(self):
+        """Writes and clears the pending counts; returns the number of rows upserted."""
+        with self.lock:
+            counts, self.counts = self.counts, defaultdict(Counter)
+            discarded, self.discarded = self.discarded, 0
+        if discarded:
+            logger.warning(f"[Ad Stats] Buffer full, discarded {discarded} event(s)")
+        if not counts:
+            return 0
+        try:
+            self._upsert(counts)
+        except Exception as e:
+            logger.error(f"[Ad Stats] Flushing {len(counts)} bucket(s) failed: {e}")
+            with self.lock:
+                for key, counter in counts.items():
+                    self.counts[key].update(counter)
+            return 0
+        return len(counts)
+
+    def _upsert(self, counts):
+        # bulk_create(update_conflicts=True) can only overwrite, not add, so
+        # the increment is spelled out (PostgreSQL and SQLite share syntax)
+        qn = connection.ops.quote_name
+        table = qn(AdStat._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} ({qn('screen')}, {qn('creative')}, {qn('minute')}, "
+            f"{qn('impressions')}, {qn('clicks')}) VALUES (%s, %s, %s, %s, %s) "
+            f"ON CONFLICT ({qn('screen')}, {qn('creative')}, {qn('minute')}) DO UPDATE SET "
+            f"{qn('impressions')} = {table}.{qn('impressions')} + excluded.{qn('impressions')}, "
+            f"{qn('clicks')} = {table}.{qn('clicks')} + excluded.{qn('clicks')}"
+        )
+        rows = [
+            (screen, creative, connection.ops.adapt_datetimefield_value(minute),
+             counter["impression"], counter["click"])
+            for (screen, creative, minute), counter in counts.items()
+        ]
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+
+    def _ensure_flusher(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name="ad-stats", daemon=True)
+            self.thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            close_old_connections()
+            self.flush()
+
+
+# Global singleton instance
+ad_stats = AdStatsBuffer()
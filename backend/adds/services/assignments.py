@@ -0,0 +1,150 @@
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from adds import config
+from adds.models import AdConfig
+from adds.services.creativeCache import creative_cache
+from adds.services.mediaSelection import DEFAULT_BUCKET, all_buckets
+from adds.services.vastResolver import resolve_many
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "adds:assignments"
+
+
+class AssignmentTable:
+    """
+    Precomputed /api/adds/ responses, so serving one costs no DB query and
+    no VAST work.
+
+    A build reads the screen placements from AdConfig and resolves every
+    tag for every client hint bucket (the hop cache fetches each upstream
+    document once), falling back per screen. The snapshot is published in
+    the Django cache, and every process picks up newer snapshots from there
+    at most every `refresh` seconds. Response bodies and their ETags are
+    derived lazily per (bucket, host) and kept until the next snapshot.
+    """
+
+    def __init__(self, refresh=None, clock=time.monotonic):
+        self.refresh = config.ADDS_ASSIGNMENTS_REFRESH if refresh is None else refresh
+        self.clock = clock
+        self.snapshot = None      # {"version", "buckets": {bucket: rows}}
+        self.checked_at = None
+        self.responses = {}       # (bucket, base_url) -> (etag, data)
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.rebuilds = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assignments")
+        self.rebuild_pending = False
+
+    def build(self):
+        placements = {}
+        # Latest update wins if a screen is configured twice
+        for ad in AdConfig.objects.filter(is_active=True).exclude(screen='').order_by('screen', 'updated_at'):
+            placements[ad.screen] = ad
+        tags = {screen: ad.vast_tag_url for screen, ad in placements.items() if ad.vast_tag_url}
+
+        # One deadline for the whole build, not one per bucket
+        deadline = time.monotonic() + config.ADDS_VAST_DEADLINE
+        buckets = {}
+        for bucket in all_buckets():
+            resolved = resolve_many(tags, deadline=max(deadline - time.monotonic(), 0), bucket=bucket)
+            rows = []
+            for screen, ad in placements.items():
+                ad_data = resolved.get(screen) or {
+                    "videoUrl": ad.fallback_video_url, "clickUrl": ad.fallback_click_url
+                }
+                rows.append({
+                    "screen": screen,
+                    "videoUrl": ad_data["videoUrl"],
+                    "clickUrl": ad_data["clickUrl"],
+                    "localCopy": creative_cache.lookup(ad_data["videoUrl"]),
+                })
+            buckets[bucket] = rows
+        return {"version": uuid.uuid4().hex, "buckets": buckets}
+
+    def rebuild(self):
+        """Builds a snapshot, publishes it to every process and installs it here."""
+        snapshot = self.build()
+        cache.set(CACHE_KEY, snapshot, None)
+        with self.lock:
+            self._install(snapshot)
+        logger.info(f"[Ad Assignments] Rebuilt {snapshot['version']}")
+        return snapshot
+
+    def rebuild_soon(self):
+        """Queues a background rebuild; bursts of changes share one."""
+        with self.lock:
+            if self.rebuild_pending:
+                return
+            self.rebuild_pending = True
+        self.rebuilds.submit(self._rebuild_queued)
+
+    def _rebuild_queued(self):
+        with self.lock:
+            self.rebuild_pending = False
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"[Ad Assignments] Rebuild failed: {e}")
+
+    def current(self):
+        now = self.clock()
+        if self.checked_at is None or now - self.checked_at >= self.refresh:
+            self.checked_at = now
+            shared = cache.get(CACHE_KEY)
+            with self.lock:
+                if shared and (self.snapshot is None or shared["version"] != self.snapshot["version"]):
+                    self._install(shared)
+        if self.snapshot is None:
+            with self.build_lock:
+                if self.snapshot is None:
+                    self.rebuild()
+        return self.snapshot
+
+    def response(self, bucket, base_url):
+        """(etag, assignments) for a hint bucket; `base_url` makes cached creative links absolute."""
+        snapshot = self.current()
+        key = (bucket, base_url)
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+
+        rows = snapshot["buckets"].get(bucket) or snapshot["buckets"].get(DEFAULT_BUCKET, [])
+        data = [{
+            "screen": row["screen"],
+            # The snapshot may come from another process; link the copy only if this one can serve it
+            "videoUrl": (base_url.rstrip('/') + reverse('ad-creative', args=[row["localCopy"]])
+                         if row["localCopy"] and creative_cache.available(row["localCopy"])
+                         else row["videoUrl"]),
+            "clickUrl": row["clickUrl"],
+            # Stable id for impression/click tracking, whichever copy is played
+            "creative": row["videoUrl"],
+        } for row in rows]
+        digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+        cached = (f'"{digest}"', data)
+        with self.lock:
+            if self.snapshot is snapshot:
+                self.responses[key] = cached
+        return cached
+
+    def _install(self, snapshot):
+        self.snapshot = snapshot
+        self.responses = {}
+
+    def clear(self):
+        with self.lock:
+            self.snapshot = None
+            self.checked_at = None
+            self.responses = {}
+
+
+# Global singleton instance
+assignments = AssignmentTable()
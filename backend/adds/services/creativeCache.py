@@ -0,0 +1,182 @@
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from adds import config
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class CreativeCache:
+    """
+    Local disk copy of ad creatives, keyed by the hash of their source URL.
+
+    `lookup` never blocks on the network: a miss starts one background
+    download (concurrent misses for the same URL share it) and returns
+    None, so the caller keeps using the remote URL until the copy is
+    complete. Files are written under a temporary name and renamed into
+    place, so a key that exists on disk is always a whole file.
+
+    The index is an LRU of key -> size. Serving a file counts as a use,
+    and the least recently used files are deleted while the total exceeds
+    `max_bytes`. The directory may be shared by several processes (the
+    Celery worker downloads, the web process serves), so whether a key
+    can be served is decided by the disk; files found there are adopted
+    into this process's index.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, max_file=None, executor=None,
+                 enabled=None):
+        self.directory = config.ADDS_CREATIVE_CACHE_DIR if directory is None else directory
+        self.max_bytes = config.ADDS_CREATIVE_CACHE_SIZE if max_bytes is None else max_bytes
+        self.max_file = config.ADDS_CREATIVE_MAX_FILE if max_file is None else max_file
+        self.enabled = config.ADDS_CREATIVE_CACHE_ENABLED if enabled is None else enabled
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=config.ADDS_CREATIVE_WORKERS, thread_name_prefix="creative"
+        )
+        self.index = None        # key -> size, least recently used first
+        self.total = 0
+        self.inflight = set()    # keys being downloaded
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.mp4")
+
+    def lookup(self, url):
+        """
+        Returns the key of the local copy of `url`, or None while there is
+        none (a download is then started). Relative URLs are not cached.
+        """
+        if not self.enabled or not url or not url.startswith(("http://", "https://")):
+            return None
+        key = self.key_for(url)
+        with self.lock:
+            if self._adopt(key):
+                return key
+            if key in self.inflight:
+                return None
+            self.inflight.add(key)
+        self.executor.submit(self._download, url, key)
+        return None
+
+    def available(self, key):
+        """Whether this process can serve `key`."""
+        with self.lock:
+            return self._adopt(key)
+
+    def open(self, key):
+        """Opens a cached file for reading and marks it recently used, or returns None."""
+        with self.lock:
+            if not self._adopt(key):
+                return None
+            self.index.move_to_end(key)
+        try:
+            return open(self.path(key), 'rb')
+        except OSError:
+            with self.lock:
+                self._forget(key)
+            return None
+
+    def clear(self):
+        with self.lock:
+            self._load_index()
+            for key in list(self.index):
+                self._remove(key)
+
+    def _load_index(self):
+        # Lazily, so importing the module never touches the disk; files
+        # surviving a restart are ordered by last modification
+        if self.index is not None:
+            return
+        self.index = OrderedDict()
+        self.total = 0
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.is_file() and entry.name.endswith(".mp4")]
+        except FileNotFoundError:
+            return
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            size = entry.stat().st_size
+            self.index[entry.name[:-len(".mp4")]] = size
+            self.total += size
+
+    def _adopt(self, key):
+        # Call with the lock held. Another process may have added or
+        # evicted the file, so the disk is checked either way
+        self._load_index()
+        try:
+            size = os.path.getsize(self.path(key))
+        except OSError:
+            self._forget(key)
+            return False
+        if key in self.index:
+            return True
+        self.index[key] = size
+        self.total += size
+        self._evict()
+        return key in self.index
+
+    def _download(self, url, key):
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with requests.get(url, timeout=config.ADDS_CREATIVE_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+                size = 0
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_file:
+                            logger.warning(f"[Creative Cache] {url} exceeds {self.max_file} bytes, not cached")
+                            return
+                        f.write(chunk)
+            os.replace(tmp_path, self.path(key))
+            tmp_path = None
+            with self.lock:
+                self._load_index()
+                self._forget(key)
+                self.index[key] = size
+                self.total += size
+                self._evict()
+            logger.info(f"[Creative Cache] Cached {url} ({size} bytes)")
+        except Exception as e:
+            logger.error(f"[Creative Cache] Downloading {url} failed: {e}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            with self.lock:
+                self.inflight.discard(key)
+
+    def _evict(self):
+        while self.total > self.max_bytes and self.index:
+            self._remove(next(iter(self.index)))
+
+    def _remove(self, key):
+        self._forget(key)
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def _forget(self, key):
+        self.total -= self.index.pop(key, 0)
+
+
+# Global singleton instance
+creative_cache = CreativeCache()
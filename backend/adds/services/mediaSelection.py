@@ -0,0 +1,82 @@
+from adds import config
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def hint_bucket(width=None, height=None, dpr=None, downlink=None):
+    """
+    Rounds client hints to a (max_height, max_kbps) bucket.
+
+    `width` / `height` are the viewport in CSS pixels, `dpr` the device
+    pixel ratio and `downlink` the measured bandwidth in Mbps (as in
+    navigator.connection.downlink). Missing or junk hints fall back to
+    ADDS_VIDEO_DEFAULT_HEIGHT and no bitrate cap.
+    """
+    width, height, dpr, downlink = map(_number, (width, height, dpr, downlink))
+    if height is None and width is not None:
+        height = width * 9 / 16
+
+    heights = sorted(config.ADDS_VIDEO_HEIGHTS)
+    if height is None:
+        max_height = config.ADDS_VIDEO_DEFAULT_HEIGHT
+    else:
+        pixels = height * (dpr or 1)
+        max_height = next((h for h in heights if h >= pixels), heights[-1])
+
+    max_kbps = None
+    if downlink is not None:
+        budget = downlink * 1000 * config.ADDS_VIDEO_BANDWIDTH_SHARE
+        bitrates = sorted(config.ADDS_VIDEO_BITRATES)
+        max_kbps = max((b for b in bitrates if b <= budget), default=bitrates[0])
+
+    return max_height, max_kbps
+
+
+def request_hint_bucket(request):
+    """Hint bucket from query parameters, or HTTP client hint headers."""
+    params, headers = request.query_params, request.headers
+    return hint_bucket(
+        width=params.get('vw') or headers.get('Viewport-Width'),
+        height=params.get('vh'),
+        dpr=params.get('dpr') or headers.get('DPR'),
+        downlink=params.get('downlink') or headers.get('Downlink'),
+    )
+
+
+DEFAULT_BUCKET = hint_bucket()
+
+
+def all_buckets():
+    """Every bucket `hint_bucket` can return."""
+    heights = set(config.ADDS_VIDEO_HEIGHTS) | {config.ADDS_VIDEO_DEFAULT_HEIGHT}
+    bitrates = (None,) + tuple(config.ADDS_VIDEO_BITRATES)
+    return [(height, kbps) for height in sorted(heights) for kbps in bitrates]
+
+
+def select_media_file(media_files, bucket=DEFAULT_BUCKET):
+    """
+    The best MediaFile within the bucket's height and bitrate caps, or the
+    smallest one if none fits. Missing attributes never exclude a file,
+    but rank it below files that declare them.
+    """
+    if not media_files:
+        return None
+    max_height, max_kbps = bucket
+
+    def fits(media):
+        return ((not media["height"] or media["height"] <= max_height)
+                and (max_kbps is None or not media["bitrate"] or media["bitrate"] <= max_kbps))
+
+    def quality(media):
+        return (media["height"] or 0, media["bitrate"] or 0)
+
+    fitting = [media for media in media_files if fits(media)]
+    if fitting:
+        return max(fitting, key=quality)
+    return min(media_files, key=quality)
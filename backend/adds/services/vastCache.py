@@ -0,0 +1,107 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+
+from adds import config
+
+logger = logging.getLogger(__name__)
+
+
+class VastCache:
+    """
+    In-process TTL cache for resolved VAST creatives, keyed by tag.
+
+    A fresh entry is returned as is. A stale one is still returned at
+    once, and a single background refresh is started. Loads are
+    single-flight: every caller asking for a key that is being loaded
+    gets the same Future, so a cold cache costs one upstream fetch per
+    tag. `None` results (nothing to show) are kept for `negative_ttl`.
+    """
+
+    def __init__(self, loader, executor, ttl=None, stale_ttl=None, negative_ttl=None,
+                 max_entries=None, clock=time.monotonic):
+        self.loader = loader
+        self.executor = executor
+        self.ttl = config.ADDS_VAST_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = config.ADDS_VAST_STALE_TTL if stale_ttl is None else stale_ttl
+        self.negative_ttl = config.ADDS_VAST_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.max_entries = config.ADDS_VAST_CACHE_SIZE if max_entries is None else max_entries
+        self.clock = clock
+        self.entries = {}     # key -> (value, fresh_until, stale_until)
+        self.inflight = {}    # key -> Future
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns (found, value). Stale hits count as found and trigger a
+        refresh; on a miss, call `fetch`.
+        """
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        value, fresh_until, stale_until = entry
+        if now < fresh_until:
+            return True, value
+        if now < stale_until:
+            self.fetch(key)
+            return True, value
+        return False, None
+
+    def fetch(self, key):
+        """Start loading `key` unless a load is already running; returns its Future."""
+        future, owner = self._claim(key)
+        if owner:
+            self.executor.submit(self._load, key, future)
+        return future
+
+    def load(self, key, timeout=None):
+        """
+        Cached value for `key`, loading it in the calling thread on a miss
+        (or waiting for the thread that already is).
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+        future, owner = self._claim(key)
+        if owner:
+            self._load(key, future)
+        return future.result(timeout)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _claim(self, key):
+        """The in-flight Future for `key`, and whether the caller must run it."""
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self.inflight[key] = Future()
+            return future, True
+
+    def _load(self, key, future):
+        try:
+            value = self.loader(key)
+        except Exception as e:
+            logger.error(f"[VAST Cache] Loading {key} failed: {e}")
+            value = None
+        self._store(key, value)
+        future.set_result(value)
+
+    def _store(self, key, value):
+        now = self.clock()
+        if value is None:
+            entry = (None, now + self.negative_ttl, now + self.negative_ttl)
+        else:
+            entry = (value, now + self.ttl, now + self.ttl + self.stale_ttl)
+        with self.lock:
+            self.inflight.pop(key, None)
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                # Oldest write first
+                del self.entries[next(iter(self.entries))]
@@ -1,68 +1,91 @@
 import requests
 import xml.etree.ElementTree as ET
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from adds import config
+from adds.services.vastCache import VastCache
+from adds.services.mediaSelection import DEFAULT_BUCKET, select_media_file
 
 logger = logging.getLogger(__name__)
 
-def resolve_vast(vast_tag_url):
+# Shared by every request, so a slow ad server can occupy at most
+# ADDS_VAST_WORKERS threads no matter how many page loads are waiting on it
+_executor = ThreadPoolExecutor(max_workers=config.ADDS_VAST_WORKERS, thread_name_prefix="vast")
+
+
+def _local(tag):
+    # Drop any XML namespace: "{http://...}MediaFile" -> "MediaFile"
+    return tag.rsplit('}', 1)[-1]
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_vast(source):
     """
-    Fetches VAST XML from Google Ad Manager and extracts the best MP4 media file URL
-    and the click-through URL.
-    Returns a dict with 'videoUrl' and 'clickUrl', or None if parsing fails.
+    Streams one VAST document from a file-like `source` and returns
+    {"mediaFiles", "clickUrl", "wrapperUrl"}. `mediaFiles` lists every
+    `video/mp4` MediaFile of the first Linear creative that has any, as
+    {"url", "bitrate", "width", "height"} (bitrate in kbps, None if absent).
+
+    Parsing stops once an InLine MediaFiles block yields an MP4, so the
+    rest of the document is never read. For a Wrapper, `wrapperUrl` is its
+    VASTAdTagURI, to be resolved by the caller.
+    """
+    media_files = []
+    click_through_url = None
+    wrapper_url = None
+    path = []
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            path.append(tag)
+            continue
+        path.pop()
+
+        # InLine/Wrapper -> Creatives -> Creative -> Linear -> ...
+        in_linear = "Linear" in path
+        text = elem.text.strip() if elem.text else None
+        if tag == "ClickThrough" and in_linear and path[-1] == "VideoClicks":
+            click_through_url = click_through_url or text
+        elif tag == "MediaFile" and in_linear and elem.get('type') == 'video/mp4' and text:
+            media_files.append({
+                "url": text,
+                "bitrate": _int(elem.get('bitrate') or elem.get('maxBitrate')),
+                "width": _int(elem.get('width')),
+                "height": _int(elem.get('height')),
+            })
+        elif tag == "MediaFiles" and media_files and "InLine" in path:
+            break
+        elif tag == "VASTAdTagURI" and "Wrapper" in path:
+            wrapper_url = wrapper_url or text
+
+        if tag in ("Creative", "Ad"):
+            # Keep memory flat on large documents
+            elem.clear()
+
+    return {"mediaFiles": media_files, "clickUrl": click_through_url, "wrapperUrl": wrapper_url}
+
+
+def fetch_vast_document(url):
+    """
+    Fetches and parses one hop of a VAST chain (see `parse_vast`).
+    Returns None if the document could not be fetched or parsed.
     """
     try:
-        logger.info(f"[VAST Resolver] Fetching VAST tag: {vast_tag_url}")
+        logger.info(f"[VAST Resolver] Fetching VAST tag: {url}")
         # Explicit timeout to prevent hanging the Django view
-        response = requests.get(vast_tag_url, timeout=5)
-        response.raise_for_status()
-        
-        xml_text = response.text
-        root = ET.fromstring(xml_text)
-        
-        # Navigate standard VAST 3.0 / 4.0 XML structure
-        # InLine/Wrapper -> Creatives -> Creative -> Linear -> MediaFiles
-        inline = root.find('.//InLine') or root.find('.//Wrapper')
-        if inline is None:
-            logger.warning("[VAST Resolver] No InLine or Wrapper found in VAST")
-            return None
-            
-        creatives = inline.findall('.//Creative')
-        
-        media_file_url = None
-        click_through_url = None
-        
-        for creative in creatives:
-            linear = creative.find('Linear')
-            if linear is not None:
-                # 1. Extract Click-through URL
-                video_clicks = linear.find('VideoClicks')
-                if video_clicks is not None:
-                    click_through = video_clicks.find('ClickThrough')
-                    if click_through is not None:
-                        click_through_url = click_through.text.strip() if click_through.text else None
-                        
-                # 2. Extract best MP4 MediaFile
-                media_files = linear.find('MediaFiles')
-                if media_files is not None:
-                    for mf in media_files.findall('MediaFile'):
-                        if mf.get('type') == 'video/mp4':
-                            # In a production system, you might select by bitrate/resolution here.
-                            # We just grab the first valid MP4.
-                            media_file_url = mf.text.strip() if mf.text else None
-                            break
-                            
-            if media_file_url:
-                break
-                
-        if not media_file_url:
-            logger.warning("[VAST Resolver] Could not find an MP4 MediaFile in VAST")
-            return None
-            
-        return {
-            "videoUrl": media_file_url,
-            "clickUrl": click_through_url
-        }
-        
+        with requests.get(url, timeout=config.ADDS_VAST_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return parse_vast(response.raw)
+
     except requests.RequestException as e:
         logger.error(f"[VAST Resolver] Network error fetching VAST: {e}")
         return None
@@ -72,3 +95,82 @@ def resolve_vast(vast_tag_url):
     except Exception as e:
         logger.error(f"[VAST Resolver] Unexpected error parsing VAST: {e}")
         return None
+
+
+def resolve_vast(vast_tag_url, bucket=DEFAULT_BUCKET):
+    """
+    Fetches VAST XML from Google Ad Manager, following Wrapper chains up to
+    ADDS_VAST_MAX_WRAPPERS deep, and extracts the MP4 media file that best
+    fits the client hint `bucket` (see `select_media_file`) and the
+    click-through URL.
+    Returns a dict with 'videoUrl' and 'clickUrl', or None if parsing fails.
+
+    Every hop goes through `hop_cache`, so chains sharing a wrapper fetch
+    it once, and concurrent identical fetches are merged.
+    """
+    url = vast_tag_url
+    seen = set()
+    click_through_url = None
+
+    for _ in range(config.ADDS_VAST_MAX_WRAPPERS + 1):
+        if url in seen:
+            logger.warning(f"[VAST Resolver] Wrapper loop at {url}")
+            return None
+        seen.add(url)
+
+        hop = hop_cache.load(url)
+        if hop is None:
+            return None
+        # The innermost ClickThrough is the real landing page
+        click_through_url = hop["clickUrl"] or click_through_url
+
+        if hop["mediaFiles"]:
+            return {
+                "videoUrl": select_media_file(hop["mediaFiles"], bucket)["url"],
+                "clickUrl": click_through_url
+            }
+        if not hop["wrapperUrl"]:
+            logger.warning("[VAST Resolver] Could not find an MP4 MediaFile in VAST")
+            return None
+        url = hop["wrapperUrl"]
+
+    logger.warning(f"[VAST Resolver] Gave up after {config.ADDS_VAST_MAX_WRAPPERS} wrappers: {vast_tag_url}")
+    return None
+
+
+def resolve_many(vast_tags, deadline=None, bucket=DEFAULT_BUCKET):
+    """
+    Resolves {key: VAST tag URL} for the client hint `bucket` concurrently
+    and waits at most `deadline` seconds overall. Returns {key: result} for the tags that resolved in
+    time; failed or late tags are left out so the caller can fall back.
+    Cached (even stale) creatives are used without waiting.
+    """
+    deadline = config.ADDS_VAST_DEADLINE if deadline is None else deadline
+    results, futures = {}, {}
+    for key, url in vast_tags.items():
+        found, value = vast_cache.get((url, bucket))
+        if not found:
+            futures[key] = vast_cache.fetch((url, bucket))
+        elif value:
+            results[key] = value
+
+    done, pending = wait(futures.values(), timeout=deadline)
+    if pending:
+        # Late loads keep running and fill the cache for the next request
+        logger.warning(f"[VAST Resolver] {len(pending)} tag(s) missed the {deadline}s deadline")
+
+    for key, future in futures.items():
+        if future in done and future.result():
+            results[key] = future.result()
+    return results
+
+
+def _resolve_cached(key):
+    url, bucket = key
+    return resolve_vast(url, bucket)
+
+
+# Global singleton instances: resolved creatives per (tag, hint bucket), and
+# parsed documents per URL (each hop of a wrapper chain, shared by buckets)
+vast_cache = VastCache(_resolve_cached, _executor)
+hop_cache = VastCache(fetch_vast_document, _executor)
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AdConfig
+from .services.activeAds import active_ads
+from .services.assignments import assignments
+
+
+@receiver(post_save, sender=AdConfig)
+@receiver(post_delete, sender=AdConfig)
+def rebuild_assignments(sender, **kwargs):
+    # After commit, so the rebuild reads the change
+    transaction.on_commit(assignments.rebuild_soon)
+
+
+@receiver(post_save, sender=AdConfig)
+@receiver(post_delete, sender=AdConfig)
+def invalidate_active_ads(sender, **kwargs):
+    transaction.on_commit(active_ads.invalidate)
@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from adds.models import AdConfig
+from adds.services.activeAds import ActiveAdsCache, active_ads
+from adds.services.assignments import assignments
+
+
+@patch.object(assignments, 'rebuild_soon')
+@patch.object(active_ads, 'clock', lambda: 0)
+class ActiveAdListViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        active_ads.invalidate()
+        self.ad = AdConfig.objects.create(title="banner", script_content="<script></script>")
+        self.client = APIClient()
+
+    def get(self, **headers):
+        return self.client.get(reverse('active-ads'), **headers)
+
+    def test_only_script_ads_are_listed(self, _):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([ad["title"] for ad in response.data], ["banner"])
+
+    def test_repeat_requests_skip_the_database(self, _):
+        etag = self.get()["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get()["ETag"], etag)
+
+    def test_conditional_requests(self, _):
+        first = self.get()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_none_match_compares_whole_tags(self, _):
+        etag = self.get()["ETag"]
+        for header in ("*", f'W/{etag}', f'"other", {etag}'):
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=header).status_code, 304, header)
+        for header in (etag[:-2] + '"', f'"x{etag[1:]}', '"other"'):
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=header).status_code, 200, header)
+
+    def test_changes_invalidate_the_cache(self, _):
+        etag = self.get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ad.title = "renamed"
+            self.ad.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["title"], "renamed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ad.delete()
+        self.assertEqual(self.get().data, [])
+
+    def test_other_processes_notice_invalidation(self, _):
+        other = ActiveAdsCache(refresh=0)
+        self.assertEqual(len(other.get()["data"]), 1)
+        AdConfig.objects.all().delete()
+        active_ads.invalidate()
+        self.assertEqual(other.get()["data"], [])
+
+    def test_invalid_tokens_are_ignored(self, _):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer junk").status_code, 200)
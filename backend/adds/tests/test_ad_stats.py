@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from adds.models import AdStat
+from adds.services.adStats import AdStatsBuffer, ad_stats
+
+NOON = datetime(2026, 1, 1, 12, 0, 30, tzinfo=timezone.utc)
+
+
+@patch.object(AdStatsBuffer, '_ensure_flusher')
+class AdStatsBufferTest(TestCase):
+
+    def test_events_are_aggregated_per_minute(self, _):
+        stats = AdStatsBuffer()
+        stats.record([("impression", "s1", "a.mp4")] * 3 + [("click", "s1", "a.mp4")], now=NOON)
+        stats.record([("impression", "s1", "a.mp4")], now=NOON.replace(minute=1))
+        with self.assertNumQueries(3):  # savepoint, upsert, release
+            self.assertEqual(stats.flush(), 2)
+
+        first, second = AdStat.objects.order_by('minute')
+        self.assertEqual((first.impressions, first.clicks), (3, 1))
+        self.assertEqual(first.minute, NOON.replace(second=0))
+        self.assertEqual((second.impressions, second.clicks), (1, 0))
+        self.assertEqual(stats.flush(), 0)
+
+    def test_flushes_add_to_existing_rows(self, _):
+        for stats in (AdStatsBuffer(), AdStatsBuffer()):
+            stats.record([("impression", "s1", "a.mp4"), ("click", "s1", "a.mp4")], now=NOON)
+            stats.flush()
+        stat = AdStat.objects.get()
+        self.assertEqual((stat.impressions, stat.clicks), (2, 2))
+
+    def test_failed_flush_keeps_counts(self, _):
+        stats = AdStatsBuffer()
+        stats.record([("impression", "s1", "a.mp4")], now=NOON)
+        with patch.object(stats, '_upsert', side_effect=RuntimeError("db down")):
+            self.assertEqual(stats.flush(), 0)
+        stats.record([("impression", "s1", "a.mp4")], now=NOON)
+        stats.flush()
+        self.assertEqual(AdStat.objects.get().impressions, 2)
+
+    def test_full_buffer_wakes_the_flusher(self, _):
+        stats = AdStatsBuffer(max_keys=2)
+        stats.record([("impression", "s1", "a.mp4")], now=NOON)
+        self.assertFalse(stats.wake.is_set())
+        stats.record([("impression", "s2", "a.mp4")], now=NOON)
+        self.assertTrue(stats.wake.is_set())
+
+    def test_full_buffer_discards_new_buckets(self, _):
+        stats = AdStatsBuffer(max_keys=2)
+        stats.record([("impression", "s1", "a.mp4"), ("impression", "s2", "a.mp4")], now=NOON)
+        counted = stats.record([("click", "s1", "a.mp4"), ("impression", "s3", "a.mp4")], now=NOON)
+        self.assertEqual(counted, 1)
+        self.assertEqual((len(stats.counts), stats.discarded), (2, 1))
+
+        with self.assertLogs('adds.services.adStats', 'WARNING'):
+            self.assertEqual(stats.flush(), 2)
+        self.assertEqual(stats.discarded, 0)
+        self.assertEqual(stats.record([("impression", "s3", "a.mp4")], now=NOON), 1)
+
+
+@patch.object(AdStatsBuffer, '_ensure_flusher')
+class AdEventViewTest(TestCase):
+    def setUp(self):
+        ad_stats.counts.clear()
+        self.client = APIClient()
+
+    def post(self, events):
+        return self.client.post(reverse('ad-events'), {"events": events}, format='json')
+
+    def test_batches_are_accepted_without_touching_the_database(self, _):
+        events = [
+            {"type": "impression", "screen": "ad_screen_01", "creative": "a.mp4"},
+            {"type": "click", "screen": "ad_screen_01", "creative": "a.mp4"},
+            {"type": "hover", "screen": "ad_screen_01", "creative": "a.mp4"},
+            {"type": "click", "screen": "", "creative": "a.mp4"},
+            "junk",
+        ]
+        with self.assertNumQueries(0):
+            response = self.post(events)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {"accepted": 2})
+
+        ad_stats.flush()
+        stat = AdStat.objects.get()
+        self.assertEqual((stat.screen, stat.impressions, stat.clicks), ("ad_screen_01", 1, 1))
+
+    def test_oversized_batches_are_rejected(self, _):
+        event = {"type": "impression", "screen": "s", "creative": "c"}
+        self.assertEqual(self.post([event] * 101).status_code, 400)
+        self.assertEqual(self.client.post(reverse('ad-events'), {}, format='json').status_code, 400)
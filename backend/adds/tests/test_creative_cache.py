@@ -0,0 +1,167 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache as django_cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from adds.services.assignments import assignments
+from adds.services.creativeCache import CreativeCache
+from adds.tests.test_vast_resolver import StubServerMixin
+
+
+class InlineExecutor:
+    """Runs downloads on the calling thread so tests need not wait."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class CreativeCacheTest(StubServerMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.cache = self.make_cache()
+
+    def make_cache(self, **kwargs):
+        return CreativeCache(self.directory, executor=InlineExecutor(), enabled=True, **kwargs)
+
+    def test_miss_downloads_once_then_hits(self):
+        url = self.url("inline.xml")
+        self.assertIsNone(self.cache.lookup(url))
+        key = self.cache.lookup(url)
+        self.assertEqual(key, CreativeCache.key_for(url))
+        with self.cache.open(key) as f:
+            self.assertTrue(f.read().startswith(b"<?xml"))
+        self.assertEqual(self.server.hits["/inline.xml"], 1)
+        self.assertEqual(os.listdir(self.directory), [f"{key}.mp4"])
+
+    def test_relative_and_failed_urls_are_not_cached(self):
+        self.assertIsNone(self.cache.lookup("/ads/ad1.mp4"))
+        self.assertIsNone(self.cache.lookup(self.url("absent.xml")))
+        self.assertIsNone(self.cache.lookup(self.url("absent.xml")))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_oversized_files_are_discarded(self):
+        cache = self.make_cache(max_file=100)
+        cache.lookup(self.url("inline.xml"))
+        self.assertIsNone(cache.lookup(self.url("inline.xml")))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_least_recently_served_file_is_evicted(self):
+        a, b, c = (self.url(name) for name in ("inline.xml", "wrapper.xml", "loop.xml"))
+        sizes = {}
+        for url in (a, b):
+            self.cache.lookup(url)
+            sizes[url] = self.cache.index[CreativeCache.key_for(url)]
+        self.cache.max_bytes = sizes[a] + sizes[b]
+
+        self.cache.open(CreativeCache.key_for(a)).close()
+        self.cache.lookup(c)
+        self.assertIsNotNone(self.cache.lookup(a))
+        self.assertIsNone(self.cache.open(CreativeCache.key_for(b)))
+        self.assertLessEqual(self.cache.total, self.cache.max_bytes)
+
+    def test_index_is_rebuilt_from_disk(self):
+        url = self.url("inline.xml")
+        self.cache.lookup(url)
+        self.assertEqual(self.make_cache().lookup(url), CreativeCache.key_for(url))
+
+    def test_file_written_by_another_process_is_served(self):
+        server = self.make_cache()
+        key = CreativeCache.key_for(self.url("inline.xml"))
+        self.assertIsNone(server.open(key))      # index loaded, file absent
+
+        self.cache.lookup(self.url("inline.xml"))
+        self.assertTrue(server.available(key))
+        with server.open(key) as f:
+            self.assertTrue(f.read().startswith(b"<?xml"))
+        self.assertEqual(server.total, self.cache.total)
+
+
+class CreativeFileViewTest(StubServerMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        assignments.clear()
+        django_cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        cache = CreativeCache(self.directory, executor=InlineExecutor(), enabled=True)
+        for target in ('adds.views.creative_cache', 'adds.services.assignments.creative_cache'):
+            patcher = patch(target, cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        cache.lookup(self.url("inline.xml"))
+        self.key = cache.lookup(self.url("inline.xml"))
+        with cache.open(self.key) as f:
+            self.body = f.read()
+        self.path = reverse('ad-creative', args=[self.key])
+        self.client = APIClient()
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_file_with_cache_headers(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.body)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_ranges(self):
+        response = self.client.get(self.path, HTTP_RANGE="bytes=5-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), self.body[5:10])
+        self.assertEqual(response["Content-Range"], f"bytes 5-9/{len(self.body)}")
+
+        response = self.client.get(self.path, HTTP_RANGE="bytes=-4")
+        self.assertEqual(self.content(response), self.body[-4:])
+
+        response = self.client.get(self.path, HTTP_RANGE=f"bytes={len(self.body)}-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_etag_revalidation(self):
+        etag = self.client.get(self.path)["ETag"]
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=f'"x{etag}"').status_code, 200)
+        response = self.client.get(self.path, HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_key_is_404(self):
+        self.assertEqual(self.client.get(reverse('ad-creative', args=["0" * 32])).status_code, 404)
+
+    def test_copy_is_linked_only_where_it_can_be_served(self):
+        resolved = {"ad_screen_01": {"videoUrl": self.url("wrapper.xml"), "clickUrl": "c"}}
+        writer = CreativeCache(self.directory, executor=InlineExecutor(), enabled=True)
+        writer.lookup(self.url("wrapper.xml"))
+        key = writer.lookup(self.url("wrapper.xml"))
+        # The worker built the snapshot; this process never downloaded the file
+        with patch('adds.services.assignments.creative_cache', writer), \
+                patch('adds.services.assignments.resolve_many', return_value=resolved):
+            assignments.rebuild()
+        assignments.clear()
+
+        response = self.client.get(reverse('vast-ads'))
+        self.assertEqual(response.data[0]["videoUrl"],
+                         f"http://testserver{reverse('ad-creative', args=[key])}")
+        self.assertEqual(self.client.get(reverse('ad-creative', args=[key])).status_code, 200)
+
+        os.remove(writer.path(key))
+        assignments.clear()
+        response = self.client.get(reverse('vast-ads'))
+        self.assertEqual(response.data[0]["videoUrl"], self.url("wrapper.xml"))
+
+    def test_assignments_point_at_cached_copy(self):
+        resolved = {"ad_screen_01": {"videoUrl": self.url("inline.xml"), "clickUrl": "c"}}
+        with patch('adds.services.assignments.resolve_many', return_value=resolved):
+            response = self.client.get(reverse('vast-ads'))
+        self.assertEqual(response.data[0]["videoUrl"], f"http://testserver{self.path}")
+        self.assertEqual(response.data[1]["videoUrl"], "/ads/ad2.mp4")
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from adds.services.mediaSelection import hint_bucket, request_hint_bucket, select_media_file
+
+
+def media(height, bitrate):
+    return {"url": f"{height}-{bitrate}", "bitrate": bitrate, "width": None, "height": height}
+
+
+class HintBucketTest(SimpleTestCase):
+
+    def test_no_hints_use_the_default_height(self):
+        self.assertEqual(hint_bucket(), (720, None))
+        self.assertEqual(hint_bucket(width="junk", downlink="-1"), (720, None))
+
+    def test_viewport_rounds_up_to_the_next_rung(self):
+        self.assertEqual(hint_bucket(width=800, height=400)[0], 480)
+        self.assertEqual(hint_bucket(height=400, dpr=2)[0], 1080)
+        self.assertEqual(hint_bucket(height=4000)[0], 1080)
+        # Width only assumes a 16:9 viewport
+        self.assertEqual(hint_bucket(width=1280)[0], 720)
+
+    def test_downlink_rounds_down_to_a_bitrate_rung(self):
+        self.assertEqual(hint_bucket(downlink=10)[1], 4000)
+        self.assertEqual(hint_bucket(downlink=0.3)[1], 500)
+
+    def test_query_parameters_and_client_hint_headers(self):
+        factory = APIRequestFactory()
+        request = Request(factory.get("/", {"vh": 360, "downlink": 2}))
+        self.assertEqual(request_hint_bucket(request), (360, 1000))
+        request = Request(factory.get("/", HTTP_VIEWPORT_WIDTH="640", HTTP_DPR="1"))
+        self.assertEqual(request_hint_bucket(request), (360, None))
+
+
+class SelectMediaFileTest(SimpleTestCase):
+    files = [media(360, 600), media(720, 2000), media(1080, 5000)]
+
+    def test_best_file_within_both_caps(self):
+        self.assertEqual(select_media_file(self.files, (1080, None))["url"], "1080-5000")
+        self.assertEqual(select_media_file(self.files, (1080, 2000))["url"], "720-2000")
+        self.assertEqual(select_media_file(self.files, (480, 8000))["url"], "360-600")
+
+    def test_smallest_file_when_nothing_fits(self):
+        self.assertEqual(select_media_file(self.files, (360, 500))["url"], "360-600")
+
+    def test_missing_attributes_do_not_exclude(self):
+        files = [media(None, None), media(1080, 5000)]
+        self.assertEqual(select_media_file(files, (720, None))["url"], "None-None")
+        self.assertIsNone(select_media_file([]))
@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from adds.services.vastCache import VastCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class VastCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.clock = FakeClock()
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.cache = VastCache(self.load, self.executor, ttl=10, stale_ttl=100,
+                               negative_ttl=5, clock=self.clock)
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+
+    def load(self, key):
+        self.calls.append(key)
+        self.release.wait(2)
+        return None if key == "empty" else {"videoUrl": f"{key}-{len(self.calls)}"}
+
+    def test_cold_cache_is_loaded_once(self):
+        self.release.clear()
+        futures = [self.cache.fetch("tag") for _ in range(5)]
+        self.assertTrue(all(f is futures[0] for f in futures))
+        self.release.set()
+
+        self.assertEqual(futures[0].result(2), {"videoUrl": "tag-1"})
+        self.assertEqual(self.calls, ["tag"])
+        self.assertEqual(self.cache.get("tag"), (True, {"videoUrl": "tag-1"}))
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        self.cache.fetch("tag").result(2)
+        self.clock.now = 50
+        self.release.clear()
+
+        self.assertEqual(self.cache.get("tag"), (True, {"videoUrl": "tag-1"}))
+        self.assertEqual(self.cache.get("tag"), (True, {"videoUrl": "tag-1"}))
+        refresh = self.cache.inflight["tag"]
+        self.release.set()
+        refresh.result(2)
+
+        self.assertEqual(self.calls, ["tag", "tag"])
+        self.assertEqual(self.cache.get("tag"), (True, {"videoUrl": "tag-2"}))
+
+    def test_negative_results_expire_quickly(self):
+        self.cache.fetch("empty").result(2)
+        self.assertEqual(self.cache.get("empty"), (True, None))
+        self.clock.now = 6
+        self.assertEqual(self.cache.get("empty"), (False, None))
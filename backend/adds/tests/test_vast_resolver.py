@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from adds.services.vastResolver import hop_cache, resolve_many, resolve_vast, vast_cache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class StubAdServer(ThreadingHTTPServer):
+    """Serves the XML fixtures, counting requests per path."""
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.delay = delay
+        self.hits = Counter()
+        self.base = f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits[self.path] += 1
+        time.sleep(self.server.delay)
+        name = self.path.split("?")[0].lstrip("/")
+        try:
+            with open(os.path.join(FIXTURES, name)) as f:
+                body = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        body = body.replace("{base}", self.server.base)
+        body = body.replace("{padding}", "<!-- " + "padding " * 10000 + "-->")
+        payload = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerMixin:
+    delay = 0.0
+
+    def setUp(self):
+        hop_cache.clear()
+        vast_cache.clear()
+        self.server = StubAdServer(self.delay)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, name):
+        return f"{self.server.base}/{name}"
+
+
+class VastResolverTest(StubServerMixin, SimpleTestCase):
+
+    def test_inline_takes_default_rendition_and_click_through(self):
+        self.assertEqual(resolve_vast(self.url("inline.xml")), {
+            "videoUrl": "https://cdn.example/ad-720.mp4",
+            "clickUrl": "https://advertiser.example/landing",
+        })
+
+    def test_wrapper_chain_is_followed_and_each_hop_cached(self):
+        expected = resolve_vast(self.url("wrapper.xml"))
+        self.assertEqual(expected["videoUrl"], "https://cdn.example/ad-720.mp4")
+
+        # A second chain sharing the inner hops fetches only its own document
+        self.assertEqual(resolve_vast(self.url("wrapper-inner.xml")), expected)
+        self.assertEqual(resolve_vast(self.url("wrapper.xml")), expected)
+        self.assertEqual(set(self.server.hits.values()), {1})
+
+    def test_parsing_stops_after_first_usable_media_files(self):
+        result = resolve_vast(self.url("truncated.xml"))
+        self.assertEqual(result["videoUrl"], "https://cdn.example/ad-720.mp4")
+
+    def test_hint_buckets_share_one_fetch(self):
+        tags = {"screen": self.url("inline.xml")}
+        small = resolve_many(tags, bucket=(360, None))
+        large = resolve_many(tags, bucket=(1080, 8000))
+        slow = resolve_many(tags, bucket=(1080, 1000))
+        self.assertEqual(small["screen"]["videoUrl"], "https://cdn.example/ad-360.mp4")
+        self.assertEqual(large["screen"]["videoUrl"], "https://cdn.example/ad-1080.mp4")
+        self.assertEqual(slow["screen"]["videoUrl"], "https://cdn.example/ad-360.mp4")
+        self.assertEqual(self.server.hits["/inline.xml"], 1)
+
+    def test_wrapper_depth_and_loops_are_bounded(self):
+        with patch("adds.config.ADDS_VAST_MAX_WRAPPERS", 1):
+            self.assertIsNone(resolve_vast(self.url("wrapper.xml")))
+        self.assertIsNone(resolve_vast(self.url("loop.xml")))
+        self.assertLessEqual(self.server.hits["/loop.xml?again"], 1)
+
+    def test_missing_document_resolves_to_none(self):
+        self.assertIsNone(resolve_vast(self.url("absent.xml")))
+
+
+class ConcurrentFetchTest(StubServerMixin, SimpleTestCase):
+    delay = 0.2
+
+    def test_identical_inflight_fetches_are_merged(self):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(resolve_vast, [self.url("wrapper.xml")] * 4))
+        self.assertTrue(all(r == results[0] and r for r in results))
+        self.assertEqual(self.server.hits["/wrapper.xml"], 1)
+        self.assertEqual(self.server.hits["/inline.xml"], 1)
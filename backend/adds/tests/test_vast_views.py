@@ -0,0 +1,100 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from adds.models import AdConfig
+from adds.services.assignments import AssignmentTable, assignments
+from adds.services.vastResolver import resolve_many, vast_cache
+from adds.worker.tasks import rebuild_ad_assignments
+
+
+def slow_resolve(key):
+    url, _ = key
+    time.sleep(float(url.rsplit('/', 1)[-1]))
+    return {"videoUrl": f"{url}.mp4", "clickUrl": url}
+
+
+class ResolveManyTest(TestCase):
+    def setUp(self):
+        vast_cache.clear()
+
+    @patch.object(vast_cache, 'loader', side_effect=slow_resolve)
+    def test_tags_resolve_concurrently(self, _):
+        started = time.monotonic()
+        results = resolve_many({f"s{i}": f"http://ads/{i}/0.2" for i in range(4)}, deadline=2)
+        self.assertEqual(len(results), 4)
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    @patch.object(vast_cache, 'loader', side_effect=slow_resolve)
+    def test_late_tags_are_left_out(self, _):
+        started = time.monotonic()
+        results = resolve_many({"fast": "http://ads/0", "slow": "http://ads/1"}, deadline=0.2)
+        self.assertEqual(list(results), ["fast"])
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+def resolve_per_bucket(tags, deadline=None, bucket=None):
+    return {screen: {"videoUrl": f"{url}@{bucket[0]}", "clickUrl": url} for screen, url in tags.items()}
+
+
+@patch('adds.services.assignments.resolve_many', side_effect=resolve_per_bucket)
+class VastAdListViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        assignments.clear()
+        self.client = APIClient()
+
+    def test_screens_come_from_ad_config(self, _):
+        response = self.client.get(reverse('vast-ads'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 6)
+        self.assertTrue(response.data[0]["videoUrl"].startswith("https://pubads.g.doubleclick.net/"))
+        self.assertEqual(response.data[1]["videoUrl"], "/ads/ad2.mp4")
+
+    def test_unresolved_screens_use_fallbacks(self, resolve):
+        resolve.side_effect = None
+        resolve.return_value = {}
+        response = self.client.get(reverse('vast-ads'))
+        self.assertEqual(response.data[0]["videoUrl"], "/ads/ad1.mp4")
+
+    def test_client_hints_pick_the_bucket(self, _):
+        response = self.client.get(reverse('vast-ads'), {"vw": 640, "vh": 360})
+        self.assertTrue(response.data[0]["videoUrl"].endswith("@360"))
+        response = self.client.get(reverse('vast-ads'))
+        self.assertTrue(response.data[0]["videoUrl"].endswith("@720"))
+
+    def test_requests_are_served_from_memory_with_etag(self, resolve):
+        etag = self.client.get(reverse('vast-ads'))["ETag"]
+        builds = resolve.call_count
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('vast-ads'))["ETag"], etag)
+            response = self.client.get(reverse('vast-ads'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(resolve.call_count, builds)
+
+    def test_if_none_match_compares_whole_tags(self, _):
+        etag = self.client.get(reverse('vast-ads'))["ETag"]
+        for header, status in (("*", 304), (f"W/{etag}", 304), (f'"other", {etag}', 304),
+                               (f'"x{etag}"', 200), ('"other"', 200)):
+            response = self.client.get(reverse('vast-ads'), HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, status, header)
+
+    def test_saving_ad_config_rebuilds(self, _):
+        with patch.object(assignments, 'rebuild_soon') as rebuild_soon:
+            with self.captureOnCommitCallbacks(execute=True):
+                AdConfig.objects.filter(screen="ad_screen_02").update(fallback_video_url="/ads/new.mp4")
+                AdConfig.objects.get(screen="ad_screen_02").save()
+        rebuild_soon.assert_called_once()
+
+        assignments.rebuild()
+        self.assertEqual(self.client.get(reverse('vast-ads')).data[1]["videoUrl"], "/ads/new.mp4")
+
+    def test_processes_share_published_snapshots(self, _):
+        rebuild_ad_assignments()
+        other = AssignmentTable()
+        with self.assertNumQueries(0):
+            self.assertEqual(other.current(), assignments.current())
@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import ActiveAdListView, VastAdListView
+from .views import ActiveAdListView, AdEventView, CreativeFileView, VastAdListView
 
 urlpatterns = [
     path('', VastAdListView.as_view(), name='vast-ads'),
     path('active/', ActiveAdListView.as_view(), name='active-ads'),
+    path('events/', AdEventView.as_view(), name='ad-events'),
+    path('creatives/<str:key>.mp4', CreativeFileView.as_view(), name='ad-creative'),
 ]
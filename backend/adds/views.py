@@ -1,52 +1,193 @@
+import os
+import re
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse, Http404
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views import View
 from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from .models import AdConfig
 from .serializers import AdConfigSerializer
-from .services.vastResolver import resolve_vast
+from . import config
+from .services.activeAds import active_ads
+from .services.adStats import ad_stats
+from .services.assignments import assignments
+from .services.mediaSelection import request_hint_bucket
+from .services.creativeCache import CHUNK_SIZE, creative_cache
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
 
 class ActiveAdListView(generics.ListAPIView):
+    """
+    Active script ads, served from ActiveAdsCache. Clients revalidate with
+    If-None-Match / If-Modified-Since and get a 304 while nothing changed.
+    """
     serializer_class = AdConfigSerializer
     permission_classes = [AllowAny]
+    # Anonymous endpoint: skip decoding whatever token the client sends
+    authentication_classes = []
 
     def get_queryset(self):
-        return AdConfig.objects.filter(is_active=True)
+        # Screen placements have no script
+        return AdConfig.objects.filter(is_active=True).exclude(script_content='')
+
+    def list(self, request, *args, **kwargs):
+        entry = active_ads.get()
+        if request.headers.get("If-None-Match"):
+            not_modified = _etag_matches(request, entry["etag"])
+        else:
+            since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+            not_modified = since is not None and since >= entry["last_modified"]
+
+        response = Response(status=304) if not_modified else Response(entry["data"])
+        response["ETag"] = entry["etag"]
+        response["Last-Modified"] = http_date(entry["last_modified"])
+        response["Cache-Control"] = "no-cache"
+        return response
 
 class VastAdListView(APIView):
+    """
+    Per-screen video assignments, served from the precomputed table (see
+    AssignmentTable) for the client's hint bucket. Clients revalidate with
+    If-None-Match and get a 304 while nothing changed.
+    """
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
-        # In a real app, you might fetch GAM tag URLs from the database (AdConfig).
-        # We will use public testing GAM VAST tags here, and static fallbacks for missing ones.
-        vast_tags = {
-            "ad_screen_01": "https://pubads.g.doubleclick.net/gampad/ads?sz=640x480&iu=/124319096/external/single_ad_samples&ciu_szs=300x250&impl=s&gdfp_req=1&env=vp&output=vast"
-        }
-        
-        static_fallbacks = {
-            "ad_screen_01": { "videoUrl": "/ads/ad1.mp4", "clickUrl": "https://example.com/1" },
-            "ad_screen_02": { "videoUrl": "/ads/ad2.mp4", "clickUrl": "https://example.com/2" },
-            "ad_screen_03": { "videoUrl": "/ads/ad3.mp4", "clickUrl": "https://example.com/3" },
-            "ad_screen_04": { "videoUrl": "/ads/ad4.mp4", "clickUrl": "https://example.com/4" },
-            "ad_screen_05": { "videoUrl": "/ads/ad5.mp4", "clickUrl": "https://example.com/5" },
-            "ad_screen_06": { "videoUrl": "/ads/ad6.mp4", "clickUrl": "https://example.com/6" }
-        }
+        etag, data = assignments.response(request_hint_bucket(request), request.build_absolute_uri('/'))
+        if _etag_matches(request, etag):
+            response = Response(status=304)
+        else:
+            response = Response(data)
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        response["Vary"] = "Viewport-Width, DPR, Downlink"
+        return response
+
+
+class AdEventView(APIView):
+    """
+    Accepts a batch of ad events and returns at once; counts are written
+    in bulk later (see AdStatsBuffer).
+
+    Body: {"events": [{"type": "impression" | "click", "screen", "creative"}]}
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request, *args, **kwargs):
+        events = request.data.get("events") if isinstance(request.data, dict) else None
+        if not isinstance(events, list) or len(events) > config.ADDS_STATS_MAX_BATCH:
+            return Response(
+                {"error": f"expected up to {config.ADDS_STATS_MAX_BATCH} events"}, status=400
+            )
 
-        screens = ["ad_screen_01", "ad_screen_02", "ad_screen_03", "ad_screen_04", "ad_screen_05", "ad_screen_06"]
-        assignments = []
+        valid = [
+            (event["type"], event["screen"], event["creative"])
+            for event in events
+            if isinstance(event, dict)
+            and isinstance(event.get("screen"), str) and 0 < len(event["screen"]) <= 50
+            and isinstance(event.get("creative"), str) and len(event["creative"]) <= 1000
+            and isinstance(event.get("type"), str)
+        ]
+        return Response({"accepted": ad_stats.record(valid)}, status=202)
+
+
+def _etag_matches(request, etag):
+    """
+    Whether If-None-Match lists `etag`: whole tags compared weakly (W/
+    ignored, as RFC 9110 requires for this header), "*" matching any.
+    """
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = parse_etags(header)
+    if tags == ["*"]:
+        return True
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in tags}
+
+
+def _byte_range(header, size):
+    """
+    (start, end) inclusive for a single-range `Range` header, None to send
+    the whole file, or raises ValueError if the range is unsatisfiable.
+    Multi-range requests are answered with the whole file.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _read(f, start, length):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class CreativeFileView(View):
+    """
+    Serves a creative from the local cache. Paths are content-addressed by
+    source URL, so responses may be cached for a year; the ETag still
+    changes if the file is ever downloaded again.
+    """
+
+    def get(self, request, key):
+        f = creative_cache.open(key)
+        if f is None:
+            raise Http404("Creative not cached")
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        etag = f'"{key}-{size:x}-{int(stat.st_mtime):x}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(stat.st_mtime),
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Accept-Ranges": "bytes",
+        }
 
-        for screen in screens:
-            ad_data = None
-            if screen in vast_tags:
-                ad_data = resolve_vast(vast_tags[screen])
-                
-            if not ad_data:
-                ad_data = static_fallbacks.get(screen)
+        if _etag_matches(request, etag):
+            f.close()
+            response = HttpResponseNotModified()
+            for name, value in headers.items():
+                response[name] = value
+            return response
 
-            assignments.append({
-                "screen": screen,
-                "videoUrl": ad_data["videoUrl"] if ad_data else "",
-                "clickUrl": ad_data["clickUrl"] if ad_data else ""
-            })
+        # A stale If-Range means the client's partial copy is outdated
+        if_range = request.headers.get("If-Range")
+        try:
+            byte_range = None if if_range and if_range != etag else _byte_range(request.headers.get("Range"), size)
+        except ValueError:
+            f.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
 
-        return Response(assignments)
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            _read(f, start, end - start + 1),
+            status=206 if byte_range else 200,
+            content_type="video/mp4",
+        )
+        for name, value in headers.items():
+            response[name] = value
+        response["Content-Length"] = str(end - start + 1)
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return response
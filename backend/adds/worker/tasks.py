@@ -0,0 +1,8 @@
+from celery import shared_task
+
+
+@shared_task(ignore_result=True)
+def rebuild_ad_assignments():
+    from adds.services.assignments import assignments
+
+    assignments.rebuild()
@@ -0,0 +1,15 @@
+from django.utils.module_loading import import_string
+
+from ecomeets import config
+from server.metrics import metrics
+
+
+def load_backend(conf):
+    """Build a backend from a {"BACKEND": dotted path, "CONFIG": kwargs} dict."""
+    backend_class = import_string(conf["BACKEND"])
+    return backend_class(**conf.get("CONFIG", {}))
+
+
+# Global singleton instance
+backend = load_backend(config.ECOMEETS_BACKEND)
+metrics.gauge('ecomeets.matchmaking', backend.stats)
@@ -0,0 +1,129 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ecomeets.matchmaking import Searcher
+from server.metrics import metrics
+
+BUCKET_SIZE_BOUNDS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class BaseMatchBackend:
+    """
+    Matchmaking and presence state shared by every EcoMeets consumer.
+
+    Implementations must make `claim_partner` and `relax` atomic: two
+    searchers racing for the same waiting user (possibly in different
+    worker processes) must never both get it.
+
+    Searchers are bucketed by optional attributes (see
+    `ecomeets.matchmaking.bucket_keys`); `attributes` is a dict such as
+    {"language": "en", "region": "eu", "kind": "guest"}.
+    """
+
+    # Presence
+
+    async def add_online(self, user_id, channel_name: str) -> None:
+        raise NotImplementedError
+
+    async def remove_online(self, user_id) -> None:
+        raise NotImplementedError
+
+    async def online_count(self) -> int:
+        raise NotImplementedError
+
+    async def online_channels(self) -> Dict[object, str]:
+        """user_id -> channel_name for every online user."""
+        raise NotImplementedError
+
+    async def refresh_online(self, user_ids: Iterable) -> None:
+        """Mark users as still connected (their worker is alive)."""
+
+    async def prune_online(self, max_age: float) -> List:
+        """
+        Drop users not refreshed for `max_age` seconds, e.g. those left
+        behind by a worker that died. Returns the removed user ids.
+        """
+        return []
+
+    async def claim_tick(self, name: str, interval: float) -> bool:
+        """
+        True if this process should run the periodic job `name` now.
+        Shared backends hand it to one process per interval.
+        """
+        return True
+
+    # Matchmaking
+
+    async def enqueue(self, user_id, channel_name: str, info: Optional[dict] = None,
+                      attributes: Optional[dict] = None) -> bool:
+        """Start searching; returns False if the user is already queued."""
+        raise NotImplementedError
+
+    async def cancel(self, user_id) -> bool:
+        raise NotImplementedError
+
+    async def is_searching(self, user_id) -> bool:
+        raise NotImplementedError
+
+    async def claim_partner(self, user_id, channel_name: str,
+                            attributes: Optional[dict] = None) -> Optional[Searcher]:
+        """
+        Atomically take the oldest online searcher other than `user_id`
+        from the arrival's strictest bucket and record the pair. Returns
+        None if nobody matching is waiting.
+        """
+        raise NotImplementedError
+
+    async def match_or_enqueue(self, user_id, channel_name: str, info: Optional[dict] = None,
+                               attributes: Optional[dict] = None) -> Optional[Searcher]:
+        """
+        `claim_partner`, falling back to `enqueue` when nobody is waiting.
+        Backends shared between processes must do both in one atomic step.
+        """
+        partner = await self.claim_partner(user_id, channel_name, attributes)
+        if partner is None:
+            await self.enqueue(user_id, channel_name, info, attributes)
+        return partner
+
+    async def reserve(self, user_id, attributes: Optional[dict] = None,
+                      hold: float = 0.0) -> Optional[Searcher]:
+        """
+        Like `claim_partner`, but the searcher is only held for `user_id`
+        (still in a call) instead of paired. A held searcher counts as
+        searching; it is paired by `take_reserved` or put back by
+        `release`. Shared backends release holds older than `hold`
+        seconds themselves, in case the holder's worker died.
+        """
+        return None
+
+    async def take_reserved(self, user_id, reserved_id) -> Optional[Searcher]:
+        """Pair `user_id` with its held searcher, if still online and held."""
+        return None
+
+    async def release(self, reserved_id) -> bool:
+        """Put a held searcher back at the front of the queue."""
+        return False
+
+    async def relax(self) -> List[Tuple[Searcher, Searcher, int]]:
+        """
+        Pair searchers whose wait now allows a wider bucket. Returns
+        (older, newer, level) for each pair made; both are out of the queue.
+        """
+        return []
+
+    async def partner_of(self, user_id) -> Optional[Tuple[object, str]]:
+        """(partner_id, partner channel) if the user is paired and the partner online."""
+        raise NotImplementedError
+
+    async def end_pair(self, user_id) -> Optional[object]:
+        """Dissolve the user's pair; returns the former partner id."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        """Cheap, I/O free numbers for the metrics endpoint."""
+        return {}
+
+    def observe_bucket_size(self, size: int) -> None:
+        metrics.histogram('ecomeets.bucket_size', BUCKET_SIZE_BOUNDS).observe(size)
@@ -0,0 +1,108 @@
+from ecomeets import config
+from ecomeets.backends.base import BaseMatchBackend
+from ecomeets.matchmaking import BucketedMatchQueue
+
+
+class LocalMatchBackend(BaseMatchBackend):
+    """
+    In-process backend: only users connected to this process can match.
+
+    Fine for development, tests and single-worker deployments. No method
+    awaits anything, so each call is atomic with respect to other
+    consumers on the event loop.
+    """
+
+    def __init__(
+        self,
+        relax_order=config.ECOMEETS_MATCH_RELAX_ORDER,
+        relax_step: float = config.ECOMEETS_MATCH_RELAX_STEP,
+    ):
+        self.queue = BucketedMatchQueue(relax_order, relax_step)
+        self.online = {}     # user_id -> channel_name
+        self.pairs = {}      # user_id -> partner user_id
+        self.held = {}       # user_id -> Searcher reserved as someone's next partner
+
+    async def add_online(self, user_id, channel_name):
+        self.online[user_id] = channel_name
+
+    async def remove_online(self, user_id):
+        self.online.pop(user_id, None)
+
+    async def online_count(self):
+        return len(self.online)
+
+    async def online_channels(self):
+        return dict(self.online)
+
+    async def enqueue(self, user_id, channel_name, info=None, attributes=None):
+        if not self.queue.enqueue(user_id, channel_name, info, attributes):
+            return False
+        key = self.queue.index[user_id].keys[0]
+        self.observe_bucket_size(self.queue.bucket_size(key))
+        return True
+
+    async def cancel(self, user_id):
+        return self.held.pop(user_id, None) is not None or self.queue.cancel(user_id)
+
+    async def is_searching(self, user_id):
+        return user_id in self.queue or user_id in self.held
+
+    async def claim_partner(self, user_id, channel_name, attributes=None):
+        partner = self.queue.claim(user_id, attributes, is_available=self.online.__contains__)
+        if partner:
+            self._pair(user_id, partner.user_id)
+        return partner
+
+    async def reserve(self, user_id, attributes=None, hold=0.0):
+        # Holds die with the process, so `hold` needs no enforcing here
+        searcher = self.queue.claim(user_id, attributes, is_available=self.online.__contains__)
+        if searcher:
+            self.held[searcher.user_id] = searcher
+        return searcher
+
+    async def take_reserved(self, user_id, reserved_id):
+        searcher = self.held.pop(reserved_id, None)
+        if searcher is None or reserved_id not in self.online:
+            return None
+        self._pair(user_id, reserved_id)
+        return searcher
+
+    async def release(self, reserved_id):
+        searcher = self.held.pop(reserved_id, None)
+        if searcher is None or reserved_id not in self.online:
+            return False
+        return self.queue.requeue(searcher)
+
+    async def relax(self):
+        matches = self.queue.relax(is_available=self.online.__contains__)
+        for older, newer, _ in matches:
+            self._pair(older.user_id, newer.user_id)
+        return matches
+
+    async def partner_of(self, user_id):
+        partner_id = self.pairs.get(user_id)
+        channel = self.online.get(partner_id)
+        return (partner_id, channel) if channel else None
+
+    async def end_pair(self, user_id):
+        partner_id = self.pairs.pop(user_id, None)
+        if partner_id is not None and self.pairs.get(partner_id) == user_id:
+            del self.pairs[partner_id]
+        return partner_id
+
+    def stats(self):
+        level0 = [size for key, size in self._bucket_sizes() if key.startswith("0:")]
+        return {
+            'searching': len(self.queue),
+            'buckets': len(level0),
+            'largest_bucket': max(level0, default=0),
+            'pairs': len(self.pairs) // 2,
+            'held': len(self.held),
+        }
+
+    def _bucket_sizes(self):
+        return ((key, len(bucket)) for key, bucket in self.queue.buckets.items())
+
+    def _pair(self, a, b):
+        self.pairs[a] = b
+        self.pairs[b] = a
@@ -0,0 +1,459 @@
+import json
+import time
+import uuid
+import asyncio
+
+import redis.asyncio as aioredis
+
+from ecomeets import config
+from ecomeets.backends.base import BaseMatchBackend
+from ecomeets.matchmaking import Searcher, bucket_keys
+
+# Searcher entries are "<token>|<payload json>" in the `searching` hash and
+# bucket lists hold "<token>|<user key>", with a fixed 32 character token.
+# A list item is live only while the searcher entry carries the same
+# token, so cancel is a hash delete and stale items are skipped at the
+# front of each bucket (or compacted once they outnumber live ones).
+# Reserved searchers move to the `held` hash (bare payload) with an
+# expiry in the `held_until` zset.
+#
+# KEYS: searching, waiting (zset of arrival times), online, pairs
+# ARGV[1]: key prefix, ARGV[2]: mode, then mode specific arguments
+
+MATCH = """
+local searching, waiting, online, pairs = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local prefix, mode = ARGV[1], ARGV[2]
+local sizes = prefix .. ':bucket_sizes'
+local held, held_until = prefix .. ':held', prefix .. ':held_until'
+
+local function entry_of(uid, token)
+    local entry = redis.call('HGET', searching, uid)
+    if entry and string.sub(entry, 1, 32) == token then
+        return entry
+    end
+    return nil
+end
+
+local function drop(uid)
+    local entry = redis.call('HGET', searching, uid)
+    if not entry then
+        return false
+    end
+    for _, key in ipairs(cjson.decode(string.sub(entry, 34)).keys) do
+        if redis.call('HINCRBY', sizes, key, -1) <= 0 then
+            redis.call('HDEL', sizes, key)
+        end
+    end
+    redis.call('HDEL', searching, uid)
+    redis.call('ZREM', waiting, uid)
+    return true
+end
+
+local function pair(a, b)
+    redis.call('HSET', pairs, a, b)
+    redis.call('HSET', pairs, b, a)
+end
+
+-- Oldest live searcher of a bucket other than `exclude`, if it arrived
+-- no later than `cutoff`. Offline searchers are dropped on the way.
+local function take_candidate(key, exclude, cutoff)
+    local bucket = prefix .. ':q:' .. key
+    while true do
+        local item = redis.call('LINDEX', bucket, 0)
+        if not item then
+            return nil
+        end
+        if entry_of(string.sub(item, 34), string.sub(item, 1, 32)) then
+            break
+        end
+        redis.call('LPOP', bucket)
+    end
+
+    local start = 0
+    while true do
+        local items = redis.call('LRANGE', bucket, start, start + 15)
+        if #items == 0 then
+            return nil
+        end
+        for _, item in ipairs(items) do
+            local uid = string.sub(item, 34)
+            local entry = uid ~= exclude and entry_of(uid, string.sub(item, 1, 32))
+            if entry then
+                if tonumber(redis.call('ZSCORE', waiting, uid)) > cutoff then
+                    return nil
+                end
+                drop(uid)
+                if redis.call('HEXISTS', online, uid) == 1 then
+                    return {uid, string.sub(entry, 34)}
+                end
+            end
+        end
+        start = start + 16
+    end
+end
+
+local function enqueue(uid, token, raw, front)
+    local payload = cjson.decode(raw)
+    redis.call('HSET', searching, uid, token .. '|' .. raw)
+    redis.call('ZADD', waiting, payload.at, uid)
+    for _, key in ipairs(payload.keys) do
+        local bucket = prefix .. ':q:' .. key
+        redis.call(front and 'LPUSH' or 'RPUSH', bucket, token .. '|' .. uid)
+        local size = redis.call('HINCRBY', sizes, key, 1)
+        if redis.call('LLEN', bucket) > 2 * size + 64 then
+            local items = redis.call('LRANGE', bucket, 0, -1)
+            redis.call('DEL', bucket)
+            for _, item in ipairs(items) do
+                if entry_of(string.sub(item, 34), string.sub(item, 1, 32)) then
+                    redis.call('RPUSH', bucket, item)
+                end
+            end
+        end
+    end
+    return tonumber(redis.call('HGET', sizes, payload.keys[1]))
+end
+
+-- Put a held searcher back at the front of its buckets
+local function release(uid, token)
+    local raw = redis.call('HGET', held, uid)
+    if not raw then
+        return 0
+    end
+    redis.call('HDEL', held, uid)
+    redis.call('ZREM', held_until, uid)
+    if redis.call('HEXISTS', online, uid) == 0 or redis.call('HEXISTS', searching, uid) == 1 then
+        return 0
+    end
+    enqueue(uid, token, raw, true)
+    return 1
+end
+
+if mode == 'cancel' then
+    local was_held = redis.call('HDEL', held, ARGV[3]) == 1
+    redis.call('ZREM', held_until, ARGV[3])
+    return (drop(ARGV[3]) or was_held) and 1 or 0
+end
+
+-- ARGV[3] user key, ARGV[4] token
+if mode == 'release' then
+    return release(ARGV[3], ARGV[4])
+end
+
+-- ARGV[3] holder key, ARGV[4] held user key
+if mode == 'take' then
+    local raw = redis.call('HGET', held, ARGV[4])
+    if not raw then
+        return false
+    end
+    redis.call('HDEL', held, ARGV[4])
+    redis.call('ZREM', held_until, ARGV[4])
+    if redis.call('HEXISTS', online, ARGV[4]) == 0 then
+        return false
+    end
+    pair(ARGV[3], ARGV[4])
+    return raw
+end
+
+if mode == 'relax' then
+    local now, step, levels = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+    -- Holds whose holder never came back (e.g. its worker died)
+    for _, uid in ipairs(redis.call('ZRANGEBYSCORE', held_until, '-inf', now)) do
+        release(uid, ARGV[7])
+    end
+    local last = tonumber(redis.call('GET', prefix .. ':relax_last') or ARGV[6])
+    redis.call('SET', prefix .. ':relax_last', ARGV[3])
+    local out = {}
+    for level = 1, levels - 1 do
+        local hi = now - level * step
+        local crossed = redis.call('ZRANGEBYSCORE', waiting, '(' .. (last - level * step), hi)
+        for _, uid in ipairs(crossed) do
+            local entry = redis.call('HGET', searching, uid)
+            if entry and redis.call('HEXISTS', online, uid) == 0 then
+                drop(uid)
+            elseif entry then
+                -- `uid` accepts this bucket now, whatever the other's wait
+                local keys = cjson.decode(string.sub(entry, 34)).keys
+                local found = take_candidate(keys[level + 1], uid, now)
+                if found then
+                    drop(uid)
+                    pair(found[1], uid)
+                    for _, value in ipairs({found[1], found[2], uid, string.sub(entry, 34), level}) do
+                        table.insert(out, value)
+                    end
+                end
+            end
+        end
+    end
+    return out
+end
+
+-- claim / reserve / enqueue / match_or_enqueue: ARGV[3] user key,
+-- ARGV[4] token, ARGV[5] payload json, ARGV[6] hold expiry (reserve),
+-- ARGV[7] relax step
+local uid = ARGV[3]
+if redis.call('HEXISTS', searching, uid) == 1 or redis.call('HEXISTS', held, uid) == 1 then
+    return {0, -1}
+end
+if mode ~= 'enqueue' then
+    local payload = cjson.decode(ARGV[5])
+    local step = tonumber(ARGV[7])
+    -- Strictest bucket first; a wider one only if its oldest searcher has
+    -- waited long enough to accept the newcomer there
+    local found
+    for level = 0, #payload.keys - 1 do
+        found = take_candidate(payload.keys[level + 1], uid, payload.at - level * step)
+        if found then
+            break
+        end
+    end
+    if found and mode == 'reserve' then
+        redis.call('HSET', held, found[1], found[2])
+        redis.call('ZADD', held_until, ARGV[6], found[1])
+        return {1, found[1], found[2]}
+    elseif found then
+        pair(uid, found[1])
+        return {1, found[1], found[2]}
+    end
+end
+if mode == 'reserve' then
+    return {0, 0}
+end
+if mode ~= 'claim' then
+    return {0, enqueue(uid, ARGV[4], ARGV[5])}
+end
+return {0, 0}
+"""
+
+END_PAIR = """
+local partner = redis.call('HGET', KEYS[1], ARGV[1])
+if not partner then
+    return false
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+if redis.call('HGET', KEYS[1], partner) == ARGV[1] then
+    redis.call('HDEL', KEYS[1], partner)
+end
+return partner
+"""
+
+PARTNER_OF = """
+local partner = redis.call('HGET', KEYS[1], ARGV[1])
+if not partner then
+    return false
+end
+local channel = redis.call('HGET', KEYS[2], partner)
+if not channel then
+    return false
+end
+return {partner, channel}
+"""
+
+PRUNE_ONLINE = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, uid in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], uid)
+    redis.call('HDEL', KEYS[2], uid)
+end
+return expired
+"""
+
+
+class RedisMatchBackend(BaseMatchBackend):
+    """
+    Matchmaking and presence in Redis, shared by every worker process.
+
+    Queue claims, relaxation and pair changes run as Lua scripts, so they
+    are atomic across processes. User ids are stored JSON-encoded to keep
+    int (signed-in) and str (guest) ids apart. Bucket lists are addressed
+    from inside the scripts, so this needs a single (non-cluster) Redis.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "eco2.meets",
+        relax_order=config.ECOMEETS_MATCH_RELAX_ORDER,
+        relax_step: float = config.ECOMEETS_MATCH_RELAX_STEP,
+        client=None,
+    ):
+        self.url = url
+        self.prefix = prefix
+        self.relax_order = tuple(relax_order)
+        self.relax_step = relax_step
+        self._redis = client
+        self._fixed_client = client is not None
+        self._loop = None
+        self._scripts = {}
+
+    def _key(self, name):
+        return f"{self.prefix}:{name}"
+
+    def _client(self):
+        # redis.asyncio connections are bound to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._redis is None or (not self._fixed_client and self._loop is not loop):
+            self._redis = aioredis.from_url(self.url)
+            self._scripts = {}
+        self._loop = loop
+        if not self._scripts:
+            self._scripts = {
+                "match": self._redis.register_script(MATCH),
+                "end_pair": self._redis.register_script(END_PAIR),
+                "partner_of": self._redis.register_script(PARTNER_OF),
+                "prune_online": self._redis.register_script(PRUNE_ONLINE),
+            }
+        return self._redis
+
+    # Presence
+
+    async def add_online(self, user_id, channel_name):
+        key = json.dumps(user_id)
+        async with self._client().pipeline(transaction=True) as pipe:
+            pipe.hset(self._key("online"), key, channel_name)
+            pipe.zadd(self._key("seen"), {key: time.time()})
+            await pipe.execute()
+
+    async def remove_online(self, user_id):
+        key = json.dumps(user_id)
+        async with self._client().pipeline(transaction=True) as pipe:
+            pipe.hdel(self._key("online"), key)
+            pipe.zrem(self._key("seen"), key)
+            await pipe.execute()
+
+    async def online_count(self):
+        return await self._client().hlen(self._key("online"))
+
+    async def online_channels(self):
+        raw = await self._client().hgetall(self._key("online"))
+        return {json.loads(uid): channel.decode() for uid, channel in raw.items()}
+
+    async def refresh_online(self, user_ids):
+        now = time.time()
+        mapping = {json.dumps(user_id): now for user_id in user_ids}
+        if mapping:
+            await self._client().zadd(self._key("seen"), mapping, xx=True)
+
+    async def prune_online(self, max_age):
+        self._client()
+        expired = await self._scripts["prune_online"](
+            keys=[self._key("seen"), self._key("online")],
+            args=[time.time() - max_age],
+        )
+        return [json.loads(uid) for uid in expired]
+
+    async def claim_tick(self, name, interval):
+        # Whoever sets the key first owns this interval
+        return bool(await self._client().set(
+            self._key(f"tick:{name}"), 1, nx=True, px=max(int(interval * 1000), 1),
+        ))
+
+    # Matchmaking
+
+    async def _match(self, mode, *args):
+        self._client()
+        return await self._scripts["match"](
+            keys=[self._key("searching"), self._key("waiting"), self._key("online"), self._key("pairs")],
+            args=[self.prefix, mode, *args],
+        )
+
+    async def _search(self, mode, user_id, channel_name, info, attributes):
+        payload = json.dumps({
+            "channel": channel_name,
+            "info": info or {},
+            "keys": bucket_keys(attributes, self.relax_order),
+            "at": time.time(),
+        })
+        result = await self._match(mode, json.dumps(user_id), uuid.uuid4().hex, payload, 0, self.relax_step)
+        if result[0] == 1:
+            return self._searcher(result[1], result[2]), None
+        return None, result[1]
+
+    async def enqueue(self, user_id, channel_name, info=None, attributes=None):
+        _, bucket_size = await self._search("enqueue", user_id, channel_name, info, attributes)
+        if bucket_size < 0:
+            return False
+        self.observe_bucket_size(bucket_size)
+        return True
+
+    async def cancel(self, user_id):
+        return bool(await self._match("cancel", json.dumps(user_id)))
+
+    async def is_searching(self, user_id):
+        key = json.dumps(user_id)
+        async with self._client().pipeline(transaction=False) as pipe:
+            pipe.hexists(self._key("searching"), key)
+            pipe.hexists(self._key("held"), key)
+            return any(await pipe.execute())
+
+    async def claim_partner(self, user_id, channel_name, attributes=None):
+        partner, _ = await self._search("claim", user_id, channel_name, None, attributes)
+        return partner
+
+    async def match_or_enqueue(self, user_id, channel_name, info=None, attributes=None):
+        partner, bucket_size = await self._search(
+            "match_or_enqueue", user_id, channel_name, info, attributes,
+        )
+        if partner is None and bucket_size >= 0:
+            self.observe_bucket_size(bucket_size)
+        return partner
+
+    async def reserve(self, user_id, attributes=None, hold=0.0):
+        payload = json.dumps({
+            "channel": "", "info": {},
+            "keys": bucket_keys(attributes, self.relax_order),
+            "at": time.time(),
+        })
+        # Released by the holder long before this; a safety net only
+        result = await self._match(
+            "reserve", json.dumps(user_id), uuid.uuid4().hex, payload, time.time() + 2 * hold,
+            self.relax_step,
+        )
+        return self._searcher(result[1], result[2]) if result[0] == 1 else None
+
+    async def take_reserved(self, user_id, reserved_id):
+        raw = await self._match("take", json.dumps(user_id), json.dumps(reserved_id))
+        return self._searcher(json.dumps(reserved_id), raw) if raw else None
+
+    async def release(self, reserved_id):
+        return bool(await self._match("release", json.dumps(reserved_id), uuid.uuid4().hex))
+
+    async def relax(self):
+        now = time.time()
+        # On the very first run every waiting searcher is considered
+        flat = await self._match(
+            "relax", now, self.relax_step, len(self.relax_order) + 1, 0, uuid.uuid4().hex,
+        )
+        matches = []
+        for i in range(0, len(flat), 5):
+            pair = (self._searcher(flat[i], flat[i + 1]), self._searcher(flat[i + 2], flat[i + 3]))
+            older, newer = sorted(pair, key=lambda s: s.enqueued_at)
+            matches.append((older, newer, int(flat[i + 4])))
+        return matches
+
+    async def partner_of(self, user_id):
+        self._client()
+        found = await self._scripts["partner_of"](
+            keys=[self._key("pairs"), self._key("online")],
+            args=[json.dumps(user_id)],
+        )
+        return (json.loads(found[0]), found[1].decode()) if found else None
+
+    async def end_pair(self, user_id):
+        self._client()
+        partner = await self._scripts["end_pair"](
+            keys=[self._key("pairs")],
+            args=[json.dumps(user_id)],
+        )
+        return json.loads(partner) if partner else None
+
+    def _searcher(self, user_key, payload):
+        payload = json.loads(payload)
+        return Searcher(
+            json.loads(user_key), payload["channel"], payload["info"],
+            keys=tuple(payload["keys"]), enqueued_at=payload["at"],
+        )
+
+    async def close(self):
+        if self._redis is not None and not self._fixed_client:
+            await self._redis.close()
+            self._redis = None
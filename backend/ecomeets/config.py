@@ -0,0 +1,43 @@
+from django.conf import settings
+
+# Flood control: token bucket per connection, in messages/second.
+# ICE trickle sends a few dozen candidates per call setup, so the burst
+# must cover a whole negotiation.
+ECOMEETS_FLOOD_RATE = getattr(settings, 'ECOMEETS_FLOOD_RATE', 20)
+ECOMEETS_FLOOD_BURST = getattr(settings, 'ECOMEETS_FLOOD_BURST', 80)
+
+# Matchmaking / presence backend, same shape as CHANNEL_LAYERS["default"]
+ECOMEETS_BACKEND = getattr(settings, 'ECOMEETS_BACKEND', {
+    "BACKEND": "ecomeets.backends.local.LocalMatchBackend",
+})
+
+# Matchmaking buckets. find_match may carry optional "criteria"
+# (language, region); "kind" (guest / user) is set by the server. After
+# each RELAX_STEP seconds of waiting, the next attribute in RELAX_ORDER
+# stops mattering, until anyone can match.
+ECOMEETS_MATCH_RELAX_ORDER = getattr(settings, 'ECOMEETS_MATCH_RELAX_ORDER', ('kind', 'region', 'language'))
+ECOMEETS_MATCH_RELAX_STEP = getattr(settings, 'ECOMEETS_MATCH_RELAX_STEP', 5.0)
+ECOMEETS_MATCH_RELAX_TICK = getattr(settings, 'ECOMEETS_MATCH_RELAX_TICK', 0.5)
+
+# Online count: published to one group on a fixed tick, only when changed
+ECOMEETS_ONLINE_GROUP = getattr(settings, 'ECOMEETS_ONLINE_GROUP', 'ecomeets_online')
+ECOMEETS_ONLINE_TICK = getattr(settings, 'ECOMEETS_ONLINE_TICK', 1.0)
+
+# Presence entries not refreshed by their worker for this long are pruned
+ECOMEETS_PRESENCE_TTL = getattr(settings, 'ECOMEETS_PRESENCE_TTL', 30.0)
+
+# ICE trickle batching: candidates relayed within WINDOW seconds of each
+# other share one channel layer message (and one frame for clients that
+# negotiated "ice_batch"), at most BATCH_MAX per message
+ECOMEETS_ICE_BATCH_WINDOW = getattr(settings, 'ECOMEETS_ICE_BATCH_WINDOW', 0.01)
+ECOMEETS_ICE_BATCH_MAX = getattr(settings, 'ECOMEETS_ICE_BATCH_MAX', 64)
+
+# Heartbeats (clients that negotiate "heartbeat"): the client sends
+# something at least every INTERVAL seconds; after TIMEOUT seconds of
+# silence it is dropped from the queue and its socket closed
+ECOMEETS_HEARTBEAT_INTERVAL = getattr(settings, 'ECOMEETS_HEARTBEAT_INTERVAL', 15.0)
+ECOMEETS_HEARTBEAT_TIMEOUT = getattr(settings, 'ECOMEETS_HEARTBEAT_TIMEOUT', 45.0)
+
+# "Next partner" fast path: a user in a call may hold the next searcher
+# (reserve_next) for this many seconds before it goes back to the queue
+ECOMEETS_NEXT_HOLD = getattr(settings, 'ECOMEETS_NEXT_HOLD', 10.0)
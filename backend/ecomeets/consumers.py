@@ -1,74 +1,98 @@
 import json
-import random
-from asgiref.sync import async_to_sync
-from channels.generic.websocket import WebsocketConsumer
+import uuid
+import asyncio
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
-import uuid 
+from ecomeets import config
+from ecomeets.backends import backend
+from ecomeets.presence import online_ticker
+from ecomeets.relaxer import relaxer, observe_match
+from ecomeets.heartbeat import heartbeats
+from ecomeets.signalling import CandidateBatcher, HEARTBEAT, ICE_BATCH, matched_event, negotiate
+from server.metrics import metrics
+from server.flood_control import FloodController, FloodPolicy, COALESCE, DROP
+from Project.logging import get_logger
 
 User = get_user_model()
-
-
-class EcoMeetsConsumer(WebsocketConsumer):
-    _waiting_queue = []        # list of (user_id, channel_name, user_info)
-    _active_pairs = {}         # user_id → partner_channel_name
-    _user_channels = {}        # user_id → channel_name
-    _online_users = set()      # set of user_ids
+logger = get_logger(__name__)
+
+ECOMEETS_FLOOD_POLICY = FloodPolicy(
+    name='ecomeets',
+    connection_rate=config.ECOMEETS_FLOOD_RATE,
+    connection_burst=config.ECOMEETS_FLOOD_BURST,
+    coalesce_types=frozenset({'media_state'}),
+    # Candidates arrive in bursts at call setup; losing one can fail the call
+    protected_types=frozenset({
+        'auth', 'auth_guest', 'find_match', 'cancel_search',
+        'offer', 'answer', 'endcall', 'reserve_next',
+        'ice_candidate', 'ice_candidates',
+    }),
+)
+
+
+class EcoMeetsConsumer(AsyncWebsocketConsumer):
+    # Queue, pairs and presence live in the shared backend
+    # (ECOMEETS_BACKEND) so users on different workers can match.
 
     # Connection lifecycle
-    def connect(self):
-        self.accept()
+    async def connect(self):
+        await self.accept()
         self.user = None
         self.user_id = None
         self.user_name = None
         self.is_authenticated = False
         self.partner_id = None
         self.partner_channel = None
+        # The pair registry had no route for us; trust that until the next
+        # matched / endcall instead of asking again on every signal
+        self.route_missed = False
         self.role = None
+        self.flood = FloodController(ECOMEETS_FLOOD_POLICY)
+        self._flush_task = None
+        self.capabilities = []
+        self.ice = CandidateBatcher(self._relay_candidates)
+        self.reserved = None
+        self._release_task = None
+
+    # Disconnect
+    async def disconnect(self, code):
+        logger.info("disconnect", "Disconnect called", user=self.user_id, code=code)
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.flood.close()
+        self.ice.close()
 
-    # Disconnect 
-    def disconnect(self, code):
-        print(f"[EcoMeets] Disconnect called: user_id={self.user_id}")
-    
         if self.user_id is None:
             return
-    
-        # Wrap this in try/except — channel may already be dead
-        if self.partner_channel:
+
+        partner_channel = self.partner_channel
+        relaxer.untrack(self.user_id)
+        heartbeats.forget(self.user_id)
+        try:
+            await self._release_reserved()
+            await online_ticker.unsubscribe(self.channel_layer, self.user_id, self.channel_name)
+            await backend.end_pair(self.user_id)
+            await backend.cancel(self.user_id)
+            await backend.remove_online(self.user_id)
+        except Exception as e:
+            logger.warning("backend_error", "Could not clean up user", user=self.user_id, error=str(e))
+
+        # Channel may already be dead
+        if partner_channel:
             try:
-                self._send_to_channel(self.partner_channel, {
+                await self._send_to_channel(partner_channel, {
                     "typeof": "partner_disconnected",
+                    "from": self.user_id,
                 })
             except Exception as e:
-                print(f"[EcoMeets] Could not notify partner: {e}")
-            
-            if self.partner_id in self._active_pairs:
-                del self._active_pairs[self.partner_id]
-    
-        if self.user_id in self._active_pairs:
-            del self._active_pairs[self.user_id]
-    
-        self._waiting_queue[:] = [
-            entry for entry in self._waiting_queue
-            if entry[0] != self.user_id
-        ]
-    
-        # These MUST always run — put them in finally-style block
-        self._online_users.discard(self.user_id)
-        self._user_channels.pop(self.user_id, None)
-        
-        print(f"[EcoMeets] Online count after cleanup: {len(self._online_users)}")
-    
-        # Wrap broadcast too — it iterates dead channels
-        try:
-            self._broadcast_online_count()
-        except Exception as e:
-            print(f"[EcoMeets] Broadcast failed: {e}")
+                logger.warning("send_failed", "Could not notify partner", user=self.user_id, partner=self.partner_id, error=str(e))
 
-    
     # Receive
-    def receive(self, text_data=None, bytes_data=None):
+    async def receive(self, text_data=None, bytes_data=None):
         if not text_data:
             return
 
@@ -77,55 +101,68 @@ class EcoMeetsConsumer(WebsocketConsumer):
 
         # Auth phase
         if not self.is_authenticated:
+            self.capabilities = negotiate(data.get("capabilities"))
             if typeof == "auth":
-                if self._authenticate_jwt(data.get("token")):
-                    self._finish_auth()
+                if await self._authenticate_jwt(data.get("token")):
+                    await self._finish_auth()
                 else:
-                    self._send_json({"typeof": "auth_error", "error": "Invalid token"})
-                    self.close()
+                    await self._send_json({"typeof": "auth_error", "error": "Invalid token"})
+                    await self.close()
             elif typeof == "auth_guest":
                 self._authenticate_guest(data.get("name", "Guest"))
-                self._finish_auth()
+                await self._finish_auth()
             else:
-                self._send_json({"typeof": "auth_error", "error": "Auth required"})
-                self.close()
+                await self._send_json({"typeof": "auth_error", "error": "Auth required"})
+                await self.close()
             return
 
         # Signaling phase
+        if HEARTBEAT in self.capabilities:
+            heartbeats.touch(self.channel_layer, self.user_id, self.channel_name)
+
+        decision = self.flood.check(typeof)
+        if decision == COALESCE:
+            self.flood.stash(typeof, data)
+            self._schedule_flush()
+            return
+        if decision == DROP:
+            return
+
+        await self._dispatch(typeof, data)
+
+    async def _dispatch(self, typeof, data):
+        if typeof in ("ice_candidate", "ice_candidates"):
+            await self._handle_ice(typeof, data)
+            return
+        # Anything else the client sends must not overtake its candidates
+        if self.ice.pending:
+            await self.ice.flush()
 
         if typeof == "find_match":
-            self._handle_find_match()
+            await self._handle_find_match(data)
 
         elif typeof == "cancel_search":
-            self._handle_cancel_search()
+            await self._handle_cancel_search()
 
         elif typeof == "offer":
-            if self.partner_channel:
-                self._send_to_channel(self.partner_channel, {
+            if await self._route():
+                await self._send_to_channel(self.partner_channel, {
                     "typeof": "offer",
                     "offer": data["offer"],
                     "from": self.user_id,
                 })
 
         elif typeof == "answer":
-            if self.partner_channel:
-                self._send_to_channel(self.partner_channel, {
+            if await self._route():
+                await self._send_to_channel(self.partner_channel, {
                     "typeof": "answer",
                     "answer": data["answer"],
                     "from": self.user_id,
                 })
 
-        elif typeof == "ice_candidate":
-            if self.partner_channel:
-                self._send_to_channel(self.partner_channel, {
-                    "typeof": "ice_candidate",
-                    "candidate": data["candidate"],
-                    "from": self.user_id,
-                })
-
         elif typeof == "media_state":
-            if self.partner_channel:
-                self._send_to_channel(self.partner_channel, {
+            if await self._route():
+                await self._send_to_channel(self.partner_channel, {
                     "typeof": "media_state",
                     "audioMuted": data.get("audioMuted", False),
                     "videoOff": data.get("videoOff", False),
@@ -133,156 +170,270 @@ class EcoMeetsConsumer(WebsocketConsumer):
                 })
 
         elif typeof == "endcall":
-            self._handle_endcall()
+            await self._handle_endcall()
+            if data.get("next"):
+                await self._handle_next(data)
+            else:
+                await self._release_reserved()
 
-    # Matching logic
+        elif typeof == "reserve_next":
+            await self._handle_reserve_next(data)
 
-    def _handle_find_match(self):
-        if any(entry[0] == self.user_id for entry in self._waiting_queue):
-            return
+        # "heartbeat" needs no handling: any message refreshes the deadline
 
-        if self._waiting_queue:
-            partner_id, partner_channel, partner_info = self._waiting_queue.pop(0)
+    # ICE trickle
 
-            if partner_id not in self._online_users:
-                self._handle_find_match()
+    async def _handle_ice(self, typeof, data):
+        """Accept single (older clients) or batched candidates."""
+        if not await self._route():
+            return
+        if typeof == "ice_candidate":
+            candidates = [data["candidate"]]
+        else:
+            candidates = data.get("candidates")
+            if not isinstance(candidates, list):
                 return
+            candidates = candidates[:self.ice.max_batch]
+        await self.ice.add(candidates)
+
+    async def _relay_candidates(self, candidates):
+        if self.partner_channel:
+            await self._send_to_channel(self.partner_channel, {
+                "typeof": "ice_candidates",
+                "candidates": candidates,
+                "from": self.user_id,
+            })
 
-            self.partner_id = partner_id
-            self.partner_channel = partner_channel
-            self.role = "answerer"
+    # Flood control
 
-            self._active_pairs[partner_id] = self.channel_name
-            self._active_pairs[self.user_id] = partner_channel
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_coalesced())
 
-            self._user_channels[self.user_id] = self.channel_name
+    async def _flush_coalesced(self):
+        """Send the latest value of each coalesced type once budget allows."""
+        while self.flood.pending:
+            try:
+                await asyncio.sleep(self.flood.pending_delay())
+                for data in self.flood.take_pending():
+                    await self._dispatch(data.get("type") or data.get("typeof"), data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Nothing awaits this task, so report here rather than lose it
+                logger.exception("flood_flush_error", "Error flushing coalesced messages", user=self.user_id)
 
-            self._send_to_channel(partner_channel, {
-                "typeof": "matched",
-                "role": "offerer",
-                "partnerId": self.user_id,
-                "partnerName": self.user_name,
-            })
+    # Matching logic
 
-            self._send_json({
-                "typeof": "matched",
-                "role": "answerer",
-                "partnerId": partner_id,
-                "partnerName": partner_info.get("name", "Unknown"),
-            })
+    async def _handle_find_match(self, data):
+        if await backend.is_searching(self.user_id):
+            return
+        self.route_missed = False
+
+        partner = await backend.match_or_enqueue(
+            self.user_id, self.channel_name, {"name": self.user_name},
+            attributes=self._match_attributes(data),
+        )
+        if partner:
+            await self._start_call(partner)
+        else:
+            relaxer.track(self.channel_layer, self.user_id)
+            await self._send_json({"typeof": "waiting", "message": "Looking for a partner…"})
+            logger.info("queued", "Added to queue", user=self.user_id)
+
+    async def _route(self):
+        """
+        The partner's channel. Normally set by "matched"; if a signal
+        beats it here, the pair registry already knows the route.
+        """
+        if self.partner_channel is None and not self.route_missed:
+            partner = await backend.partner_of(self.user_id)
+            if partner:
+                self.partner_id, self.partner_channel = partner
+            else:
+                self.route_missed = True
+        return self.partner_channel
+
+    async def _start_call(self, partner):
+        """We just claimed `partner` (a waiting searcher); it offers."""
+        observe_match(partner, level=0)
+        partner_id, partner_channel = partner.user_id, partner.channel_name
+
+        self.partner_id = partner_id
+        self.partner_channel = partner_channel
+        self.route_missed = False
+        self.role = "answerer"
+
+        # Routing travels with "matched", so the offer cannot outrun it
+        await self.channel_layer.send(partner_channel, matched_event(
+            self.user_id, self.channel_name, self.user_name, "offerer",
+        ))
+
+        await self._send_json({
+            "typeof": "matched",
+            "role": "answerer",
+            "partnerId": partner_id,
+            "partnerName": partner.info.get("name", "Unknown"),
+        })
 
-            self._send_to_channel(partner_channel, {
-                "typeof": "_internal_set_partner",
-                "partner_id": self.user_id,
-                "partner_channel": self.channel_name,
-            })
+        logger.info("match", "Matched", offerer=partner_id, answerer=self.user_id)
+
+    def _match_attributes(self, data):
+        criteria = data.get("criteria")
+        attributes = dict(criteria) if isinstance(criteria, dict) else {}
+        attributes["kind"] = "user" if self.user else "guest"
+        return attributes
+
+    async def _handle_cancel_search(self):
+        relaxer.untrack(self.user_id)
+        await backend.cancel(self.user_id)
+        await self._send_json({"typeof": "search_cancelled"})
 
-            print(f"[EcoMeets] Matched: {partner_info.get('name')} (offerer) <-> {self.user_name} (answerer)")
+    # Next partner fast path
+
+    async def _handle_reserve_next(self, data):
+        """Hold the next searcher while this call is still going."""
+        # The pair registry, not our cached route, knows whether the call
+        # is still going; never hold someone for a call that has ended
+        if self.reserved or not await backend.partner_of(self.user_id):
+            return
+        self.reserved = await backend.reserve(
+            self.user_id, self._match_attributes(data), hold=config.ECOMEETS_NEXT_HOLD,
+        )
+        metrics.counter('ecomeets.next_reserved', found=str(bool(self.reserved)).lower()).inc()
+        if self.reserved:
+            self._release_task = asyncio.create_task(self._release_later())
+        await self._send_json({"typeof": "next_reserved", "found": bool(self.reserved)})
+
+    async def _handle_next(self, data):
+        """endcall + next: pair with the held searcher, else search as usual."""
+        reserved = self._take_reservation()
+        partner = reserved and await backend.take_reserved(self.user_id, reserved.user_id)
+        if partner:
+            metrics.counter('ecomeets.next_used').inc()
+            await self._start_call(partner)
         else:
-            self._waiting_queue.append((
-                self.user_id,
-                self.channel_name,
-                {"name": self.user_name},
-            ))
-            self._send_json({"typeof": "waiting", "message": "Looking for a partner…"})
-            print(f"[EcoMeets] {self.user_name} added to queue (queue size: {len(self._waiting_queue)})")
-
-    def _handle_cancel_search(self):
-        self._waiting_queue[:] = [
-            entry for entry in self._waiting_queue
-            if entry[0] != self.user_id
-        ]
-        self._send_json({"typeof": "search_cancelled"})
-
-    def _handle_endcall(self):
-        if self.partner_channel:
-            self._send_to_channel(self.partner_channel, {
+            await self._handle_find_match(data)
+
+    def _take_reservation(self):
+        reserved, self.reserved = self.reserved, None
+        if self._release_task:
+            self._release_task.cancel()
+            self._release_task = None
+        return reserved
+
+    async def _release_reserved(self):
+        reserved = self._take_reservation()
+        if reserved and await backend.release(reserved.user_id):
+            metrics.counter('ecomeets.next_released').inc()
+
+    async def _release_later(self):
+        await asyncio.sleep(config.ECOMEETS_NEXT_HOLD)
+        self._release_task = None
+        await self._release_reserved()
+
+    async def _handle_endcall(self):
+        partner_channel = self.partner_channel
+        await backend.end_pair(self.user_id)
+        self._forget_partner()
+
+        if partner_channel:
+            await self._send_to_channel(partner_channel, {
                 "typeof": "endcall",
                 "from": self.user_id,
             })
 
-        if self.partner_id and self.partner_id in self._active_pairs:
-            del self._active_pairs[self.partner_id]
-        if self.user_id in self._active_pairs:
-            del self._active_pairs[self.user_id]
-
+    def _forget_partner(self):
         self.partner_id = None
         self.partner_channel = None
+        self.route_missed = False
         self.role = None
 
     # Auth helpers
 
-    def _authenticate_jwt(self, token):
+    async def _authenticate_jwt(self, token):
         if not token:
             return False
         try:
             access_token = AccessToken(token)
-            user = User.objects.get(id=access_token["user_id"])
+            user = await sync_to_async(User.objects.get)(id=access_token["user_id"])
             self.user = user
             self.user_id = user.id
             self.user_name = user.username
             return True
         except (TokenError, InvalidToken, User.DoesNotExist) as e:
-            print(f"[EcoMeets] Auth error: {e}")
+            logger.warning("auth_error", str(e))
             return False
 
     def _authenticate_guest(self, name):
         self.user_id = str(uuid.uuid4())
         self.user_name = f"Guest_{name}_{self.user_id}"
 
-    def _finish_auth(self):
+    async def _finish_auth(self):
         self.is_authenticated = True
-        self._online_users.add(self.user_id)
-        self._user_channels[self.user_id] = self.channel_name
+        await backend.add_online(self.user_id, self.channel_name)
+        await online_ticker.subscribe(self.channel_layer, self.user_id, self.channel_name)
 
-        self._send_json({
+        welcome = {
             "typeof": "welcome",
             "userId": self.user_id,
             "username": self.user_name,
-        })
-        self._broadcast_online_count()
-        print(f"[EcoMeets] Authenticated: {self.user_name} (id={self.user_id})")
+            "capabilities": self.capabilities,
+        }
+        if HEARTBEAT in self.capabilities:
+            heartbeats.touch(self.channel_layer, self.user_id, self.channel_name)
+            welcome["heartbeatInterval"] = config.ECOMEETS_HEARTBEAT_INTERVAL
+        await self._send_json(welcome)
+        # Everyone else learns about the new user on the next tick
+        await self._send_json({"typeof": "online_count", "count": await backend.online_count()})
+        logger.info("auth", "Authenticated", user=self.user_id, name=self.user_name)
 
     # Channel messaging helpers
 
-    def _send_json(self, data):
-        self.send(text_data=json.dumps(data))
+    async def _send_json(self, data):
+        await self.send(text_data=json.dumps(data))
 
-    def _send_to_channel(self, channel_name, data):
+    async def _send_to_channel(self, channel_name, data):
         """Send a message to a specific channel (point-to-point, no broadcast)."""
-        async_to_sync(self.channel_layer.send)(channel_name, {
+        await self.channel_layer.send(channel_name, {
             "type": "direct.message",
             "data": data,
         })
 
-    def direct_message(self, event):
+    async def heartbeat_expired(self, event):
+        """The sweeper gave up on this connection; disconnect() cleans up."""
+        await self.close(code=4008)
+
+    async def direct_message(self, event):
         """Handler for point-to-point messages from channel layer."""
         data = event["data"]
 
-        if data.get("typeof") == "_internal_set_partner":
-            self.partner_id = data["partner_id"]
-            self.partner_channel = data["partner_channel"]
-            self.role = "offerer"
+        route = event.get("route")
+        if route:
+            self.partner_id = route["partner_id"]
+            self.partner_channel = route["partner_channel"]
+            self.route_missed = False
+            self.role = route["role"]
+            relaxer.untrack(self.user_id)
+
+        # Signals still in flight from an earlier partner (after endcall +
+        # next) must not reach the client, which would apply them to the
+        # current call
+        if "from" in data and data["from"] != self.partner_id:
+            metrics.counter('ecomeets.stale_signals', type=str(data.get("typeof"))).inc()
             return
-
-        self.send(text_data=json.dumps(data))
-
-    def _broadcast_online_count(self):
-        count = len(self._online_users)
-        dead_users = []
-        
-        for uid, ch in list(self._user_channels.items()):
-            try:
-                async_to_sync(self.channel_layer.send)(ch, {
-                    "type": "direct.message",
-                    "data": {"typeof": "online_count", "count": count},
+        if data.get("typeof") in ("endcall", "partner_disconnected"):
+            # The cached route is stale now; _route asks the registry again
+            self._forget_partner()
+
+        if data.get("typeof") == "ice_candidates" and ICE_BATCH not in self.capabilities:
+            # Older clients only understand one candidate per frame
+            for candidate in data["candidates"]:
+                await self._send_json({
+                    "typeof": "ice_candidate",
+                    "candidate": candidate,
+                    "from": data["from"],
                 })
-            except Exception:
-                # Channel is dead — mark for removal
-                dead_users.append(uid)
-        
-        # Clean up dead channels discovered during broadcast
-        for uid in dead_users:
-            print(f"[EcoMeets] Removing dead channel for user {uid}")
-            self._online_users.discard(uid)
-            self._user_channels.pop(uid, None)
+            return
+
+        await self.send(text_data=json.dumps(data))
@@ -0,0 +1,88 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from ecomeets import config
+from ecomeets.backends import backend
+from ecomeets.relaxer import relaxer
+from server.metrics import metrics
+from Project.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class HeartbeatSweeper:
+    """
+    Evicts connections that stopped sending anything for `timeout` seconds.
+
+    Every deadline is "last message + timeout", so touching a user moves
+    it to the back of an ordered dict and the front always holds the
+    earliest deadline. The sweeper sleeps until that deadline and pops
+    expired entries from the front: O(1) per message, O(expired) per
+    sweep, however many users are connected.
+
+    Evicted users leave the match queue at once; their consumer is then
+    told to close the socket, which runs the usual disconnect cleanup
+    (pair, presence, partner notification).
+    """
+
+    def __init__(
+        self,
+        timeout: float = config.ECOMEETS_HEARTBEAT_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.timeout = timeout
+        self.clock = clock
+        self.deadlines: "OrderedDict[object, Tuple[float, str]]" = OrderedDict()
+        self._layer = None
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, layer, user_id, channel_name: str) -> None:
+        self._layer = layer
+        self.deadlines[user_id] = (self.clock() + self.timeout, channel_name)
+        self.deadlines.move_to_end(user_id)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    def forget(self, user_id) -> None:
+        self.deadlines.pop(user_id, None)
+        if not self.deadlines and self._task:
+            self._task.cancel()
+            self._task = None
+
+    def expired(self, now: Optional[float] = None) -> List[Tuple[object, str]]:
+        """Pop every (user_id, channel_name) whose deadline has passed."""
+        now = self.clock() if now is None else now
+        out = []
+        while self.deadlines:
+            user_id, (deadline, channel_name) = next(iter(self.deadlines.items()))
+            if deadline > now:
+                break
+            del self.deadlines[user_id]
+            out.append((user_id, channel_name))
+        return out
+
+    async def _run(self) -> None:
+        while self.deadlines:
+            deadline, _ = next(iter(self.deadlines.values()))
+            await asyncio.sleep(max(0.0, deadline - self.clock()))
+            for user_id, channel_name in self.expired():
+                try:
+                    await self.evict(user_id, channel_name)
+                except Exception as e:
+                    logger.warning("evict_failed", "Could not evict silent user", user=user_id, error=str(e))
+
+    async def evict(self, user_id, channel_name: str) -> None:
+        metrics.counter('ecomeets.heartbeat_evictions').inc()
+        logger.info("evict", "Evicting silent user", user=user_id)
+        relaxer.untrack(user_id)
+        if await backend.cancel(user_id):
+            metrics.counter('ecomeets.heartbeat_evictions_searching').inc()
+        await self._layer.send(channel_name, {"type": "heartbeat.expired"})
+
+
+# Global singleton instance
+heartbeats = HeartbeatSweeper()
+metrics.gauge('ecomeets.heartbeat_tracked', lambda: len(heartbeats.deadlines))
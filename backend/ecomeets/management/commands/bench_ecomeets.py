@@ -0,0 +1,181 @@
+import json
+import time
+import uuid
+import asyncio
+import statistics
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import WebsocketConsumer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.urls import path
+
+from ecomeets.consumers import EcoMeetsConsumer
+
+
+class SyncRelayConsumer(WebsocketConsumer):
+    """
+    Baseline: the signalling relay as it was on the sync WebsocketConsumer,
+    reduced to the parts the benchmark exercises (guest auth, pairing and
+    ice_candidate relay through async_to_sync).
+    """
+
+    _waiting = []
+    _user_channels = {}
+
+    def connect(self):
+        self.accept()
+        self.user_id = None
+        self.partner_channel = None
+
+    def disconnect(self, code):
+        self._user_channels.pop(self.user_id, None)
+        self._waiting[:] = [entry for entry in self._waiting if entry[0] != self.user_id]
+        self._broadcast_online_count()
+
+    def receive(self, text_data=None, bytes_data=None):
+        data = json.loads(text_data)
+        typeof = data.get("type") or data.get("typeof")
+
+        if typeof == "auth_guest":
+            self.user_id = str(uuid.uuid4())
+            self._user_channels[self.user_id] = self.channel_name
+            self.send(text_data=json.dumps({"typeof": "welcome", "userId": self.user_id}))
+            self._broadcast_online_count()
+        elif typeof == "find_match":
+            if self._waiting:
+                partner_id, partner_channel = self._waiting.pop(0)
+                self.partner_channel = partner_channel
+                self._send_to_channel(partner_channel, {
+                    "typeof": "matched", "role": "offerer", "partnerId": self.user_id,
+                })
+                self.send(text_data=json.dumps({
+                    "typeof": "matched", "role": "answerer", "partnerId": partner_id,
+                }))
+                self._send_to_channel(partner_channel, {
+                    "typeof": "_internal_set_partner", "partner_channel": self.channel_name,
+                })
+            else:
+                self._waiting.append((self.user_id, self.channel_name))
+                self.send(text_data=json.dumps({"typeof": "waiting"}))
+        elif typeof == "ice_candidate" and self.partner_channel:
+            self._send_to_channel(self.partner_channel, {
+                "typeof": "ice_candidate", "candidate": data["candidate"], "from": self.user_id,
+            })
+
+    def _send_to_channel(self, channel_name, data):
+        async_to_sync(self.channel_layer.send)(channel_name, {
+            "type": "direct.message",
+            "data": data,
+        })
+
+    def _broadcast_online_count(self):
+        for channel in list(self._user_channels.values()):
+            self._send_to_channel(channel, {"typeof": "online_count", "count": len(self._user_channels)})
+
+    def direct_message(self, event):
+        data = event["data"]
+        if data.get("typeof") == "_internal_set_partner":
+            self.partner_channel = data["partner_channel"]
+            return
+        self.send(text_data=json.dumps(data))
+
+
+application = URLRouter([
+    path("async/", EcoMeetsConsumer.as_asgi()),
+    path("sync/", SyncRelayConsumer.as_asgi()),
+])
+
+
+class Command(BaseCommand):
+    help = "Compare signalling relay throughput of the async EcoMeets consumer and a sync baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pairs", type=int, default=50, help="concurrent calls")
+        parser.add_argument(
+            "--candidates", type=int, default=30,
+            help="ice_candidate messages each side sends per call",
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        self.stdout.write(
+            f"pairs={options['pairs']} candidates/side={options['candidates']}"
+        )
+        self.stdout.write(
+            f"{'consumer':<10}{'setup s':>10}{'relays/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+        )
+        for name in ("sync", "async"):
+            result = await self._bench(f"/{name}/", options)
+            self.stdout.write(
+                f"{name:<10}{result['setup']:>10.2f}{result['throughput']:>12,.0f}"
+                f"{result['p50'] * 1000:>10.2f}{result['p99'] * 1000:>10.2f}"
+            )
+
+    async def _bench(self, url, options):
+        candidates = options["candidates"]
+
+        started = time.perf_counter()
+        pairs = []
+        for _ in range(options["pairs"]):
+            offerer = await self._open(url)
+            answerer = await self._open(url)
+            await self._send(offerer, {"type": "find_match"})
+            await self._receive_until(offerer, "waiting")
+            await self._send(answerer, {"type": "find_match"})
+            await self._receive_until(answerer, "matched")
+            await self._receive_until(offerer, "matched")
+            pairs.append((offerer, answerer))
+        setup = time.perf_counter() - started
+
+        # The sync baseline's offerer learns its partner channel from a
+        # message sent right after "matched"; let it land before candidates
+        # start flowing.
+        await asyncio.sleep(0.2)
+
+        async def relay(sender, receiver):
+            t0 = time.perf_counter()
+            for i in range(candidates):
+                await self._send(sender, {"type": "ice_candidate", "candidate": {"seq": i}})
+            for _ in range(candidates):
+                await self._receive_until(receiver, "ice_candidate")
+            return time.perf_counter() - t0
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(
+            relay(a, b) for offerer, answerer in pairs
+            for a, b in ((offerer, answerer), (answerer, offerer))
+        ))
+        elapsed = time.perf_counter() - started
+
+        for offerer, answerer in pairs:
+            await offerer.disconnect()
+            await answerer.disconnect()
+
+        latencies = sorted(latency / candidates for latency in latencies)
+        return {
+            "setup": setup,
+            "throughput": len(latencies) * candidates / elapsed if elapsed else 0.0,
+            "p50": statistics.median(latencies),
+            "p99": latencies[max(int(len(latencies) * 0.99) - 1, 0)],
+        }
+
+    async def _open(self, url):
+        communicator = WebsocketCommunicator(application, url)
+        await communicator.connect()
+        await self._send(communicator, {"type": "auth_guest", "name": "bench"})
+        await self._receive_until(communicator, "welcome")
+        return communicator
+
+    async def _send(self, communicator, data):
+        await communicator.send_to(text_data=json.dumps(data))
+
+    async def _receive_until(self, communicator, typeof):
+        # Skips online_count and other frames in between
+        while True:
+            frame = json.loads(await communicator.receive_from(timeout=30))
+            if frame.get("typeof") == typeof:
+                return frame
@@ -0,0 +1,233 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import statistics
+from collections import Counter, deque
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+
+from Project.asgi import application
+from ecomeets.backends import backend
+from ecomeets.presence import online_ticker
+from ecomeets.relaxer import relaxer
+
+URL = "/ws/ecomeets/random/"
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def deep_sizeof(obj, seen=None):
+    """Bytes held by obj and everything reachable through its containers."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class Simulation:
+    """Counters shared by every simulated user."""
+
+    def __init__(self, options):
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.running = True
+        self.users = set()
+        self.events = Counter()
+        self.time_to_match = []
+        self.frames_in = 0
+        self.frames_out = 0
+        self.peak_users = 0
+        self.peak_registry = 0
+
+    def delay(self, rate):
+        """Exponential waiting time for a process with `rate` per second."""
+        return self.rng.expovariate(rate) if rate > 0 else float("inf")
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive EcoMeetsConsumer with synthetic arrivals, cancels, skips and "
+        "disconnects, and report time-to-match and pairing throughput"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals")
+        parser.add_argument("--arrival-rate", type=float, default=20.0, help="new users per second")
+        parser.add_argument(
+            "--cancel-rate", type=float, default=0.05,
+            help="per waiting user and second: cancel the search and leave",
+        )
+        parser.add_argument(
+            "--skip", type=float, default=0.5,
+            help="probability a call ends with endcall + find_match instead of leaving",
+        )
+        parser.add_argument(
+            "--disconnect-rate", type=float, default=0.01,
+            help="per connected user and second: drop the socket without warning",
+        )
+        parser.add_argument(
+            "--call-time", type=float, default=3.0, help="mean seconds per call (0: hang up at once)",
+        )
+        parser.add_argument("--regions", type=int, default=1, help="distinct region criteria")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options["call_time"] < 0:
+            raise CommandError("--call-time must not be negative")
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        sim = Simulation(options)
+        tasks = set()
+        started = time.perf_counter()
+        next_sample = started
+
+        while time.perf_counter() - started < options["duration"]:
+            await asyncio.sleep(sim.delay(options["arrival_rate"]))
+            task = asyncio.create_task(self._user(sim))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            if time.perf_counter() >= next_sample:
+                self._sample(sim)
+                next_sample += 1.0
+        elapsed = time.perf_counter() - started
+
+        # Users notice within one poll interval and disconnect themselves
+        sim.running = False
+        self._sample(sim)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._report(sim, elapsed)
+
+    def _sample(self, sim):
+        sim.peak_users = max(sim.peak_users, len(sim.users))
+        sim.peak_registry = max(sim.peak_registry, self._registry_bytes())
+
+    def _registry_bytes(self):
+        # Only in-process state can be measured; a Redis backend reports 0
+        # here beyond the presence and relaxer bookkeeping.
+        state = [online_ticker.local, relaxer.waiting]
+        state += [getattr(backend, name) for name in ("queue", "online", "pairs") if hasattr(backend, name)]
+        return sum(deep_sizeof(obj) for obj in state)
+
+    async def _user(self, sim):
+        options = sim.options
+        communicator = WebsocketCommunicator(application, URL)
+        await communicator.connect()
+        sim.users.add(communicator)
+        sim.events["arrived"] += 1
+        leave_at = time.perf_counter() + sim.delay(options["disconnect_rate"])
+
+        try:
+            await self._send(sim, communicator, {"type": "auth_guest", "name": "sim"})
+            await self._receive_until(sim, communicator, "welcome")
+            criteria = {"region": f"r{sim.rng.randrange(options['regions'])}"}
+
+            while sim.running:
+                searched_at = time.perf_counter()
+                cancel_at = searched_at + sim.delay(options["cancel_rate"])
+                await self._send(sim, communicator, {"type": "find_match", "criteria": criteria})
+                frame = await self._receive_until(sim, communicator, "matched", min(cancel_at, leave_at))
+                if frame is None:
+                    if not sim.running:
+                        return
+                    if time.perf_counter() >= leave_at:
+                        sim.events["disconnected"] += 1
+                        return
+                    await self._send(sim, communicator, {"type": "cancel_search"})
+                    sim.events["cancelled"] += 1
+                    return
+
+                sim.time_to_match.append(time.perf_counter() - searched_at)
+                sim.events["matched"] += 1
+                call_time = options["call_time"]
+                hang_up_at = time.perf_counter() + (sim.delay(1 / call_time) if call_time else 0.0)
+                ended = await self._receive_until(
+                    sim, communicator, ("endcall", "partner_disconnected"), min(hang_up_at, leave_at),
+                )
+                if ended is None:
+                    if not sim.running:
+                        return
+                    if time.perf_counter() >= leave_at:
+                        sim.events["disconnected"] += 1
+                        return
+                    await self._send(sim, communicator, {"type": "endcall"})
+                if sim.rng.random() >= options["skip"]:
+                    sim.events["left"] += 1
+                    return
+                sim.events["skipped"] += 1
+        finally:
+            sim.users.discard(communicator)
+            await communicator.disconnect()
+
+    async def _send(self, sim, communicator, data):
+        sim.frames_out += 1
+        await communicator.send_to(text_data=json.dumps(data))
+
+    async def _receive_until(self, sim, communicator, typeof, deadline=float("inf")):
+        """
+        Next frame of the given type(s), or None once `deadline` passes or
+        the simulation stops.
+        """
+        types = (typeof,) if isinstance(typeof, str) else typeof
+        while sim.running:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                return None
+            # receive_from() cancels the application on timeout, so wait on
+            # the output queue directly
+            try:
+                message = await asyncio.wait_for(communicator.output_queue.get(), min(timeout, 0.2))
+            except asyncio.TimeoutError:
+                continue
+            if message["type"] != "websocket.send":
+                raise ConnectionError(f"socket closed: {message}")
+            sim.frames_in += 1
+            frame = json.loads(message["text"])
+            if frame.get("typeof") in types:
+                return frame
+        return None
+
+    def _report(self, sim, elapsed):
+        matches = sim.events["matched"] // 2
+        waits = sim.time_to_match
+        self.stdout.write(
+            f"duration={elapsed:.1f}s arrivals={sim.events['arrived']} "
+            f"peak connected={sim.peak_users}"
+        )
+        self.stdout.write(
+            "events: " + " ".join(
+                f"{name}={sim.events[name]}"
+                for name in ("matched", "skipped", "cancelled", "disconnected", "left")
+            )
+        )
+        self.stdout.write(
+            f"time to match: p50={percentile(waits, 0.5) * 1000:.1f}ms "
+            f"p99={percentile(waits, 0.99) * 1000:.1f}ms "
+            f"mean={(statistics.mean(waits) if waits else 0) * 1000:.1f}ms"
+        )
+        self.stdout.write(f"pairs: {matches} ({matches / elapsed if elapsed else 0:.1f}/s)")
+        if matches:
+            self.stdout.write(
+                f"frames per pair: in={sim.frames_in / matches:.1f} out={sim.frames_out / matches:.1f}"
+            )
+        self.stdout.write(
+            f"registry memory: peak={sim.peak_registry / 1024:.1f}KiB "
+            f"after={self._registry_bytes() / 1024:.1f}KiB"
+        )
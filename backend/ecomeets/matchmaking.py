@@ -0,0 +1,258 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+@dataclass(eq=False)
+class Searcher:
+    user_id: object
+    channel_name: str
+    info: dict = field(default_factory=dict)
+    keys: Tuple[str, ...] = ()      # bucket key per relaxation level
+    enqueued_at: float = 0.0
+
+
+def normalize_attributes(attributes: Optional[dict], names: Iterable[str]) -> Dict[str, str]:
+    """Keep only known attribute names, as short lowercase strings."""
+    attributes = attributes or {}
+    return {name: str(attributes.get(name) or '').strip().lower()[:16] for name in names}
+
+
+def bucket_keys(attributes: Optional[dict], relax_order: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Bucket key for each relaxation level, strictest first. Level n ignores
+    the first n attributes of `relax_order`; the last level matches anyone.
+    """
+    attributes = normalize_attributes(attributes, relax_order)
+    keys = []
+    for level in range(len(relax_order) + 1):
+        kept = relax_order[level:]
+        keys.append(f"{level}:" + "|".join(f"{name}={attributes[name]}" for name in kept))
+    return tuple(keys)
+
+
+class MatchQueue:
+    """
+    FIFO of users searching for a partner, O(1) for every operation.
+
+    `index` maps user_id to the live entry in `queue`. Cancelling only
+    removes the index entry; the stale queue slot (tombstone) is skipped
+    when it reaches the front. Entries are compared by identity, so a
+    user who cancels and searches again is not matched on the old slot.
+    """
+
+    def __init__(self):
+        self.queue: Deque[Searcher] = deque()
+        self.index: Dict[object, Searcher] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self.index
+
+    def enqueue(self, user_id, channel_name: str, info: Optional[dict] = None) -> bool:
+        """Add a searcher; returns False if the user is already queued."""
+        return self.push(Searcher(user_id, channel_name, info or {}))
+
+    def push(self, searcher: Searcher) -> bool:
+        if searcher.user_id in self.index:
+            return False
+        self.index[searcher.user_id] = searcher
+        self.queue.append(searcher)
+        self._compact()
+        return True
+
+    def push_front(self, searcher: Searcher) -> bool:
+        """Put a searcher back at the head of the line."""
+        if searcher.user_id in self.index:
+            return False
+        self.index[searcher.user_id] = searcher
+        self.queue.appendleft(searcher)
+        return True
+
+    def cancel(self, user_id) -> bool:
+        return self.index.pop(user_id, None) is not None
+
+    def pop(self, is_available: Optional[Callable[[object], bool]] = None) -> Optional[Searcher]:
+        """
+        Dequeue the oldest live searcher. Searchers rejected by
+        `is_available` (e.g. gone offline) are dropped on the way.
+        """
+        while self.queue:
+            searcher = self.queue.popleft()
+            if self.index.get(searcher.user_id) is not searcher:
+                continue  # tombstone
+            del self.index[searcher.user_id]
+            if is_available is None or is_available(searcher.user_id):
+                return searcher
+        return None
+
+    def peek(self, exclude=None) -> Optional[Searcher]:
+        """Oldest live searcher other than `exclude`, left in the queue."""
+        while self.queue and self.index.get(self.queue[0].user_id) is not self.queue[0]:
+            self.queue.popleft()
+        for searcher in self.queue:
+            if searcher.user_id != exclude and self.index.get(searcher.user_id) is searcher:
+                return searcher
+        return None
+
+    def _compact(self) -> None:
+        # Bound tombstones so cancel-heavy traffic cannot grow the deque
+        # without limit; amortised O(1) per enqueue.
+        if len(self.queue) > 2 * len(self.index) + 64:
+            self.queue = deque(s for s in self.queue if self.index.get(s.user_id) is s)
+
+
+class BucketedMatchQueue:
+    """
+    Searchers indexed by attribute buckets, with wait-time relaxation.
+
+    Every searcher sits in one MatchQueue per relaxation level (see
+    `bucket_keys`). A searcher accepts matches at level n once it has
+    waited n * `relax_step` seconds, and one side accepting is enough: a
+    newcomer pairs at once with someone who has waited long enough to
+    accept it, instead of waiting out the relax time as well. Since
+    buckets are FIFO, the oldest live searcher of a bucket is the only
+    candidate worth checking, so a match attempt costs O(levels).
+
+    New arrivals try each of their buckets, strictest first, against
+    searchers already relaxed to that level. Widening happens in `relax`,
+    which walks per-level promotion queues (also FIFO by arrival) and
+    only touches searchers that crossed a level boundary since the last
+    call; such a searcher takes the oldest in its wider bucket, however
+    long that one has waited.
+    """
+
+    def __init__(self, relax_order: Sequence[str] = (), relax_step: float = 5.0, clock=time.time):
+        self.relax_order = tuple(relax_order)
+        self.relax_step = relax_step
+        self.levels = len(self.relax_order) + 1
+        self.clock = clock
+        self.buckets: Dict[str, MatchQueue] = {}
+        self.index: Dict[object, Searcher] = {}
+        self.promotions: List[Deque[Searcher]] = [deque() for _ in range(self.levels)]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self.index
+
+    def level_of(self, searcher: Searcher, now: float) -> int:
+        if self.relax_step <= 0:
+            return self.levels - 1
+        return min(self.levels - 1, int((now - searcher.enqueued_at) / self.relax_step))
+
+    def enqueue(self, user_id, channel_name: str, info: Optional[dict] = None,
+                attributes: Optional[dict] = None, now: Optional[float] = None) -> bool:
+        if user_id in self.index:
+            return False
+        searcher = Searcher(
+            user_id, channel_name, info or {},
+            keys=bucket_keys(attributes, self.relax_order),
+            enqueued_at=self.clock() if now is None else now,
+        )
+        self.index[user_id] = searcher
+        for key in searcher.keys:
+            self.buckets.setdefault(key, MatchQueue()).push(searcher)
+        for level in range(1, self.levels):
+            self.promotions[level].append(searcher)
+        self._compact_promotions()
+        return True
+
+    def cancel(self, user_id) -> bool:
+        searcher = self.index.pop(user_id, None)
+        if searcher is None:
+            return False
+        for key in searcher.keys:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.cancel(user_id)
+                if not bucket:
+                    del self.buckets[key]
+        return True
+
+    def requeue(self, searcher: Searcher, now: Optional[float] = None) -> bool:
+        """
+        Return a claimed searcher (e.g. a released reservation) to the
+        front of its buckets, keeping its original wait time. Levels it
+        crossed while out of the queue are not revisited.
+        """
+        if searcher.user_id in self.index:
+            return False
+        now = self.clock() if now is None else now
+        # A fresh entry, so slots left over from the claim stay tombstones
+        searcher = replace(searcher)
+        self.index[searcher.user_id] = searcher
+        for key in searcher.keys:
+            self.buckets.setdefault(key, MatchQueue()).push_front(searcher)
+        for level in range(self.level_of(searcher, now) + 1, self.levels):
+            self.promotions[level].appendleft(searcher)
+        return True
+
+    def bucket_size(self, key: str) -> int:
+        bucket = self.buckets.get(key)
+        return len(bucket) if bucket else 0
+
+    def claim(self, user_id, attributes: Optional[dict] = None, now: Optional[float] = None,
+              is_available: Optional[Callable[[object], bool]] = None) -> Optional[Searcher]:
+        """
+        Take the oldest searcher in the new arrival's level 0 bucket, else
+        in the first wider bucket whose oldest searcher has relaxed that far.
+        """
+        now = self.clock() if now is None else now
+        for level, key in enumerate(bucket_keys(attributes, self.relax_order)):
+            candidate = self._take_candidate(key, level, user_id, now, is_available)
+            if candidate:
+                return candidate
+        return None
+
+    def relax(self, now: Optional[float] = None,
+              is_available: Optional[Callable[[object], bool]] = None) -> List[Tuple[Searcher, Searcher, int]]:
+        """
+        Match searchers that just reached a wider level.
+        Returns (older, newer, level) for every pair made.
+        """
+        now = self.clock() if now is None else now
+        matches = []
+        for level in range(1, self.levels):
+            promotions = self.promotions[level]
+            while promotions and now - promotions[0].enqueued_at >= level * self.relax_step:
+                searcher = promotions.popleft()
+                if self.index.get(searcher.user_id) is not searcher:
+                    continue
+                if is_available is not None and not is_available(searcher.user_id):
+                    self.cancel(searcher.user_id)
+                    continue
+                # `searcher` accepts this bucket now, whatever the other's wait
+                partner = self._take_candidate(
+                    searcher.keys[level], 0, searcher.user_id, now, is_available,
+                )
+                if partner:
+                    self.cancel(searcher.user_id)
+                    older, newer = sorted((partner, searcher), key=lambda s: s.enqueued_at)
+                    matches.append((older, newer, level))
+        return matches
+
+    def _take_candidate(self, key, min_level, exclude, now, is_available) -> Optional[Searcher]:
+        bucket = self.buckets.get(key)
+        while bucket:
+            candidate = bucket.peek(exclude=exclude)
+            if candidate is None or self.level_of(candidate, now) < min_level:
+                # Younger searchers in this bucket have waited even less
+                return None
+            self.cancel(candidate.user_id)
+            if is_available is None or is_available(candidate.user_id):
+                return candidate
+            bucket = self.buckets.get(key)
+        return None
+
+    def _compact_promotions(self) -> None:
+        for level in range(1, self.levels):
+            promotions = self.promotions[level]
+            if len(promotions) > 2 * len(self.index) + 64:
+                self.promotions[level] = deque(
+                    s for s in promotions if self.index.get(s.user_id) is s
+                )
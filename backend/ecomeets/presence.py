@@ -0,0 +1,96 @@
+import time
+import asyncio
+from typing import Dict, Optional
+
+from ecomeets import config
+from ecomeets.backends import backend
+from server.metrics import metrics
+from Project.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class OnlineCountTicker:
+    """
+    Publishes the online count once per `interval`, and only when it
+    changed, as a single group send to every subscribed socket.
+
+    Presence upkeep runs on the same loop but on its own, slower schedule:
+    every `presence_ttl / 3` seconds this process refreshes the users it
+    serves and prunes entries nobody refreshed (a worker that died), so
+    cleanup never depends on a send failing.
+    """
+
+    def __init__(
+        self,
+        group: str = config.ECOMEETS_ONLINE_GROUP,
+        interval: float = config.ECOMEETS_ONLINE_TICK,
+        presence_ttl: float = config.ECOMEETS_PRESENCE_TTL,
+    ):
+        self.group = group
+        self.interval = interval
+        self.presence_ttl = presence_ttl
+        self.local: Dict[object, str] = {}   # user_id -> channel_name on this process
+        self.last_count: Optional[int] = None
+        self._layer = None
+        self._next_sweep = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, layer, user_id, channel_name: str) -> None:
+        self._layer = layer
+        self.local[user_id] = channel_name
+        await layer.group_add(self.group, channel_name)
+        self._ensure_task()
+
+    async def unsubscribe(self, layer, user_id, channel_name: str) -> None:
+        self.local.pop(user_id, None)
+        await layer.group_discard(self.group, channel_name)
+        if not self.local and self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _ensure_task(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self.local:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.warning("online_tick_failed", "Online count tick failed", error=str(e))
+
+    async def tick(self, now: Optional[float] = None) -> bool:
+        """Run one tick; returns True if a count was published."""
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.presence_ttl / 3
+            await self.sweep()
+
+        if not await backend.claim_tick("online_count", self.interval):
+            return False
+
+        count = await backend.online_count()
+        if count == self.last_count:
+            return False
+        self.last_count = count
+
+        await self._layer.group_send(self.group, {
+            "type": "direct.message",
+            "data": {"typeof": "online_count", "count": count},
+        })
+        metrics.counter('ecomeets.online_count_broadcasts').inc()
+        return True
+
+    async def sweep(self) -> None:
+        await backend.refresh_online(list(self.local))
+        for user_id in await backend.prune_online(self.presence_ttl):
+            logger.info("dead_channel", "Pruned stale presence", user=user_id)
+            metrics.counter('ecomeets.presence_pruned').inc()
+
+
+# Global singleton instance
+online_ticker = OnlineCountTicker()
+metrics.gauge('ecomeets.local_online', lambda: len(online_ticker.local))
@@ -0,0 +1,79 @@
+import time
+import asyncio
+from typing import Optional, Set
+
+from ecomeets import config
+from ecomeets.backends import backend
+from ecomeets.matchmaking import Searcher
+from ecomeets.signalling import matched_event
+from server.metrics import metrics
+from Project.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def observe_match(waiter: Searcher, level: int) -> None:
+    """Record how long the earlier searcher of a new pair waited."""
+    metrics.histogram('ecomeets.match_latency', level=str(level)).observe(
+        max(0.0, time.time() - waiter.enqueued_at)
+    )
+
+
+async def notify_pair(layer, offerer: Searcher, answerer: Searcher) -> None:
+    """Tell both sides of a pair made outside their own consumers."""
+    for me, partner, role in ((offerer, answerer, "offerer"), (answerer, offerer, "answerer")):
+        await layer.send(me.channel_name, matched_event(
+            partner.user_id, partner.channel_name, partner.info.get("name", "Unknown"), role,
+        ))
+
+
+class MatchRelaxer:
+    """
+    Periodically lets the backend widen the buckets of waiting searchers.
+
+    Runs while this process has users searching; with a shared backend
+    one process per tick does the work for everyone.
+    """
+
+    def __init__(self, interval: float = config.ECOMEETS_MATCH_RELAX_TICK):
+        self.interval = interval
+        self.waiting: Set[object] = set()
+        self._layer = None
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, layer, user_id) -> None:
+        self._layer = layer
+        self.waiting.add(user_id)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    def untrack(self, user_id) -> None:
+        self.waiting.discard(user_id)
+        if not self.waiting and self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while self.waiting:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning("relax_failed", "Match relaxation failed", error=str(e))
+
+    async def run_once(self) -> int:
+        if not await backend.claim_tick("match_relax", self.interval):
+            return 0
+        matches = await backend.relax()
+        for older, newer, level in matches:
+            self.waiting.discard(older.user_id)
+            self.waiting.discard(newer.user_id)
+            observe_match(older, level)
+            await notify_pair(self._layer, older, newer)
+            logger.info("match", "Matched after relaxing", offerer=older.user_id, answerer=newer.user_id, level=level)
+        return len(matches)
+
+
+# Global singleton instance
+relaxer = MatchRelaxer()
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+from ecomeets import config
+from server.metrics import metrics
+
+ICE_BATCH_BOUNDS = (1, 2, 4, 8, 16, 32, 64)
+
+# Optional protocol features a client can ask for in its auth message
+# ("capabilities": [...]); the welcome frame lists the ones granted.
+ICE_BATCH = "ice_batch"
+HEARTBEAT = "heartbeat"
+CAPABILITIES = frozenset({ICE_BATCH, HEARTBEAT})
+
+
+def negotiate(requested) -> List[str]:
+    """Capabilities both the client and the server support."""
+    if not isinstance(requested, (list, tuple)):
+        return []
+    return sorted(CAPABILITIES.intersection(c for c in requested if isinstance(c, str)))
+
+
+def matched_event(partner_id, partner_channel: str, partner_name: str, role: str) -> dict:
+    """
+    The single channel layer message that tells a consumer it was paired.
+    `route` is consumed by the consumer; only `data` reaches the client.
+    """
+    return {
+        "type": "direct.message",
+        "data": {
+            "typeof": "matched",
+            "role": role,
+            "partnerId": partner_id,
+            "partnerName": partner_name,
+        },
+        "route": {"partner_id": partner_id, "partner_channel": partner_channel, "role": role},
+    }
+
+
+class CandidateBatcher:
+    """
+    Groups the ICE candidates of one connection into batched sends.
+
+    The first candidate opens a window of `window` seconds; everything
+    added before it closes goes out in a single `send(candidates)` call,
+    split into chunks of at most `max_batch`. A full chunk is sent
+    without waiting for the window.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[list], Awaitable[None]],
+        window: float = config.ECOMEETS_ICE_BATCH_WINDOW,
+        max_batch: int = config.ECOMEETS_ICE_BATCH_MAX,
+    ):
+        self.send = send
+        self.window = window
+        self.max_batch = max_batch
+        self.pending: list = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def add(self, candidates: list) -> None:
+        self.pending.extend(candidates)
+        if len(self.pending) >= self.max_batch or self.window <= 0:
+            await self.flush()
+        elif self._task is None:
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+        pending, self.pending = self.pending, []
+        for i in range(0, len(pending), self.max_batch):
+            batch = pending[i:i + self.max_batch]
+            metrics.histogram('ecomeets.ice_batch_size', ICE_BATCH_BOUNDS).observe(len(batch))
+            await self.send(batch)
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.pending = []
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        await self.flush()
@@ -0,0 +1,192 @@
+import asyncio
+import pytest
+from ecomeets.backends import load_backend
+from ecomeets.backends.local import LocalMatchBackend
+
+
+def make_local():
+    return LocalMatchBackend()
+
+
+def make_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    from ecomeets.backends.redis import RedisMatchBackend
+
+    return RedisMatchBackend(client=fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture(params=[make_local, make_redis], ids=["local", "redis"])
+def backend(request):
+    return request.param()
+
+
+def test_load_backend_from_settings_dict():
+    """Backends are built from a CHANNEL_LAYERS-style dict"""
+    backend = load_backend({"BACKEND": "ecomeets.backends.local.LocalMatchBackend"})
+    assert isinstance(backend, LocalMatchBackend)
+
+
+@pytest.mark.asyncio
+async def test_match_or_enqueue_pairs_oldest_online_searcher(backend):
+    """The second searcher is paired with the first; ids keep their type"""
+    await backend.add_online(7, "ch-7")
+    await backend.add_online("guest", "ch-guest")
+
+    assert await backend.match_or_enqueue(7, "ch-7", {"name": "alice"}) is None
+    assert await backend.is_searching(7)
+
+    partner = await backend.match_or_enqueue("guest", "ch-guest")
+    assert (partner.user_id, partner.channel_name, partner.info) == (7, "ch-7", {"name": "alice"})
+    assert not await backend.is_searching(7)
+
+    assert await backend.end_pair("guest") == 7
+    assert await backend.end_pair(7) is None
+
+
+@pytest.mark.asyncio
+async def test_offline_and_cancelled_searchers_are_skipped(backend):
+    """Only online searchers that did not cancel can be claimed"""
+    for uid in ("gone", "cancelled", "ok", "me"):
+        await backend.add_online(uid, f"ch-{uid}")
+    for uid in ("gone", "cancelled", "ok"):
+        await backend.enqueue(uid, f"ch-{uid}")
+
+    await backend.remove_online("gone")
+    assert await backend.cancel("cancelled")
+
+    assert (await backend.claim_partner("me", "ch-me")).user_id == "ok"
+    assert await backend.claim_partner("me", "ch-me") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_never_share_a_partner(backend):
+    """Racing searchers each get a distinct partner"""
+    for i in range(20):
+        await backend.add_online(f"u{i}", f"ch-{i}")
+    for i in range(10):
+        await backend.enqueue(f"u{i}", f"ch-{i}")
+
+    claims = await asyncio.gather(*(
+        backend.claim_partner(f"u{i}", f"ch-{i}") for i in range(10, 20)
+    ))
+    partners = [claim.user_id for claim in claims]
+    assert sorted(partners) == sorted(f"u{i}" for i in range(10))
+
+
+@pytest.mark.asyncio
+async def test_presence(backend):
+    """Online count and channels reflect add/remove"""
+    await backend.add_online(1, "ch-1")
+    await backend.add_online("g", "ch-g")
+    await backend.remove_online(1)
+
+    assert await backend.online_count() == 1
+    assert await backend.online_channels() == {"g": "ch-g"}
+
+
+@pytest.mark.asyncio
+async def test_stale_presence_is_pruned():
+    """Users whose worker stopped refreshing them are dropped"""
+    backend = make_redis()
+    await backend.add_online("alive", "ch-a")
+    await backend.add_online("stale", "ch-s")
+    await backend._client().zadd(backend._key("seen"), {'"stale"': 0})
+
+    assert await backend.prune_online(max_age=30) == ["stale"]
+    assert await backend.online_channels() == {"alive": "ch-a"}
+
+
+@pytest.mark.asyncio
+async def test_tick_is_claimed_once_per_interval():
+    """Only one process wins a shared periodic job per interval"""
+    backend = make_redis()
+    assert await backend.claim_tick("job", 60)
+    assert not await backend.claim_tick("job", 60)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("factory", [LocalMatchBackend, "redis"], ids=["local", "redis"])
+async def test_relax_pairs_mismatched_searchers(factory):
+    """Searchers in different buckets are paired after the relax step"""
+    if factory == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        from ecomeets.backends.redis import RedisMatchBackend
+
+        backend = RedisMatchBackend(
+            relax_order=("region",), relax_step=0.05, client=fakeredis.FakeAsyncRedis(),
+        )
+    else:
+        backend = factory(relax_order=("region",), relax_step=0.05)
+
+    for uid in ("eu", "us"):
+        await backend.add_online(uid, f"ch-{uid}")
+    assert await backend.match_or_enqueue("eu", "ch-eu", attributes={"region": "eu"}) is None
+    assert await backend.match_or_enqueue("us", "ch-us", attributes={"region": "us"}) is None
+    assert await backend.relax() == []
+
+    await asyncio.sleep(0.1)
+    (older, newer, level), = await backend.relax()
+    assert (older.user_id, newer.user_id, level) == ("eu", "us", 1)
+    assert await backend.end_pair("us") == "eu"
+    assert not await backend.is_searching("eu")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("factory", [LocalMatchBackend, "redis"], ids=["local", "redis"])
+async def test_newcomer_pairs_with_a_relaxed_searcher(factory):
+    """A searcher who accepts any region takes a newcomer without a relax tick"""
+    if factory == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        from ecomeets.backends.redis import RedisMatchBackend
+
+        backend = RedisMatchBackend(
+            relax_order=("region",), relax_step=0.05, client=fakeredis.FakeAsyncRedis(),
+        )
+    else:
+        backend = factory(relax_order=("region",), relax_step=0.05)
+
+    for uid in ("eu", "us", "jp"):
+        await backend.add_online(uid, f"ch-{uid}")
+    assert await backend.match_or_enqueue("eu", "ch-eu", attributes={"region": "eu"}) is None
+    assert await backend.match_or_enqueue("us", "ch-us", attributes={"region": "us"}) is None
+
+    await asyncio.sleep(0.1)
+    partner = await backend.match_or_enqueue("jp", "ch-jp", attributes={"region": "jp"})
+    assert partner.user_id == "eu"
+    assert await backend.end_pair("jp") == "eu"
+    assert await backend.is_searching("us")
+
+
+@pytest.mark.asyncio
+async def test_reserved_searcher_is_held_then_taken_or_released(backend):
+    """A held searcher stays searching, and goes back ahead of newer ones"""
+    for uid in ("held", "later", "caller"):
+        await backend.add_online(uid, f"ch-{uid}")
+    await backend.enqueue("held", "ch-held")
+    await backend.enqueue("later", "ch-later")
+
+    reserved = await backend.reserve("caller", hold=10)
+    assert reserved.user_id == "held"
+    assert await backend.is_searching("held")
+    assert await backend.release("held")
+    assert not await backend.release("held")
+    assert (await backend.claim_partner("x", "ch-x")).user_id == "held"
+
+    assert (await backend.reserve("caller", hold=10)).user_id == "later"
+    assert (await backend.take_reserved("caller", "later")).channel_name == "ch-later"
+    assert await backend.take_reserved("caller", "later") is None
+    assert await backend.end_pair("later") == "caller"
+
+
+@pytest.mark.asyncio
+async def test_partner_of_reads_the_pair_registry(backend):
+    """Both sides can look up the route until the pair ends"""
+    await backend.add_online("a", "ch-a")
+    await backend.add_online("b", "ch-b")
+    await backend.enqueue("a", "ch-a")
+    await backend.claim_partner("b", "ch-b")
+
+    assert await backend.partner_of("a") == ("b", "ch-b")
+    assert await backend.partner_of("b") == ("a", "ch-a")
+    await backend.end_pair("b")
+    assert await backend.partner_of("a") is None
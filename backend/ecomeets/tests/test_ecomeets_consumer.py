@@ -0,0 +1,264 @@
+import json
+import pytest
+from channels.testing import WebsocketCommunicator
+from Project.asgi import application
+
+URL = '/ws/ecomeets/random/'
+
+
+async def open_guest(name, capabilities=None):
+    communicator = WebsocketCommunicator(application, URL)
+    await communicator.connect()
+    auth = {'type': 'auth_guest', 'name': name}
+    if capabilities is not None:
+        auth['capabilities'] = capabilities
+    await communicator.send_json_to(auth)
+    welcome = await receive_until(communicator, 'welcome')
+    assert welcome['capabilities'] == (capabilities or [])
+    return communicator
+
+
+async def open_pair(offerer, answerer):
+    await offerer.send_json_to({'type': 'find_match'})
+    await receive_until(offerer, 'waiting')
+    await answerer.send_json_to({'type': 'find_match'})
+    await receive_until(answerer, 'matched')
+    await receive_until(offerer, 'matched')
+
+
+async def receive_until(communicator, typeof):
+    while True:
+        frame = json.loads(await communicator.receive_from(timeout=2))
+        if frame.get('typeof') == typeof:
+            return frame
+
+
+@pytest.mark.asyncio
+async def test_match_and_relay_signalling():
+    """Two guests are paired and relay ICE candidates both ways"""
+    offerer = await open_guest('alice')
+    answerer = await open_guest('bob')
+
+    await offerer.send_json_to({'type': 'find_match'})
+    await receive_until(offerer, 'waiting')
+    await answerer.send_json_to({'type': 'find_match'})
+
+    assert (await receive_until(answerer, 'matched'))['role'] == 'answerer'
+    assert (await receive_until(offerer, 'matched'))['role'] == 'offerer'
+
+    # No settling time: the route arrives together with "matched"
+    await offerer.send_json_to({'type': 'offer', 'offer': {'sdp': 'x'}})
+    assert (await receive_until(answerer, 'offer'))['offer'] == {'sdp': 'x'}
+
+    await answerer.send_json_to({'type': 'ice_candidate', 'candidate': {'n': 1}})
+    await offerer.send_json_to({'type': 'ice_candidate', 'candidate': {'n': 2}})
+    assert (await receive_until(offerer, 'ice_candidate'))['candidate'] == {'n': 1}
+    assert (await receive_until(answerer, 'ice_candidate'))['candidate'] == {'n': 2}
+
+    await answerer.disconnect()
+    await receive_until(offerer, 'partner_disconnected')
+    await offerer.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_ice_candidates_are_batched_for_capable_clients():
+    """A burst reaches a batching client as one frame and an old one as many"""
+    old = await open_guest('old')
+    new = await open_guest('new', capabilities=['ice_batch'])
+    await open_pair(old, new)
+
+    for n in range(3):
+        await old.send_json_to({'type': 'ice_candidate', 'candidate': {'n': n}})
+    frame = await receive_until(new, 'ice_candidates')
+    assert frame['candidates'] == [{'n': 0}, {'n': 1}, {'n': 2}]
+
+    await new.send_json_to({'type': 'ice_candidates', 'candidates': [{'n': 3}, {'n': 4}]})
+    await new.send_json_to({'type': 'endcall'})
+    assert (await receive_until(old, 'ice_candidate'))['candidate'] == {'n': 3}
+    assert (await receive_until(old, 'ice_candidate'))['candidate'] == {'n': 4}
+    await receive_until(old, 'endcall')
+
+    await old.disconnect()
+    await new.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_candidate_burst_over_flood_budget_is_relayed():
+    """ICE candidates are never dropped by flood control"""
+    from ecomeets.consumers import ECOMEETS_FLOOD_POLICY
+
+    offerer = await open_guest('alice')
+    answerer = await open_guest('bob')
+    await open_pair(offerer, answerer)
+
+    burst = int(ECOMEETS_FLOOD_POLICY.connection_burst) + 20
+    for n in range(burst):
+        await offerer.send_json_to({'type': 'ice_candidate', 'candidate': {'n': n}})
+    received = [(await receive_until(answerer, 'ice_candidate'))['candidate']['n'] for _ in range(burst)]
+    assert received == list(range(burst))
+
+    await offerer.disconnect()
+    await answerer.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_unrouted_signals_ask_the_pair_registry_once(monkeypatch):
+    """A missing route is remembered until the next match"""
+    from ecomeets.consumers import backend
+
+    lookups = []
+    partner_of = backend.partner_of
+
+    async def counting_partner_of(user_id):
+        lookups.append(user_id)
+        return await partner_of(user_id)
+
+    monkeypatch.setattr(backend, 'partner_of', counting_partner_of)
+    offerer = await open_guest('alice')
+    answerer = await open_guest('bob')
+
+    for _ in range(3):
+        await offerer.send_json_to({'type': 'media_state', 'audioMuted': True})
+    await offerer.send_json_to({'type': 'find_match'})
+    await receive_until(offerer, 'waiting')
+    assert len(lookups) == 1
+
+    await answerer.send_json_to({'type': 'find_match'})
+    await receive_until(answerer, 'matched')
+    await receive_until(offerer, 'matched')
+    await offerer.send_json_to({'type': 'offer', 'offer': {'sdp': 'x'}})
+    assert (await receive_until(answerer, 'offer'))['offer'] == {'sdp': 'x'}
+
+    # A hang-up from the partner invalidates the cached route
+    await answerer.send_json_to({'type': 'endcall'})
+    await receive_until(offerer, 'endcall')
+    lookups.clear()
+    await offerer.send_json_to({'type': 'media_state', 'audioMuted': True})
+    await offerer.send_json_to({'type': 'find_match'})
+    await receive_until(offerer, 'waiting')
+    assert len(lookups) == 1
+    while not answerer.output_queue.empty():
+        assert 'media_state' not in answerer.output_queue.get_nowait().get('text', '')
+
+    await offerer.disconnect()
+    await answerer.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_endcall_next_pairs_with_reserved_searcher():
+    """A held searcher becomes the next partner in one exchange"""
+    alice = await open_guest('alice')
+    bob = await open_guest('bob')
+    carol = await open_guest('carol')
+    await open_pair(alice, bob)
+    await carol.send_json_to({'type': 'find_match'})
+    await receive_until(carol, 'waiting')
+
+    await bob.send_json_to({'type': 'reserve_next'})
+    assert (await receive_until(bob, 'next_reserved'))['found']
+    await bob.send_json_to({'type': 'endcall', 'next': True})
+
+    assert (await receive_until(bob, 'matched'))['role'] == 'answerer'
+    assert (await receive_until(carol, 'matched'))['role'] == 'offerer'
+    await receive_until(alice, 'endcall')
+
+    for communicator in (alice, bob, carol):
+        await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_previous_partner_cannot_reach_the_next_call():
+    """After endcall + next, the old partner's signals and hang-up are dropped"""
+    alice = await open_guest('alice')
+    bob = await open_guest('bob')
+    carol = await open_guest('carol')
+    await open_pair(alice, bob)
+    await carol.send_json_to({'type': 'find_match'})
+    await receive_until(carol, 'waiting')
+
+    await alice.send_json_to({'type': 'reserve_next'})
+    assert (await receive_until(alice, 'next_reserved'))['found']
+    await alice.send_json_to({'type': 'endcall', 'next': True})
+    await receive_until(alice, 'matched')
+    await receive_until(carol, 'matched')
+
+    await bob.send_json_to({'type': 'media_state', 'audioMuted': True})
+    await bob.disconnect()
+
+    await carol.send_json_to({'type': 'offer', 'offer': {'sdp': 'c'}})
+    frames = []
+    while not frames or frames[-1].get('typeof') != 'offer':
+        frames.append(json.loads(await alice.receive_from(timeout=2)))
+    assert not [f for f in frames if f.get('typeof') in ('media_state', 'partner_disconnected')]
+    assert frames[-1]['offer'] == {'sdp': 'c'}
+
+    # A caller whose partner already hung up holds nobody
+    dave = await open_guest('dave')
+    await dave.send_json_to({'type': 'find_match'})
+    await receive_until(dave, 'waiting')
+    await carol.send_json_to({'type': 'endcall'})
+    await receive_until(alice, 'endcall')
+    await alice.send_json_to({'type': 'reserve_next'})
+    await alice.send_json_to({'type': 'find_match'})
+    frame = {}
+    while frame.get('typeof') not in ('matched', 'waiting', 'next_reserved'):
+        frame = json.loads(await alice.receive_from(timeout=2))
+    assert frame['typeof'] == 'matched'
+    await receive_until(dave, 'matched')
+
+    for communicator in (alice, carol, dave):
+        await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_new_user_gets_count_directly():
+    """The arriving user gets the count at once; others wait for the tick"""
+    first = await open_guest('first')
+    await receive_until(first, 'online_count')
+    second = WebsocketCommunicator(application, URL)
+    await second.connect()
+    await second.send_json_to({'type': 'auth_guest', 'name': 'second'})
+    await receive_until(second, 'welcome')
+
+    assert (await receive_until(second, 'online_count'))['count'] >= 2
+    assert await first.receive_nothing(timeout=0.1)
+
+    await first.disconnect()
+    await second.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_signalling_requires_auth():
+    """Messages before auth are rejected and the socket closed"""
+    communicator = WebsocketCommunicator(application, URL)
+    await communicator.connect()
+    await communicator.send_json_to({'type': 'find_match'})
+
+    assert (await receive_until(communicator, 'auth_error'))['error'] == 'Auth required'
+    assert (await communicator.receive_output(timeout=1))['type'] == 'websocket.close'
+
+
+@pytest.mark.asyncio
+async def test_mismatched_criteria_are_paired_after_relaxing(monkeypatch):
+    """Searchers with different regions are matched once criteria widen"""
+    from ecomeets.backends import backend
+    from ecomeets.relaxer import relaxer
+
+    monkeypatch.setattr(backend.queue, 'relax_step', 0.05)
+    monkeypatch.setattr(relaxer, 'interval', 0.02)
+
+    eu = await open_guest('eu')
+    us = await open_guest('us')
+    await eu.send_json_to({'type': 'find_match', 'criteria': {'region': 'eu'}})
+    await receive_until(eu, 'waiting')
+    await us.send_json_to({'type': 'find_match', 'criteria': {'region': 'us'}})
+    await receive_until(us, 'waiting')
+
+    assert (await receive_until(eu, 'matched'))['role'] == 'offerer'
+    assert (await receive_until(us, 'matched'))['role'] == 'answerer'
+
+    await us.send_json_to({'type': 'ice_candidate', 'candidate': {'n': 1}})
+    assert (await receive_until(eu, 'ice_candidate'))['candidate'] == {'n': 1}
+
+    await eu.disconnect()
+    await us.disconnect()
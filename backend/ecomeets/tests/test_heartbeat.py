@@ -0,0 +1,52 @@
+import pytest
+from channels.testing import WebsocketCommunicator
+
+from Project.asgi import application
+from ecomeets.backends import backend
+from ecomeets.heartbeat import HeartbeatSweeper, heartbeats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_expired_pops_only_overdue_users_in_deadline_order():
+    """Touching a user pushes it behind everyone else"""
+    clock = FakeClock()
+    sweeper = HeartbeatSweeper(timeout=10, clock=clock)
+    for i, user_id in enumerate(['a', 'b', 'c']):
+        clock.now = i
+        sweeper.touch(None, user_id, f'ch-{user_id}')
+    clock.now = 5
+    sweeper.touch(None, 'a', 'ch-a')
+
+    assert sweeper.expired(now=11.5) == [('b', 'ch-b')]
+    assert sweeper.expired(now=20) == [('c', 'ch-c'), ('a', 'ch-a')]
+    sweeper.forget('a')
+    assert not sweeper.deadlines
+
+
+@pytest.mark.asyncio
+async def test_silent_searcher_is_evicted(monkeypatch):
+    """A heartbeat client that goes quiet leaves the queue and is closed"""
+    monkeypatch.setattr(heartbeats, 'timeout', 0.2)
+    communicator = WebsocketCommunicator(application, '/ws/ecomeets/random/')
+    await communicator.connect()
+    await communicator.send_json_to({'type': 'auth_guest', 'capabilities': ['heartbeat']})
+    welcome = await communicator.receive_json_from()
+    assert 'heartbeatInterval' in welcome
+    await communicator.send_json_to({'type': 'find_match'})
+
+    while True:
+        output = await communicator.receive_output(timeout=2)
+        if output['type'] == 'websocket.close':
+            break
+    assert output['code'] == 4008
+    assert not await backend.is_searching(welcome['userId'])
+    await communicator.disconnect()
+    assert welcome['userId'] not in heartbeats.deadlines
@@ -0,0 +1,115 @@
+from ecomeets.matchmaking import BucketedMatchQueue, MatchQueue, bucket_keys
+
+
+def test_fifo_and_duplicate_enqueue():
+    """Searchers come out in arrival order; re-enqueueing is a no-op"""
+    queue = MatchQueue()
+    assert queue.enqueue('a', 'ch-a')
+    assert queue.enqueue('b', 'ch-b')
+    assert not queue.enqueue('a', 'ch-a')
+
+    assert len(queue) == 2
+    assert queue.pop().user_id == 'a'
+    assert queue.pop().user_id == 'b'
+    assert queue.pop() is None
+
+
+def test_cancel_leaves_tombstone_that_is_skipped():
+    """Cancelled searchers are never returned, even after searching again"""
+    queue = MatchQueue()
+    queue.enqueue('a', 'ch-a')
+    queue.enqueue('b', 'ch-b')
+    assert queue.cancel('a')
+    assert 'a' not in queue
+
+    queue.enqueue('a', 'ch-a2')  # back of the line, not the old slot
+    assert [queue.pop().channel_name for _ in range(2)] == ['ch-b', 'ch-a2']
+
+
+def test_unavailable_searchers_are_dropped_without_recursion():
+    """Offline users are skipped in one pass, however many there are"""
+    queue = MatchQueue()
+    for i in range(10000):
+        queue.enqueue(f'offline-{i}', 'ch')
+    queue.enqueue('online', 'ch')
+
+    searcher = queue.pop(is_available=lambda user_id: user_id == 'online')
+    assert searcher.user_id == 'online'
+    assert len(queue) == 0
+
+
+def test_tombstones_are_compacted():
+    """Cancel-heavy traffic does not grow the underlying deque"""
+    queue = MatchQueue()
+    for i in range(1000):
+        queue.enqueue(i, 'ch')
+        queue.cancel(i)
+    assert len(queue.queue) <= 65
+
+
+def test_bucket_keys_widen_per_level():
+    """Each level drops the next attribute of the relax order"""
+    keys = bucket_keys({'language': 'EN', 'region': 'eu'}, ('region', 'language'))
+    assert keys == ('0:region=eu|language=en', '1:language=en', '2:')
+
+
+def test_arrivals_only_match_their_exact_bucket():
+    """A new searcher is paired with the oldest exact match, not a mismatch"""
+    queue = BucketedMatchQueue(('region',), relax_step=5)
+    queue.enqueue('eu-1', 'ch', attributes={'region': 'eu'}, now=0)
+    queue.enqueue('us-1', 'ch', attributes={'region': 'us'}, now=1)
+
+    assert queue.claim('us-2', {'region': 'us'}, now=2).user_id == 'us-1'
+    assert queue.claim('us-3', {'region': 'us'}, now=2) is None
+    assert 'eu-1' in queue
+
+
+def test_relaxation_pairs_searchers_after_waiting():
+    """Mismatched searchers are paired once one of them waited long enough"""
+    queue = BucketedMatchQueue(('region',), relax_step=5)
+    queue.enqueue('eu', 'ch', attributes={'region': 'eu'}, now=0)
+    queue.enqueue('us', 'ch', attributes={'region': 'us'}, now=3)
+
+    assert queue.relax(now=4) == []
+    # "us" has only waited 3s, but "eu" accepts any region by now
+    (older, newer, level), = queue.relax(now=6)
+    assert (older.user_id, newer.user_id, level) == ('eu', 'us', 1)
+    assert len(queue) == 0
+
+
+def test_newcomer_pairs_with_a_relaxed_searcher_at_once():
+    """An arrival does not wait out the relax time of someone who accepts it"""
+    queue = BucketedMatchQueue(('region', 'language'), relax_step=5)
+    queue.enqueue('eu', 'ch', attributes={'region': 'eu', 'language': 'de'}, now=0)
+
+    assert queue.claim('us', {'region': 'us', 'language': 'en'}, now=9) is None   # level 1 only
+    assert queue.claim('us', {'region': 'us', 'language': 'de'}, now=9).user_id == 'eu'
+
+    queue.enqueue('eu', 'ch', attributes={'region': 'eu', 'language': 'de'}, now=10)
+    queue.enqueue('eu-en', 'ch', attributes={'region': 'eu', 'language': 'en'}, now=11)
+    # The exact bucket wins over a wider one
+    assert queue.claim('new', {'region': 'eu', 'language': 'en'}, now=25).user_id == 'eu-en'
+
+
+def test_relaxation_skips_unavailable_searchers():
+    """Offline searchers are dropped instead of being matched"""
+    queue = BucketedMatchQueue(('region',), relax_step=1)
+    queue.enqueue('gone', 'ch', attributes={'region': 'eu'}, now=0)
+    queue.enqueue('us', 'ch', attributes={'region': 'us'}, now=0)
+    queue.enqueue('ok', 'ch', attributes={'region': 'jp'}, now=0)
+
+    (older, newer, _), = queue.relax(now=1, is_available=lambda user_id: user_id != 'gone')
+    assert {older.user_id, newer.user_id} == {'us', 'ok'}
+    assert 'gone' not in queue
+
+
+def test_requeue_returns_searcher_to_the_front():
+    """A released reservation is served before searchers who came later"""
+    queue = BucketedMatchQueue(('region',), relax_step=5)
+    queue.enqueue('first', 'ch', attributes={'region': 'eu'}, now=0)
+    queue.enqueue('second', 'ch', attributes={'region': 'eu'}, now=1)
+
+    held = queue.claim('me', {'region': 'eu'}, now=2)
+    assert queue.requeue(held, now=3)
+    assert not queue.requeue(held, now=3)
+    assert queue.claim('you', {'region': 'eu'}, now=4).user_id == 'first'
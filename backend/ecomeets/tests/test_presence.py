@@ -0,0 +1,41 @@
+import pytest
+from ecomeets.backends import backend
+from ecomeets.presence import OnlineCountTicker
+
+
+class RecordingLayer:
+    """Records group sends instead of delivering them."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def group_add(self, group, channel):
+        pass
+
+    async def group_discard(self, group, channel):
+        pass
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message['data']['count']))
+
+
+@pytest.mark.asyncio
+async def test_count_is_published_once_per_change():
+    """A burst of arrivals produces one group send per tick, not one per user"""
+    ticker = OnlineCountTicker(group='online-test', interval=60, presence_ttl=60)
+    layer = RecordingLayer()
+
+    for i in range(50):
+        await backend.add_online(f'burst-{i}', f'ch-{i}')
+        await ticker.subscribe(layer, f'burst-{i}', f'ch-{i}')
+
+    assert await ticker.tick()
+    assert not await ticker.tick()  # unchanged
+    assert layer.sent == [('online-test', await backend.online_count())]
+
+    for i in range(50):
+        await backend.remove_online(f'burst-{i}')
+        await ticker.unsubscribe(layer, f'burst-{i}', f'ch-{i}')
+
+    assert await ticker.tick()
+    assert len(layer.sent) == 2
@@ -0,0 +1,31 @@
+import asyncio
+import pytest
+
+from ecomeets.signalling import CandidateBatcher, negotiate
+
+
+def test_negotiate_keeps_known_capabilities():
+    """Unknown or malformed capabilities are ignored"""
+    assert negotiate(['ice_batch', 'telepathy', 3]) == ['ice_batch']
+    assert negotiate('ice_batch') == []
+    assert negotiate(None) == []
+
+
+@pytest.mark.asyncio
+async def test_candidates_within_window_share_one_send():
+    """A burst is sent once after the window, a full batch at once"""
+    sent = []
+
+    async def send(batch):
+        sent.append(batch)
+
+    batcher = CandidateBatcher(send, window=0.02, max_batch=4)
+    for i in range(3):
+        await batcher.add([i])
+    assert sent == []
+    await asyncio.sleep(0.05)
+    assert sent == [[0, 1, 2]]
+
+    await batcher.add([3, 4, 5, 6, 7])
+    assert sent[1:] == [[3, 4, 5, 6], [7]]
+    batcher.close()
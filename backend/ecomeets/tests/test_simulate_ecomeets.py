@@ -0,0 +1,44 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ecomeets.backends import backend
+from ecomeets.management.commands.simulate_ecomeets import deep_sizeof, percentile
+
+
+def test_percentile_and_sizeof_helpers():
+    """Percentiles pick from the sorted sample; sizes follow containers"""
+    assert percentile([3, 1, 2, 4], 0.5) == 3
+    assert percentile([], 0.99) == 0.0
+    assert deep_sizeof({'a': [1, 2, 3]}) > deep_sizeof({})
+
+
+def test_short_simulation_pairs_users():
+    """A short run makes pairs and leaves no one online"""
+    out = StringIO()
+    call_command(
+        'simulate_ecomeets', duration=1, arrival_rate=40, call_time=0.2,
+        cancel_rate=0, disconnect_rate=0, stdout=out,
+    )
+    report = out.getvalue()
+    assert 'time to match: p50=' in report
+    assert 'pairs: 0 ' not in report
+    assert not backend.online
+
+
+def test_zero_call_time_hangs_up_at_once():
+    """--call-time 0 ends every call immediately instead of failing"""
+    out = StringIO()
+    call_command(
+        'simulate_ecomeets', duration=0.5, arrival_rate=40, call_time=0,
+        cancel_rate=0, disconnect_rate=0, stdout=out,
+    )
+    assert 'time to match: p50=' in out.getvalue()
+    assert not backend.online
+
+
+def test_negative_call_time_is_rejected():
+    with pytest.raises(CommandError):
+        call_command('simulate_ecomeets', call_time=-1, stdout=StringIO())
@@ -0,0 +1,28 @@
+from django.conf import settings
+
+# Late-joiner room history
+ROOM_HISTORY_MAX_MESSAGES = getattr(settings, 'ROOM_HISTORY_MAX_MESSAGES', 50)
+ROOM_HISTORY_MAX_ROOM_BYTES = getattr(settings, 'ROOM_HISTORY_MAX_ROOM_KB', 2048) * 1024
+ROOM_HISTORY_NODE_MAX_BYTES = getattr(settings, 'ROOM_HISTORY_NODE_MAX_MB', 64) * 1024 * 1024
+
+# Every local member of a room receives the same group message and tries to
+# record it. It can still arrive until the channel layer expires it (60s by
+# default), so ids of evicted messages are remembered that long.
+ROOM_HISTORY_DEDUP_SECONDS = getattr(settings, 'ROOM_HISTORY_DEDUP_SECONDS', 60)
+
+# Attachments larger than this are kept out of the history frame and sent
+# as a reference the client can fetch with a `history_fetch` message.
+ROOM_HISTORY_INLINE_ATTACHMENT_BYTES = getattr(settings, 'ROOM_HISTORY_INLINE_ATTACHMENT_KB', 64) * 1024
+
+# Flood control: token buckets in messages/second
+FLOOD_CONNECTION_RATE = getattr(settings, 'FLOOD_CONNECTION_RATE', 20)
+FLOOD_CONNECTION_BURST = getattr(settings, 'FLOOD_CONNECTION_BURST', 60)
+FLOOD_ROOM_RATE = getattr(settings, 'FLOOD_ROOM_RATE', 100)
+FLOOD_ROOM_BURST = getattr(settings, 'FLOOD_ROOM_BURST', 300)
+
+# Hierarchical fan-out: rooms at or above the threshold broadcast through
+# FANOUT_SHARDS sub-groups, dispatched round-robin across rooms. A room may
+# hold the dispatcher for at most FANOUT_LATENCY_BUDGET_MS per turn.
+FANOUT_LARGE_ROOM_THRESHOLD = getattr(settings, 'FANOUT_LARGE_ROOM_THRESHOLD', 64)
+FANOUT_SHARDS = getattr(settings, 'FANOUT_SHARDS', 16)
+FANOUT_LATENCY_BUDGET_MS = getattr(settings, 'FANOUT_LATENCY_BUDGET_MS', 5)
@@ -1,4 +1,5 @@
 import json
+import uuid
 import asyncio
 from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
@@ -7,8 +8,28 @@ from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from asgiref.sync import sync_to_async
+from server import config
+from server.room_history import room_history
+from server.fanout import fanout
+from server.flood_control import FloodController, FloodPolicy, COALESCE, DROP
+from Project.logging import get_logger
 
 User = get_user_model()
+logger = get_logger(__name__)
+
+SERVER_FLOOD_POLICY = FloodPolicy(
+    name='server',
+    connection_rate=config.FLOOD_CONNECTION_RATE,
+    connection_burst=config.FLOOD_CONNECTION_BURST,
+    room_rate=config.FLOOD_ROOM_RATE,
+    room_burst=config.FLOOD_ROOM_BURST,
+    coalesce_types=frozenset({'progress'}),
+    protected_types=frozenset({
+        'file-meta', 'resume-request', 'resume-info', 'transfer-accepted',
+        'checkpoint-ack', 'transfer-complete', 'transfer-error',
+        'transfer-pause', 'transfer-cancel',
+    }),
+)
 
 
 class ServerConsumer(AsyncWebsocketConsumer):
@@ -21,6 +42,8 @@ class ServerConsumer(AsyncWebsocketConsumer):
         self.room_id = self.scope['url_route']['kwargs'].get('connection')
         self.user = None
         self.guest_user = None
+        self.flood = None
+        self._flush_task = None
 
 
         self.is_authenticated_context = False
@@ -29,6 +52,8 @@ class ServerConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        self.flood = FloodController(SERVER_FLOOD_POLICY, room=self.room_id)
+
         query_string = self.scope.get('query_string', b'').decode()
         query_params = parse_qs(query_string)
         guest_name = query_params.get('guest', [None])[0]
@@ -38,26 +63,29 @@ class ServerConsumer(AsyncWebsocketConsumer):
             self.display_name = f"{self.channel_name}_{guest_name}"
             self.is_authenticated_context = True
 
-            print(f"Guest Connection: {self.display_name} in room: {self.room_id}")
+            logger.info("connect", "Guest connected", room=self.room_id, user=self.display_name, guest=True)
             await self.accept()
             await self._join_room()
         else:
-            print(f"Pending Auth Connection in room: {self.room_id}")
+            logger.info("connect", "Connection pending auth", room=self.room_id)
             await self.accept()
 
     async def disconnect(self, close_code):
+        if self._flush_task:
+            self._flush_task.cancel()
+        if self.flood:
+            self.flood.close()
+
         try:
             if self.is_authenticated_context and hasattr(self, 'display_name') and self.display_name:
-                print(f"Disconnected: {self.display_name}")
-                await sync_to_async(self._update_user_list)(add=False)
+                logger.info("disconnect", "Disconnected", room=self.room_id, user=self.display_name, code=close_code)
+                room_size = await sync_to_async(self._update_user_list)(add=False)
+                fanout.note_room_size(self.room_id, room_size)
                 await self._broadcast_user_list()
 
-                await self.channel_layer.group_discard(
-                    self.room_id,
-                    self.channel_name
-                )
+                await fanout.leave(self.channel_layer, self.room_id, self.channel_name)
         except Exception as e:
-            print(f"Error in disconnect: {e}")
+            logger.exception("disconnect_error", "Error in disconnect", room=self.room_id)
 
     async def receive(self, text_data=None, bytes_data=None):
         try:
@@ -93,27 +121,58 @@ class ServerConsumer(AsyncWebsocketConsumer):
             # Authenticated Phase
             if self.user is None:
                 if message_type in ['resume-request', 'resume-info']:
-                    print(f"Blocking {message_type} for guest user")
+                    logger.info("guest_blocked", "Blocked resume message for guest", room=self.room_id, user=self.display_name, message_type=message_type)
                     return
 
                 if message_type == 'file-meta':
                     payload = data.get('payload')
                     if isinstance(payload, dict) and payload.get('resumed'):
-                        print("Blocking resume capability for guest in file-meta")
+                        logger.info("guest_blocked", "Blocked resumed file-meta for guest", room=self.room_id, user=self.display_name, message_type=message_type)
                         await self.send_error("Checkpoint usage is restricted to signed-in users.")
                         return
 
-            if message_type == 'copy':
-                await self._handle_copy_message(data)
-            else:
-                await self._handle_generic_message(data)
+            decision = self.flood.check(message_type)
+            if decision == COALESCE:
+                self.flood.stash(message_type, data)
+                self._schedule_flush()
+                return
+            if decision == DROP:
+                if not self.flood.dropping:
+                    self.flood.dropping = True
+                    await self.send_error("Rate limit exceeded, messages are being dropped")
+                return
+
+            await self._dispatch(message_type, data)
 
         except json.JSONDecodeError:
             await self.send_error("Invalid JSON format")
         except Exception as e:
-            print(f"Error in receive: {e}")
+            logger.exception("receive_error", "Error in receive", room=self.room_id)
             await self.send_error("Internal server error processing message")
 
+    async def _dispatch(self, message_type, data):
+        if message_type == 'copy':
+            await self._handle_copy_message(data)
+        elif message_type == 'history_fetch':
+            await self._handle_history_fetch(data)
+        else:
+            await self._handle_generic_message(data)
+
+    # ------------------------------------------------------------------
+    # Flood control
+    # ------------------------------------------------------------------
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_coalesced())
+
+    async def _flush_coalesced(self):
+        """Send the latest value of each coalesced type once budget allows."""
+        while self.flood.pending:
+            await asyncio.sleep(self.flood.pending_delay())
+            for data in self.flood.take_pending():
+                await self._dispatch(data.get('type') or data.get('typeof'), data)
+
     # ------------------------------------------------------------------
     # Authentication
     # ------------------------------------------------------------------
@@ -128,11 +187,11 @@ class ServerConsumer(AsyncWebsocketConsumer):
 
             self.user = user
             self.display_name = f"{self.channel_name}_{user.username}"
-            print(f"User Authenticated: {self.display_name}")
+            logger.info("auth", "User authenticated", room=self.room_id, user=self.display_name)
             return True
 
         except (TokenError, InvalidToken, User.DoesNotExist) as e:
-            print(f"Auth Error: {e}")
+            logger.warning("auth_error", str(e), room=self.room_id)
             return False
 
     # ------------------------------------------------------------------
@@ -140,12 +199,11 @@ class ServerConsumer(AsyncWebsocketConsumer):
     # ------------------------------------------------------------------
 
     async def _join_room(self):
-        await self.channel_layer.group_add(
-            self.room_id,
-            self.channel_name
-        )
-        await sync_to_async(self._update_user_list)(add=True)
+        await fanout.join(self.channel_layer, self.room_id, self.channel_name)
+        room_size = await sync_to_async(self._update_user_list)(add=True)
+        fanout.note_room_size(self.room_id, room_size)
         await self._broadcast_user_list()
+        await self._send_history()
 
     # ------------------------------------------------------------------
     # Message handlers
@@ -158,6 +216,7 @@ class ServerConsumer(AsyncWebsocketConsumer):
         event = {
             'type': 'group_copy_handler',
             'message_type': 'copy',
+            'message_id': uuid.uuid4().hex,
             'copy_text': copy_text,
             'file_data': data.get('file'),
             'file_name': file_name,
@@ -165,7 +224,8 @@ class ServerConsumer(AsyncWebsocketConsumer):
             'sender_channel_name': self.channel_name,
         }
 
-        await self.channel_layer.group_send(self.room_id, event)
+        self._record_history(event)
+        await fanout.group_send(self.channel_layer, self.room_id, event)
 
         if file_name:
             await self.send_json({
@@ -173,6 +233,22 @@ class ServerConsumer(AsyncWebsocketConsumer):
                 'sent': 'done'
             })
 
+    async def _handle_history_fetch(self, data):
+        ref = data.get('ref') or (data.get('payload') or {}).get('ref')
+        entry = room_history.get_attachment(self.room_id, ref) if ref else None
+        if entry is None:
+            await self.send_error("Attachment no longer available")
+            return
+
+        await self.send_json({
+            'type': 'copy',
+            'copy_text': entry.copy_text,
+            'file_data': entry.file_data,
+            'file_name': entry.file_name,
+            'f_user': self._get_clean_username(entry.f_user),
+            'file_ref': ref,
+        })
+
     async def _handle_generic_message(self, data):
         payload = data.get('payload') or data.get('disa')
         event = {
@@ -181,13 +257,17 @@ class ServerConsumer(AsyncWebsocketConsumer):
             'payload': payload,
             'sender_channel_name': self.channel_name,
         }
-        await self.channel_layer.group_send(self.room_id, event)
+        await fanout.group_send(self.channel_layer, self.room_id, event)
 
     # ------------------------------------------------------------------
     # Channel layer event handlers (called by the channel layer)
     # ------------------------------------------------------------------
 
     async def group_copy_handler(self, event):
+        # Every local member sees the event; the first one records it so that
+        # rooms whose sender lives on another node still get history here.
+        self._record_history(event)
+
         if event.get('sender_channel_name') == self.channel_name:
             return
 
@@ -234,6 +314,31 @@ class ServerConsumer(AsyncWebsocketConsumer):
     # Helpers
     # ------------------------------------------------------------------
 
+    def _record_history(self, event):
+        if not event.get('message_id'):
+            return
+        room_history.record(
+            self.room_id,
+            event['message_id'],
+            event.get('f_user'),
+            copy_text=event.get('copy_text'),
+            file_name=event.get('file_name'),
+            file_data=event.get('file_data'),
+        )
+
+    async def _send_history(self):
+        messages = room_history.snapshot(self.room_id)
+        if not messages:
+            return
+
+        for message in messages:
+            message['f_user'] = self._get_clean_username(message['f_user'])
+
+        await self.send_json({
+            'type': 'history',
+            'messages': messages,
+        })
+
     async def _broadcast_user_list(self):
         key = f"group_users_{self.room_id}"
         users_set = await sync_to_async(cache.get)(key, set())
@@ -245,7 +350,7 @@ class ServerConsumer(AsyncWebsocketConsumer):
                 'list': str(user_list),
                 'new_user': str(getattr(self, 'display_name', ''))
             }
-            await self.channel_layer.group_send(self.room_id, event)
+            await fanout.group_send(self.channel_layer, self.room_id, event)
 
     def _update_user_list(self, add=True):
         key = f"group_users_{self.room_id}"
@@ -260,6 +365,7 @@ class ServerConsumer(AsyncWebsocketConsumer):
             users.discard(self.display_name)
 
         cache.set(key, users, timeout=None)
+        return len(users)
 
     def _get_clean_username(self, internal_name):
         if not internal_name:
@@ -0,0 +1,146 @@
+import time
+import zlib
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from server import config
+from server.metrics import metrics
+from Project.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Broadcast:
+    layer: object
+    room: str
+    message: dict
+    groups: List[str]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class FanoutScheduler:
+    """
+    Splits broadcasts to large rooms into sub-group sends.
+
+    Every member joins the room group and one shard group
+    (`<room>.fanout<k>`, chosen by hashing its channel name). Rooms below
+    `large_room_threshold` are sent to the room group directly, so small
+    rooms never wait behind the scheduler. Broadcasts to large rooms are
+    queued and dispatched one shard at a time, round-robin across rooms;
+    a room keeps the dispatcher for at most `latency_budget` seconds per
+    turn before the next room is served.
+    """
+
+    def __init__(
+        self,
+        large_room_threshold: int = config.FANOUT_LARGE_ROOM_THRESHOLD,
+        shards: int = config.FANOUT_SHARDS,
+        latency_budget: float = config.FANOUT_LATENCY_BUDGET_MS / 1000,
+    ):
+        self.large_room_threshold = large_room_threshold
+        self.shards = shards
+        self.latency_budget = latency_budget
+        self.room_sizes: Dict[str, int] = {}
+        self.queues: Dict[str, Deque[Broadcast]] = {}
+        self.ready: Deque[str] = deque()
+        self._worker: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Membership
+    # ------------------------------------------------------------------
+
+    def shard_group(self, room: str, channel_name: str) -> str:
+        shard = zlib.crc32(channel_name.encode()) % self.shards
+        return f"{room}.fanout{shard}"
+
+    async def join(self, layer, room: str, channel_name: str) -> None:
+        await layer.group_add(room, channel_name)
+        await layer.group_add(self.shard_group(room, channel_name), channel_name)
+
+    async def leave(self, layer, room: str, channel_name: str) -> None:
+        await layer.group_discard(self.shard_group(room, channel_name), channel_name)
+        await layer.group_discard(room, channel_name)
+
+    def note_room_size(self, room: str, size: int) -> None:
+        if size > 0:
+            self.room_sizes[room] = size
+        else:
+            self.room_sizes.pop(room, None)
+
+    def is_large(self, room: str) -> bool:
+        return self.room_sizes.get(room, 0) >= self.large_room_threshold
+
+    # ------------------------------------------------------------------
+    # Broadcasting
+    # ------------------------------------------------------------------
+
+    async def group_send(self, layer, room: str, message: dict) -> None:
+        # Keep per-room ordering: once a room has queued broadcasts, later
+        # ones queue behind them even if the room shrank meanwhile.
+        if not self.is_large(room) and room not in self.queues:
+            await layer.group_send(room, message)
+            return
+
+        groups = [f"{room}.fanout{shard}" for shard in reversed(range(self.shards))]
+        queue = self.queues.get(room)
+        if queue is None:
+            queue = self.queues[room] = deque()
+            self.ready.append(room)
+        queue.append(Broadcast(layer, room, message, groups))
+        self._ensure_worker()
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self.ready:
+            room = self.ready.popleft()
+            queue = self.queues.get(room)
+            if not queue:
+                self.queues.pop(room, None)
+                continue
+
+            turn_started = time.monotonic()
+            while queue:
+                broadcast = queue[0]
+                group = broadcast.groups.pop()
+                try:
+                    await broadcast.layer.group_send(group, broadcast.message)
+                except Exception as e:
+                    logger.warning("send_failed", "Shard group_send failed", room=room, group=group, error=str(e))
+
+                if not broadcast.groups:
+                    queue.popleft()
+                    self._record(broadcast)
+
+                if time.monotonic() - turn_started >= self.latency_budget:
+                    break
+
+            if queue:
+                self.ready.append(room)
+            else:
+                self.queues.pop(room, None)
+
+            # Let other rooms' direct sends and consumers run between turns
+            await asyncio.sleep(0)
+
+    def _record(self, broadcast: Broadcast) -> None:
+        latency = time.monotonic() - broadcast.enqueued_at
+        metrics.histogram('fanout.broadcast_latency').observe(latency)
+        metrics.counter('fanout.broadcasts').inc()
+
+
+# Global singleton instance
+fanout = FanoutScheduler()
+metrics.gauge('fanout.pending_broadcasts', fanout.pending)
+metrics.gauge('fanout.large_rooms', lambda: sum(
+    1 for room in fanout.room_sizes if fanout.is_large(room)
+))
@@ -0,0 +1,174 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from server.metrics import metrics
+
+ALLOW = 'allow'
+DROP = 'drop'
+COALESCE = 'coalesce'
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def has(self, now: float, tokens: float = 1) -> bool:
+        self._refill(now)
+        return self.tokens >= tokens
+
+    def consume(self, now: float, tokens: float = 1) -> bool:
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def time_until(self, now: float, tokens: float = 1) -> float:
+        self._refill(now)
+        missing = tokens - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float('inf')
+
+
+@dataclass(frozen=True)
+class FloodPolicy:
+    name: str
+    connection_rate: float
+    connection_burst: float
+    room_rate: float = 0.0
+    room_burst: float = 0.0
+    # Over budget these keep only their latest value and are sent later
+    coalesce_types: FrozenSet[str] = field(default_factory=frozenset)
+    # Never dropped (protocol control messages); they still spend tokens
+    protected_types: FrozenSet[str] = field(default_factory=frozenset)
+
+
+class RoomBuckets:
+    """Shared per-room buckets, refcounted so empty rooms free their bucket."""
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], List[Any]] = {}
+
+    def acquire(self, policy: FloodPolicy, room: str) -> TokenBucket:
+        key = (policy.name, room)
+        entry = self._buckets.get(key)
+        if entry is None:
+            entry = [TokenBucket(policy.room_rate, policy.room_burst), 0]
+            self._buckets[key] = entry
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, policy: FloodPolicy, room: str) -> None:
+        key = (policy.name, room)
+        entry = self._buckets.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+room_buckets = RoomBuckets()
+
+
+class FloodController:
+    """
+    Token-bucket limiter for one websocket connection.
+
+    `check()` decides what to do with an incoming message: ALLOW it, DROP
+    it, or COALESCE it (the caller stashes it with `stash()` and sends the
+    latest value once `pending_delay()` has elapsed).
+    """
+
+    def __init__(self, policy: FloodPolicy, room: Optional[str] = None):
+        self.policy = policy
+        self.room = room
+        self.connection_bucket = TokenBucket(policy.connection_rate, policy.connection_burst)
+        self.room_bucket = room_buckets.acquire(policy, room) if room and policy.room_rate else None
+        self.pending: Dict[str, Any] = {}
+        self.dropping = False
+
+    def check(self, message_type: Optional[str], now: Optional[float] = None) -> str:
+        now = time.monotonic() if now is None else now
+        label = self._label(message_type)
+
+        if message_type in self.policy.protected_types:
+            self._spend(now)
+            metrics.counter('flood.allowed', policy=self.policy.name).inc()
+            return ALLOW
+
+        if self._spend(now):
+            self.dropping = False
+            # A fresh value supersedes anything still waiting to be flushed
+            self.pending.pop(message_type, None)
+            metrics.counter('flood.allowed', policy=self.policy.name).inc()
+            return ALLOW
+
+        if message_type in self.policy.coalesce_types:
+            metrics.counter('flood.coalesced', policy=self.policy.name, type=label).inc()
+            return COALESCE
+
+        metrics.counter('flood.dropped', policy=self.policy.name, type=label).inc()
+        return DROP
+
+    def stash(self, message_type: str, data: Any) -> None:
+        self.pending[message_type] = data
+
+    def pending_delay(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        delay = self.connection_bucket.time_until(now)
+        if self.room_bucket is not None:
+            delay = max(delay, self.room_bucket.time_until(now))
+        return delay
+
+    def take_pending(self, now: Optional[float] = None) -> List[Any]:
+        """Return stashed messages that fit in the budget right now."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        for message_type in list(self.pending):
+            if not self._spend(now):
+                break
+            ready.append(self.pending.pop(message_type))
+            metrics.counter('flood.flushed', policy=self.policy.name).inc()
+        return ready
+
+    def close(self) -> None:
+        if self.room_bucket is not None:
+            room_buckets.release(self.policy, self.room)
+            self.room_bucket = None
+        self.pending.clear()
+
+    def _spend(self, now: float) -> bool:
+        if not self.connection_bucket.has(now):
+            return False
+        if self.room_bucket is not None and not self.room_bucket.has(now):
+            return False
+        self.connection_bucket.consume(now)
+        if self.room_bucket is not None:
+            self.room_bucket.consume(now)
+        return True
+
+    def _label(self, message_type: Optional[str]) -> str:
+        # Only known types become metric labels; client input is unbounded
+        if message_type in self.policy.coalesce_types or message_type in self.policy.protected_types:
+            return message_type
+        return 'other'
+
+
+metrics.gauge('flood.room_buckets', lambda: len(room_buckets))
@@ -0,0 +1,203 @@
+import time
+import uuid
+import random
+import string
+import asyncio
+from copy import deepcopy
+
+from django.utils.module_loading import import_string
+from channels.exceptions import ChannelFull
+from channels.layers import InMemoryChannelLayer
+
+
+class HybridChannelLayer(InMemoryChannelLayer):
+    """
+    Local-first channel layer.
+
+    Channels created by this process are named `<prefix>.<node_id>!<suffix>`,
+    so the owning node can be read straight from the channel name. Messages
+    for local channels and local group members are delivered in memory
+    exactly like InMemoryChannelLayer; only messages for channels owned by
+    another node (and one message per remote node for a group send) go
+    through the cross-process transport.
+
+    CONFIG:
+        transport: dotted path of a transport class
+            (see server.layers.transports)
+        transport_config: kwargs for the transport
+        node_id: optional fixed node id (random per process by default)
+        local_fastpath: set False to route local traffic through the
+            transport too (used by the benchmark to mimic a Redis layer)
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        transport="server.layers.transports.LocalTransport",
+        transport_config=None,
+        node_id=None,
+        local_fastpath=True,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self.local_fastpath = local_fastpath
+
+        transport_class = import_string(transport) if isinstance(transport, str) else transport
+        self.transport = transport_class(**(transport_config or {}))
+        self._started = False
+
+    # ------------------------------------------------------------------
+    # Channel layer API
+    # ------------------------------------------------------------------
+
+    async def new_channel(self, prefix="specific."):
+        return "%s.%s!%s" % (
+            prefix,
+            self.node_id,
+            "".join(random.choice(string.ascii_letters) for i in range(12)),
+        )
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+
+        node = self._node_of(channel)
+        if self._is_local(node):
+            await super().send(channel, message)
+            return
+
+        await self._ensure_started()
+        await self.transport.send(node, {
+            "kind": "channel",
+            "channel": channel,
+            "message": message,
+        })
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+
+        node = self._node_of(channel)
+        if node is not None and node != self.node_id:
+            # Membership is tracked by the node that owns the channel
+            await self._ensure_started()
+            await self.transport.send(node, {
+                "kind": "group_add",
+                "group": group,
+                "channel": channel,
+            })
+            return
+
+        first_member = not self.groups.get(group)
+        await super().group_add(group, channel)
+        if first_member:
+            await self._ensure_started()
+            await self.transport.join(group)
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+
+        node = self._node_of(channel)
+        if node is not None and node != self.node_id:
+            await self._ensure_started()
+            await self.transport.send(node, {
+                "kind": "group_discard",
+                "group": group,
+                "channel": channel,
+            })
+            return
+
+        had_members = bool(self.groups.get(group))
+        await super().group_discard(group, channel)
+        if had_members and not self.groups.get(group):
+            await self._ensure_started()
+            await self.transport.leave(group)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+
+        await self._ensure_started()
+
+        if self.local_fastpath:
+            self._deliver_group_locally(group, message)
+            remote_nodes = await self.transport.nodes_for(group) - {self.node_id}
+        else:
+            remote_nodes = await self.transport.nodes_for(group)
+
+        # One transport message per remote node, not per remote member
+        for node in remote_nodes:
+            await self.transport.send(node, {
+                "kind": "group",
+                "group": group,
+                "message": message,
+            })
+
+    async def flush(self):
+        await super().flush()
+        await self.transport.flush()
+
+    async def close(self):
+        await self.transport.close()
+        self._started = False
+
+    # ------------------------------------------------------------------
+    # Inbound traffic from the transport
+    # ------------------------------------------------------------------
+
+    async def _on_envelope(self, envelope):
+        kind = envelope.get("kind")
+
+        if kind == "channel":
+            try:
+                self._deliver_locally(envelope["channel"], envelope["message"])
+            except ChannelFull:
+                pass
+        elif kind == "group":
+            self._deliver_group_locally(envelope["group"], envelope["message"])
+        elif kind == "group_add":
+            await self.group_add(envelope["group"], envelope["channel"])
+        elif kind == "group_discard":
+            await self.group_discard(envelope["group"], envelope["channel"])
+
+    def _local_groups(self):
+        return [group for group, members in self.groups.items() if members]
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    async def _ensure_started(self):
+        if self._started:
+            return
+        self._started = True
+        await self.transport.start(self.node_id, self._on_envelope, self._local_groups)
+
+    def _deliver_locally(self, channel, message):
+        # Same semantics as InMemoryChannelLayer.send, minus the coroutine hop
+        # (the queues are unbounded, so put_nowait never blocks).
+        queue = self.channels.setdefault(channel, asyncio.Queue())
+        if queue.qsize() >= self.capacity:
+            raise ChannelFull(channel)
+        queue.put_nowait((time.time() + self.expiry, deepcopy(message)))
+
+    def _deliver_group_locally(self, group, message):
+        self._clean_expired()
+        for channel in list(self.groups.get(group, {})):
+            try:
+                self._deliver_locally(channel, message)
+            except ChannelFull:
+                pass
+
+    def _node_of(self, channel):
+        if "!" not in channel:
+            return None
+        process_part = channel[: channel.index("!")]
+        return process_part.rsplit(".", 1)[-1]
+
+    def _is_local(self, node):
+        return node is None or (self.local_fastpath and node == self.node_id)
+
@@ -0,0 +1,301 @@
+import time
+import asyncio
+import logging
+from copy import deepcopy
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[dict], Awaitable[None]]
+LocalGroups = Callable[[], Iterable[str]]
+
+
+class BaseTransport:
+    """
+    Cross-process link used by HybridChannelLayer.
+
+    A transport only has to do two things: carry an envelope to a named
+    node, and know which nodes have members in which groups so that a
+    group send can skip nodes with no members. `nodes_for` is called on
+    every group send; a node must be listed there as soon as its `join`
+    returns, or a group send racing the join would miss it.
+    """
+
+    async def start(self, node_id: str, deliver: Deliver, local_groups: LocalGroups) -> None:
+        raise NotImplementedError
+
+    async def send(self, node_id: str, envelope: dict) -> None:
+        raise NotImplementedError
+
+    async def join(self, group: str) -> None:
+        raise NotImplementedError
+
+    async def leave(self, group: str) -> None:
+        raise NotImplementedError
+
+    async def nodes_for(self, group: str) -> Set[str]:
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalBus:
+    def __init__(self):
+        self.nodes: Dict[str, Deliver] = {}
+        self.groups: Dict[str, Set[str]] = {}
+
+
+_buses: Dict[str, LocalBus] = {}
+
+
+class LocalTransport(BaseTransport):
+    """
+    In-process stand-in for a real transport.
+
+    Every layer that uses the same `bus` name behaves like a separate node
+    of one cluster, which lets tests run several "processes" in a single
+    event loop. `latency` (seconds) simulates the network round trip of a
+    real broker.
+    """
+
+    def __init__(self, bus: str = "default", latency: float = 0.0):
+        self.bus = _buses.setdefault(bus, LocalBus())
+        self.latency = latency
+        self.node_id: Optional[str] = None
+        self.sent = 0
+
+    async def start(self, node_id, deliver, local_groups):
+        self.node_id = node_id
+        self.bus.nodes[node_id] = deliver
+
+    async def send(self, node_id, envelope):
+        self.sent += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        deliver = self.bus.nodes.get(node_id)
+        if deliver is None:
+            return
+        # Copy to mimic serialisation: the receiver must never share objects
+        await deliver(deepcopy(envelope))
+
+    async def join(self, group):
+        self.bus.groups.setdefault(group, set()).add(self.node_id)
+
+    async def leave(self, group):
+        nodes = self.bus.groups.get(group)
+        if nodes is None:
+            return
+        nodes.discard(self.node_id)
+        if not nodes:
+            del self.bus.groups[group]
+
+    async def nodes_for(self, group):
+        return set(self.bus.groups.get(group, ()))
+
+    async def flush(self):
+        self.bus.groups.clear()
+
+    async def close(self):
+        self.bus.nodes.pop(self.node_id, None)
+        for group in list(self.bus.groups):
+            await self.leave(group)
+
+
+class RedisTransport(BaseTransport):
+    """
+    Redis transport: pub/sub for envelopes, sorted sets for membership.
+
+    Each node subscribes to its own inbox channel. Group membership lives
+    in Redis, as with the channels_redis layer: one sorted set per group
+    holding node ids scored by expiry time. `join` returns only once the
+    node is in the set, so a group send from another node that starts
+    after a local `group_add` always reaches it. Nodes re-add their groups
+    every `refresh_interval` seconds, and a crashed node ages out after
+    three intervals. Each group send reads the set once.
+
+    Envelopes go through pub/sub, which is at-most-once: a node that is
+    not subscribed at that moment (restarting, or reconnecting after a
+    connection error) never sees them. A `group_add` for a channel owned
+    by another node is forwarded as an envelope and shares that window;
+    consumers add their own channels, so this does not arise in the app.
+
+    msgpack and redis are imported here rather than at module level, so
+    the in-memory default layer does not depend on them. Pass `client`
+    to use an existing redis.asyncio client (tests use fakeredis).
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "eco2.layer",
+        refresh_interval: float = 15.0,
+        client=None,
+    ):
+        import msgpack
+        import redis.asyncio as aioredis
+
+        self._msgpack = msgpack
+        self._aioredis = aioredis
+        self.url = url
+        self.prefix = prefix
+        self.refresh_interval = refresh_interval
+        self.node_id: Optional[str] = None
+        self._deliver: Optional[Deliver] = None
+        self._local_groups: Optional[LocalGroups] = None
+        self._redis = client
+        self._fixed_client = client is not None
+        self._pubsub = None
+        self._tasks = []
+        self._loop = None
+
+    @property
+    def _expiry(self):
+        return self.refresh_interval * 3
+
+    def _inbox(self, node_id):
+        return f"{self.prefix}:node:{node_id}"
+
+    def _group_key(self, group):
+        return f"{self.prefix}:group:{group}"
+
+    async def start(self, node_id, deliver, local_groups):
+        self.node_id = node_id
+        self._deliver = deliver
+        self._local_groups = local_groups
+        self._loop = asyncio.get_running_loop()
+
+        if not self._fixed_client:
+            self._redis = self._aioredis.from_url(self.url)
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self._inbox(node_id))
+
+        self._tasks = [
+            asyncio.create_task(self._read_loop()),
+            asyncio.create_task(self._refresh_loop()),
+        ]
+
+    async def send(self, node_id, envelope):
+        await self._ensure_loop()
+        await self._publish(self._inbox(node_id), envelope)
+
+    async def join(self, group):
+        await self._ensure_loop()
+        await self._touch([group])
+
+    async def leave(self, group):
+        await self._ensure_loop()
+        await self._redis.zrem(self._group_key(group), self.node_id)
+
+    async def nodes_for(self, group):
+        await self._ensure_loop()
+        members = await self._redis.zrangebyscore(self._group_key(group), time.time(), "+inf")
+        return {m.decode() if isinstance(m, bytes) else m for m in members}
+
+    async def flush(self):
+        await self._ensure_loop()
+        keys = [key async for key in self._redis.scan_iter(match=self._group_key("*"))]
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def close(self):
+        if self._pubsub is None:
+            return
+        try:
+            groups = list(self._local_groups())
+            if groups:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for group in groups:
+                        pipe.zrem(self._group_key(group), self.node_id)
+                    await pipe.execute()
+        except Exception:
+            pass
+        await self._release(None if self._fixed_client else self._redis, self._pubsub, self._tasks)
+        if not self._fixed_client:
+            self._redis = None
+        self._pubsub = None
+        self._tasks = []
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _ensure_loop(self):
+        # Connections and reader tasks belong to the loop that started them
+        # (tests and async_to_sync may run each call on a fresh loop).
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        old_loop = self._loop
+        resources = (None if self._fixed_client else self._redis, self._pubsub, self._tasks)
+        if not self._fixed_client:
+            self._redis = None
+        self._pubsub = None
+        self._tasks = []
+        if resources[1] is not None:
+            if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+                # Still alive in another thread: tear down where they live
+                asyncio.run_coroutine_threadsafe(self._release(*resources), old_loop)
+            else:
+                await self._release(*resources)
+        await self.start(self.node_id, self._deliver, self._local_groups)
+
+    async def _release(self, client, pubsub, tasks):
+        """Cancels reader tasks and closes a client; errors from a dead loop are ignored."""
+        for task in tasks:
+            try:
+                task.cancel()
+            except RuntimeError:
+                # Its loop is already closed, so it can never run again
+                pass
+        for resource in (pubsub, client):
+            if resource is None:
+                continue
+            try:
+                await resource.close()
+            except Exception as e:
+                logger.debug("[RedisTransport] Closing stale connection failed: %s", e)
+
+    async def _publish(self, channel, payload):
+        await self._redis.publish(channel, self._msgpack.packb(payload, use_bin_type=True))
+
+    async def _touch(self, groups):
+        # (Re-)adds this node to `groups`; dead nodes are pruned on the way
+        now = time.time()
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for group in groups:
+                key = self._group_key(group)
+                pipe.zadd(key, {self.node_id: now + self._expiry})
+                pipe.zremrangebyscore(key, "-inf", now)
+                pipe.expire(key, int(self._expiry) + 1)
+            await pipe.execute()
+
+    async def _read_loop(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message is None:
+                    continue
+
+                await self._deliver(self._msgpack.unpackb(message["data"], raw=False))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[RedisTransport] Dropped inbound message: %s", e)
+                await asyncio.sleep(0.1)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                groups = list(self._local_groups())
+                if groups:
+                    await self._touch(groups)
+            except Exception as e:
+                logger.warning("[RedisTransport] Membership refresh failed: %s", e)
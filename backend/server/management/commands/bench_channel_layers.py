@@ -0,0 +1,125 @@
+import time
+import uuid
+import asyncio
+import statistics
+
+from django.core.management.base import BaseCommand
+from channels.layers import InMemoryChannelLayer
+
+from server.layers.hybrid import HybridChannelLayer
+
+
+class Command(BaseCommand):
+    help = "Compare group broadcast cost of the in-memory, hybrid and Redis-style channel layers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=50)
+        parser.add_argument("--room-size", type=int, default=4)
+        parser.add_argument("--messages", type=int, default=100, help="broadcasts per room")
+        parser.add_argument(
+            "--remote-fraction", type=float, default=0.0,
+            help="share of room members living on a second node",
+        )
+        parser.add_argument(
+            "--latency-ms", type=float, default=0.5,
+            help="simulated broker round trip for the stand-in transport",
+        )
+        parser.add_argument("--redis-url", default=None, help="also benchmark against a real Redis")
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        latency = options["latency_ms"] / 1000
+        bus = f"bench-{uuid.uuid4().hex[:8]}"
+        local_transport = "server.layers.transports.LocalTransport"
+
+        candidates = [
+            # Single process only: remote members are served locally here
+            ("in-memory", lambda: (InMemoryChannelLayer(), None)),
+            ("hybrid", lambda: self._pair(
+                local_transport, {"bus": bus + "-h", "latency": latency}, True)),
+            ("redis-style", lambda: self._pair(
+                local_transport, {"bus": bus + "-r", "latency": latency}, False)),
+        ]
+
+        if options["redis_url"]:
+            from channels_redis.core import RedisChannelLayer
+
+            redis_transport = "server.layers.transports.RedisTransport"
+            candidates += [
+                ("channels_redis", lambda: (
+                    RedisChannelLayer(hosts=[options["redis_url"]]), None)),
+                ("hybrid+redis", lambda: self._pair(
+                    redis_transport, {"url": options["redis_url"]}, True)),
+            ]
+
+        self.stdout.write(
+            f"rooms={options['rooms']} room_size={options['room_size']} "
+            f"messages/room={options['messages']} remote={options['remote_fraction']:.0%} "
+            f"simulated_rtt={options['latency_ms']}ms"
+        )
+        self.stdout.write(f"{'layer':<16}{'deliveries/s':>14}{'p50 ms':>10}{'p99 ms':>10}")
+
+        for name, factory in candidates:
+            sender, remote = factory()
+            result = await self._bench(sender, remote or sender, options)
+            self.stdout.write(
+                f"{name:<16}{result['throughput']:>14,.0f}"
+                f"{result['p50'] * 1000:>10.3f}{result['p99'] * 1000:>10.3f}"
+            )
+            for layer in filter(None, (sender, remote)):
+                # channels_redis layers expose close_pools() instead of close()
+                close = getattr(layer, "close", None) or layer.close_pools
+                await close()
+
+    def _pair(self, transport, transport_config, local_fastpath):
+        """Two nodes of one cluster: the sender and a node for remote members."""
+        return tuple(
+            HybridChannelLayer(
+                transport=transport,
+                transport_config=transport_config,
+                local_fastpath=local_fastpath,
+            )
+            for _ in range(2)
+        )
+
+    async def _bench(self, sender, remote, options):
+        room_size = options["room_size"]
+        remote_members = int(round(room_size * options["remote_fraction"]))
+
+        rooms = []
+        for r in range(options["rooms"]):
+            group = f"bench-room-{r}"
+            members = []
+            for m in range(room_size):
+                layer = remote if m < remote_members else sender
+                channel = await layer.new_channel()
+                await layer.group_add(group, channel)
+                members.append((layer, channel))
+            rooms.append((group, members))
+
+        # Let membership settle for transports that gossip it
+        await asyncio.sleep(0.2)
+
+        latencies = []
+        started = time.perf_counter()
+        for i in range(options["messages"]):
+            for group, members in rooms:
+                t0 = time.perf_counter()
+                await sender.group_send(group, {"type": "bench.message", "seq": i})
+                await asyncio.gather(*(layer.receive(channel) for layer, channel in members))
+                latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+        for group, members in rooms:
+            for layer, channel in members:
+                await layer.group_discard(group, channel)
+
+        latencies.sort()
+        deliveries = len(latencies) * room_size
+        return {
+            "throughput": deliveries / elapsed if elapsed else 0.0,
+            "p50": statistics.median(latencies),
+            "p99": latencies[int(len(latencies) * 0.99) - 1],
+        }
@@ -0,0 +1,112 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; `counts[i]` is the number of samples <= bounds[i]."""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> dict:
+        return {
+            'buckets': {str(b): c for b, c in zip(self.bounds + ('+Inf',), self.counts)},
+            'count': self.count,
+            'sum': self.total,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics for the realtime apps.
+
+    Labels must come from a small, fixed set of values (never raw client
+    input) to keep the registry bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, tuple], Counter] = {}
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._gauges: Dict[str, Callable[[], object]] = {}
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = (name, tuple(sorted(labels.items())))
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        return counter
+
+    def histogram(self, name: str, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(bounds))
+        return histogram
+
+    def gauge(self, name: str, callback: Callable[[], object]) -> None:
+        """Register a callback evaluated on every snapshot."""
+        self._gauges[name] = callback
+
+    def snapshot(self) -> dict:
+        def render(items) -> List[dict]:
+            return [
+                {'name': name, 'labels': dict(labels), **value}
+                for (name, labels), value in sorted(items, key=lambda item: item[0])
+            ]
+
+        gauges = {}
+        for name, callback in list(self._gauges.items()):
+            try:
+                gauges[name] = callback()
+            except Exception as e:
+                gauges[name] = {'error': str(e)}
+
+        return {
+            'counters': render((key, {'value': c.value}) for key, c in list(self._counters.items())),
+            'histograms': render((key, h.snapshot()) for key, h in list(self._histograms.items())),
+            'gauges': gauges,
+        }
+
+
+# Global singleton instance
+metrics = MetricsRegistry()
@@ -1,6 +1,9 @@
 import asyncio
 import time
 from server.relay.transfer_buffer import TransferBuffer
+from Project.logging import get_logger
+
+logger = get_logger(__name__)
 
 class ReceiverHandler:
     def __init__(self, buffer: TransferBuffer, websocket):
@@ -21,7 +24,7 @@ class ReceiverHandler:
                 try:
                     await self.websocket.send(bytes_data=chunk.data)
                 except Exception as e:
-                    print(f"[ReceiverHandler] Failed to send chunk: {e}")
+                    logger.warning("send_failed", "Failed to send chunk", transfer_id=self.buffer.transfer_id, error=str(e))
                     break
 
                 # Check twisted backpressure
@@ -40,10 +43,10 @@ class ReceiverHandler:
                         await sender_consumer.handler.check_resume()
 
         except asyncio.CancelledError:
-            print(f"[ReceiverHandler] Download cancelled for {self.buffer.transfer_id}")
+            logger.info("download_cancelled", "Download cancelled", transfer_id=self.buffer.transfer_id)
             raise
         except Exception as e:
-            print(f"[ReceiverHandler] Unexpected error for {self.buffer.transfer_id}: {e}")
+            logger.exception("download_error", "Unexpected error during download", transfer_id=self.buffer.transfer_id)
             if hasattr(self.websocket, 'session'):
                 sender_ws = self.websocket.session.sender_ws
                 if sender_ws:
@@ -2,6 +2,9 @@ import asyncio
 import time
 import json
 from server.relay.transfer_buffer import TransferBuffer, Chunk
+from Project.logging import get_logger
+
+logger = get_logger(__name__)
 
 class SenderHandler:
     def __init__(self, buffer: TransferBuffer, websocket):
@@ -44,7 +47,7 @@ class SenderHandler:
             self.total_bytes_sent += len(data)
 
         except Exception as e:
-            print(f"[SenderHandler] Error: {e}")
+            logger.exception("upload_error", "Error handling chunk", transfer_id=self.buffer.transfer_id)
             if hasattr(self.websocket, 'session'):
                 await self.websocket.session.cleanup()
 
@@ -2,6 +2,9 @@ import time
 import asyncio
 from dataclasses import dataclass
 from typing import Optional
+from Project.logging import get_logger
+
+logger = get_logger(__name__)
 
 @dataclass
 class Chunk:
@@ -77,7 +80,7 @@ class TransferBuffer:
                 # Loop continues - wait another 5 seconds instead of recursing
                 continue
             except Exception as e:
-                print(f"[TransferBuffer] Error in get_chunk: {e}")
+                logger.exception("get_chunk_error", "Error in get_chunk", transfer_id=self.transfer_id)
                 if self._finished:
                     return None
                 await asyncio.sleep(0.1)
@@ -0,0 +1,262 @@
+import time
+import hashlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from server import config
+from server.metrics import metrics
+
+
+@dataclass
+class HistoryEntry:
+    message_id: str
+    f_user: Optional[str]
+    copy_text: Optional[str] = None
+    file_name: Optional[str] = None
+    file_data: Optional[str] = None   # inline attachment (small files only)
+    file_ref: Optional[str] = None    # key into AttachmentStore (large files)
+    file_size: int = 0
+    timestamp: float = field(default_factory=time.time)
+    size: int = 0                     # bytes held by the entry itself
+
+    @property
+    def room_bytes(self) -> int:
+        # A referenced attachment is stored once per node, but every room
+        # that references it is charged for it
+        return self.size + (self.file_size if self.file_ref else 0)
+
+    def to_frame(self) -> dict:
+        frame = {
+            'type': 'copy',
+            'copy_text': self.copy_text,
+            'file_data': self.file_data,
+            'file_name': self.file_name,
+            'f_user': self.f_user,
+            'timestamp': self.timestamp,
+        }
+        if self.file_ref:
+            frame['file_ref'] = self.file_ref
+            frame['file_size'] = self.file_size
+        return frame
+
+
+class AttachmentStore:
+    """
+    Content-addressed, refcounted storage for large attachments.
+
+    A file re-sent to the same room (or to several rooms) is stored once;
+    history entries only hold the reference.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, str] = {}
+        self._refs: Dict[str, int] = {}
+        self.current_bytes = 0
+
+    def put(self, data: str) -> str:
+        ref = hashlib.sha1(data.encode('utf-8', 'surrogatepass')).hexdigest()
+        if ref not in self._data:
+            self._data[ref] = data
+            self._refs[ref] = 0
+            self.current_bytes += len(data)
+        self._refs[ref] += 1
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        return self._data.get(ref)
+
+    def release(self, ref: str) -> None:
+        if ref not in self._refs:
+            return
+        self._refs[ref] -= 1
+        if self._refs[ref] <= 0:
+            data = self._data.pop(ref)
+            del self._refs[ref]
+            self.current_bytes -= len(data)
+
+
+class RoomHistory:
+    """Ring buffer of the most recent copy/text messages of one room."""
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.entries: Deque[HistoryEntry] = deque()
+        self.message_ids: Set[str] = set()
+        self.current_bytes = 0
+
+    def append(self, entry: HistoryEntry) -> None:
+        self.entries.append(entry)
+        self.message_ids.add(entry.message_id)
+        self.current_bytes += entry.room_bytes
+
+    def pop_oldest(self) -> HistoryEntry:
+        entry = self.entries.popleft()
+        self.message_ids.discard(entry.message_id)
+        self.current_bytes -= entry.room_bytes
+        return entry
+
+
+class RoomHistoryManager:
+    """
+    Per-node store of room histories, bounded three ways:
+
+    - per room by message count and bytes,
+    - per node by total bytes (entries + attachments), evicting from the
+      least recently active room first.
+
+    A message larger than the room budget is not recorded at all, rather
+    than evicting the whole room and then itself. Ids of evicted messages
+    are remembered for `dedup_seconds`, so a late copy of the same group
+    message cannot be recorded a second time.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = config.ROOM_HISTORY_MAX_MESSAGES,
+        max_room_bytes: int = config.ROOM_HISTORY_MAX_ROOM_BYTES,
+        node_max_bytes: int = config.ROOM_HISTORY_NODE_MAX_BYTES,
+        inline_attachment_bytes: int = config.ROOM_HISTORY_INLINE_ATTACHMENT_BYTES,
+        dedup_seconds: float = config.ROOM_HISTORY_DEDUP_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.max_messages = max_messages
+        self.max_room_bytes = max_room_bytes
+        self.node_max_bytes = node_max_bytes
+        self.inline_attachment_bytes = inline_attachment_bytes
+        self.dedup_seconds = dedup_seconds
+        self.clock = clock
+        self.rooms: "OrderedDict[str, RoomHistory]" = OrderedDict()
+        self.attachments = AttachmentStore()
+        self.entry_bytes = 0
+        # (room_id, message_id) -> forget at, oldest first
+        self.evicted: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    @property
+    def current_bytes(self) -> int:
+        return self.entry_bytes + self.attachments.current_bytes
+
+    def record(
+        self,
+        room_id: str,
+        message_id: str,
+        f_user: Optional[str],
+        copy_text: Optional[str] = None,
+        file_name: Optional[str] = None,
+        file_data: Optional[str] = None,
+    ) -> bool:
+        """
+        Store a message. Returns False if it was already recorded (the same
+        group event is seen by every local member of the room) or is too
+        large to keep.
+        """
+        self._forget_evicted()
+        history = self.rooms.get(room_id)
+        if (history is not None and message_id in history.message_ids) \
+                or (room_id, message_id) in self.evicted:
+            return False
+
+        entry = HistoryEntry(
+            message_id=message_id,
+            f_user=f_user,
+            copy_text=copy_text,
+            file_name=file_name,
+        )
+        entry.size = len(copy_text or '') + len(file_name or '')
+        file_size = len(file_data) if file_data else 0
+        if entry.size + file_size > min(self.max_room_bytes, self.node_max_bytes):
+            metrics.counter('room_history.rejected').inc()
+            return False
+
+        if history is None:
+            history = RoomHistory(room_id)
+            self.rooms[room_id] = history
+        self.rooms.move_to_end(room_id)
+
+        if file_data:
+            entry.file_size = file_size
+            if entry.file_size > self.inline_attachment_bytes:
+                entry.file_ref = self.attachments.put(file_data)
+            else:
+                entry.file_data = file_data
+                entry.size += entry.file_size
+
+        history.append(entry)
+        self.entry_bytes += entry.size
+
+        while history.entries and (
+            len(history.entries) > self.max_messages
+            or history.current_bytes > self.max_room_bytes
+        ):
+            self._evict(history)
+
+        self._enforce_node_cap()
+        return True
+
+    def snapshot(self, room_id: str) -> List[dict]:
+        history = self.rooms.get(room_id)
+        if history is None:
+            return []
+        return [entry.to_frame() for entry in history.entries]
+
+    def get_attachment(self, room_id: str, ref: str) -> Optional[HistoryEntry]:
+        """Return the history entry holding `ref`, with its data inlined."""
+        history = self.rooms.get(room_id)
+        if history is None:
+            return None
+
+        for entry in history.entries:
+            if entry.file_ref == ref:
+                data = self.attachments.get(ref)
+                if data is None:
+                    return None
+                return HistoryEntry(
+                    message_id=entry.message_id,
+                    f_user=entry.f_user,
+                    copy_text=entry.copy_text,
+                    file_name=entry.file_name,
+                    file_data=data,
+                    timestamp=entry.timestamp,
+                )
+        return None
+
+    def drop_room(self, room_id: str) -> None:
+        history = self.rooms.get(room_id)
+        if history is None:
+            return
+        while history.entries:
+            self._evict(history)
+
+    def get_stats(self) -> dict:
+        return {
+            'rooms': len(self.rooms),
+            'messages': sum(len(h.entries) for h in self.rooms.values()),
+            'entry_bytes': self.entry_bytes,
+            'attachment_bytes': self.attachments.current_bytes,
+            'node_max_bytes': self.node_max_bytes,
+        }
+
+    def _evict(self, history: RoomHistory) -> None:
+        entry = history.pop_oldest()
+        self.evicted[(history.room_id, entry.message_id)] = self.clock() + self.dedup_seconds
+        self.entry_bytes -= entry.size
+        if entry.file_ref:
+            self.attachments.release(entry.file_ref)
+        if not history.entries:
+            self.rooms.pop(history.room_id, None)
+
+    def _forget_evicted(self) -> None:
+        now = self.clock()
+        while self.evicted and next(iter(self.evicted.values())) <= now:
+            self.evicted.popitem(last=False)
+
+    def _enforce_node_cap(self) -> None:
+        while self.rooms and self.current_bytes > self.node_max_bytes:
+            # Least recently active room is at the front of the OrderedDict
+            oldest_room = next(iter(self.rooms.values()))
+            self._evict(oldest_room)
+
+
+# Global singleton instance
+room_history = RoomHistoryManager()
+metrics.gauge('room_history', room_history.get_stats)
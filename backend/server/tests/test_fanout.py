@@ -0,0 +1,84 @@
+import uuid
+import pytest
+from server.fanout import FanoutScheduler
+from server.layers.hybrid import HybridChannelLayer
+
+
+class RecordingLayer:
+    """Records group sends instead of delivering them."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append(group)
+
+
+def make_layer():
+    return HybridChannelLayer(transport_config={"bus": f"fanout-{uuid.uuid4().hex[:8]}"})
+
+
+@pytest.mark.asyncio
+async def test_small_room_is_sent_directly():
+    """Rooms under the threshold use a single group_send on the room group"""
+    scheduler = FanoutScheduler(large_room_threshold=10, shards=4, latency_budget=0)
+    layer = RecordingLayer()
+    scheduler.note_room_size('small', 3)
+
+    await scheduler.group_send(layer, 'small', {'type': 'x'})
+
+    assert layer.sent == ['small']
+    assert scheduler.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_large_room_members_receive_once_through_shards():
+    """Each member of a large room gets a broadcast exactly once"""
+    scheduler = FanoutScheduler(large_room_threshold=5, shards=4, latency_budget=0)
+    layer = make_layer()
+
+    channels = [await layer.new_channel() for _ in range(12)]
+    for channel in channels:
+        await scheduler.join(layer, 'big', channel)
+    scheduler.note_room_size('big', len(channels))
+
+    await scheduler.group_send(layer, 'big', {'type': 'x', 'n': 1})
+    await scheduler._worker
+
+    for channel in channels:
+        assert (await layer.receive(channel))['n'] == 1
+        assert channel not in layer.channels  # nothing else queued
+
+
+@pytest.mark.asyncio
+async def test_large_rooms_are_interleaved():
+    """Shard batches of concurrent large rooms alternate instead of running back to back"""
+    scheduler = FanoutScheduler(large_room_threshold=5, shards=4, latency_budget=0)
+    layer = RecordingLayer()
+    scheduler.note_room_size('room-a', 100)
+    scheduler.note_room_size('room-b', 100)
+
+    await scheduler.group_send(layer, 'room-a', {'type': 'x'})
+    await scheduler.group_send(layer, 'room-b', {'type': 'x'})
+    await scheduler._worker
+
+    rooms = [group.split('.')[0] for group in layer.sent]
+    assert len(rooms) == 8
+    assert rooms[:4] == ['room-a', 'room-b', 'room-a', 'room-b']
+
+
+@pytest.mark.asyncio
+async def test_small_room_is_not_delayed_by_large_backlog():
+    """A small-room broadcast goes out even while large rooms are queued"""
+    scheduler = FanoutScheduler(large_room_threshold=5, shards=4, latency_budget=0)
+    layer = RecordingLayer()
+    scheduler.note_room_size('big', 100)
+    scheduler.note_room_size('small', 2)
+
+    for _ in range(10):
+        await scheduler.group_send(layer, 'big', {'type': 'x'})
+    await scheduler.group_send(layer, 'small', {'type': 'x'})
+
+    assert layer.sent[0] == 'small'
+    await scheduler._worker
+    assert len(layer.sent) == 1 + 10 * 4
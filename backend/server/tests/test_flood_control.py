@@ -0,0 +1,99 @@
+import time
+import pytest
+from channels.testing import WebsocketCommunicator
+from Project.asgi import application
+from server.flood_control import (
+    ALLOW, COALESCE, DROP, FloodController, FloodPolicy, TokenBucket, room_buckets,
+)
+
+POLICY = FloodPolicy(
+    name='test',
+    connection_rate=1,
+    connection_burst=2,
+    room_rate=1,
+    room_burst=3,
+    coalesce_types=frozenset({'progress'}),
+    protected_types=frozenset({'transfer-complete'}),
+)
+
+
+def test_token_bucket_refills_over_time():
+    """Tokens refill at `rate` per second up to `burst`"""
+    bucket = TokenBucket(rate=2, burst=2, now=0)
+    assert bucket.consume(0) and bucket.consume(0)
+    assert not bucket.consume(0)
+    assert bucket.time_until(0) == pytest.approx(0.5)
+    assert bucket.consume(0.5)
+
+
+def test_excess_messages_are_dropped():
+    """Generic messages over the connection budget are dropped"""
+    flood = FloodController(POLICY)
+    now = time.monotonic()
+    assert [flood.check('chat', now=now) for _ in range(3)] == [ALLOW, ALLOW, DROP]
+    flood.close()
+
+
+def test_protected_types_are_never_dropped():
+    """Protocol control messages pass even when the budget is spent"""
+    flood = FloodController(POLICY)
+    now = time.monotonic()
+    flood.check('chat', now=now)
+    flood.check('chat', now=now)
+    assert flood.check('transfer-complete', now=now) == ALLOW
+    flood.close()
+
+
+def test_progress_is_coalesced_to_latest_value():
+    """Over budget, only the latest progress value is kept and flushed later"""
+    flood = FloodController(POLICY)
+    now = time.monotonic()
+    flood.check('chat', now=now)
+    flood.check('chat', now=now)
+
+    for sent in (10, 20, 30):
+        assert flood.check('progress', now=now) == COALESCE
+        flood.stash('progress', {'type': 'progress', 'sent': sent})
+
+    assert flood.take_pending(now=now) == []
+    assert flood.pending_delay(now=now) == pytest.approx(1.0)
+    assert flood.take_pending(now=now + 1.0) == [{'type': 'progress', 'sent': 30}]
+    flood.close()
+
+
+def test_room_bucket_is_shared_between_connections():
+    """Connections in one room draw from the same room budget"""
+    alice = FloodController(POLICY, room='shared')
+    bob = FloodController(POLICY, room='shared')
+
+    now = time.monotonic()
+    decisions = [alice.check('chat', now=now), alice.check('chat', now=now),
+                 bob.check('chat', now=now), bob.check('chat', now=now)]
+    assert decisions == [ALLOW, ALLOW, ALLOW, DROP]
+
+    alice.close()
+    bob.close()
+    assert ('test', 'shared') not in room_buckets._buckets
+
+
+@pytest.mark.asyncio
+async def test_server_consumer_limits_fan_out():
+    """A flooding client cannot push more than its burst to the room"""
+    sender = WebsocketCommunicator(application, '/ws/flood-room/?guest=sender')
+    receiver = WebsocketCommunicator(application, '/ws/flood-room/?guest=receiver')
+    await sender.connect()
+    await receiver.connect()
+
+    for _ in range(200):
+        await sender.send_json_to({'type': 'chat', 'payload': 'spam'})
+
+    received = 0
+    while not await receiver.receive_nothing(timeout=0.2):
+        frame = await receiver.receive_json_from()
+        if frame.get('type') == 'chat':
+            received += 1
+
+    assert 0 < received < 200
+
+    await sender.disconnect()
+    await receiver.disconnect()
@@ -0,0 +1,179 @@
+import time
+import uuid
+import asyncio
+import pytest
+from server.layers.hybrid import HybridChannelLayer
+
+
+def make_node(bus, latency=0.0):
+    return HybridChannelLayer(
+        transport="server.layers.transports.LocalTransport",
+        transport_config={"bus": bus, "latency": latency},
+    )
+
+
+@pytest.fixture
+def bus():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+@pytest.mark.asyncio
+async def test_local_send_and_receive(bus):
+    """Channels owned by this node are served in memory"""
+    layer = make_node(bus)
+    channel = await layer.new_channel()
+    assert layer.node_id in channel
+
+    await layer.send(channel, {"type": "test.message", "text": "hi"})
+    message = await layer.receive(channel)
+
+    assert message["text"] == "hi"
+    assert layer.transport.sent == 0
+
+
+@pytest.mark.asyncio
+async def test_local_group_never_touches_transport(bus):
+    """A group whose members are all local is delivered without the transport"""
+    layer = make_node(bus)
+    channels = [await layer.new_channel() for _ in range(3)]
+    for channel in channels:
+        await layer.group_add("room", channel)
+
+    await layer.group_send("room", {"type": "test.message", "n": 1})
+
+    for channel in channels:
+        assert (await layer.receive(channel))["n"] == 1
+    assert layer.transport.sent == 0
+
+
+@pytest.mark.asyncio
+async def test_direct_send_to_remote_channel(bus):
+    """A channel owned by another node goes through the transport"""
+    node_a, node_b = make_node(bus), make_node(bus)
+    remote_channel = await node_b.new_channel()
+    await node_b.group_add("warmup", remote_channel)  # starts node_b's transport
+
+    await node_a.send(remote_channel, {"type": "test.message", "text": "hello"})
+
+    assert (await node_b.receive(remote_channel))["text"] == "hello"
+    assert node_a.transport.sent == 1
+
+
+@pytest.mark.asyncio
+async def test_group_send_sends_one_message_per_remote_node(bus):
+    """Remote members are reached with one transport message per node"""
+    node_a, node_b = make_node(bus), make_node(bus)
+
+    local = await node_a.new_channel()
+    remote = [await node_b.new_channel() for _ in range(3)]
+    await node_a.group_add("room", local)
+    for channel in remote:
+        await node_b.group_add("room", channel)
+
+    await node_a.group_send("room", {"type": "test.message", "n": 7})
+
+    assert (await node_a.receive(local))["n"] == 7
+    for channel in remote:
+        assert (await node_b.receive(channel))["n"] == 7
+    assert node_a.transport.sent == 1
+
+
+@pytest.mark.asyncio
+async def test_group_discard_leaves_remote_view(bus):
+    """Once the last local member leaves, other nodes stop sending"""
+    node_a, node_b = make_node(bus), make_node(bus)
+    channel = await node_b.new_channel()
+    await node_b.group_add("room", channel)
+    await node_b.group_discard("room", channel)
+
+    await node_a.group_send("room", {"type": "test.message"})
+
+    assert node_a.transport.sent == 0
+
+
+
+class _Stale:
+    """Stands in for a client, pubsub or task left behind on a finished loop"""
+
+    def __init__(self):
+        self.closed = False
+        self.cancelled = False
+
+    async def close(self):
+        self.closed = True
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.mark.asyncio
+async def test_redis_transport_releases_connections_of_a_finished_loop(monkeypatch):
+    """Re-binding to a new loop closes the old client and cancels its readers"""
+    from server.layers.transports import RedisTransport
+
+    transport = RedisTransport()
+    old_loop = asyncio.new_event_loop()
+    old_loop.close()
+    client, pubsub, reader = _Stale(), _Stale(), _Stale()
+    transport._loop = old_loop
+    transport._redis, transport._pubsub, transport._tasks = client, pubsub, [reader]
+
+    async def fake_start(node_id, deliver, local_groups):
+        transport._loop = asyncio.get_running_loop()
+
+    monkeypatch.setattr(transport, "start", fake_start)
+    await transport._ensure_loop()
+
+    assert client.closed and pubsub.closed and reader.cancelled
+    assert transport._loop is asyncio.get_running_loop()
+
+
+def make_redis_node(server):
+    fakeredis = pytest.importorskip("fakeredis")
+    return HybridChannelLayer(
+        transport="server.layers.transports.RedisTransport",
+        transport_config={"client": fakeredis.FakeAsyncRedis(server=server)},
+    )
+
+
+async def receive_soon(layer, channel):
+    return await asyncio.wait_for(layer.receive(channel), timeout=2)
+
+
+@pytest.mark.asyncio
+async def test_redis_group_send_right_after_a_remote_join_is_delivered():
+    """Membership is in Redis, so no gossip window can drop a group send"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    sender, member = make_redis_node(server), make_redis_node(server)
+    # The sender is running before the member joins
+    await sender.group_send("room", {"type": "test.message", "text": "nobody"})
+
+    channel = await member.new_channel()
+    await member.group_add("room", channel)
+    await sender.group_send("room", {"type": "test.message", "text": "hi"})
+    assert (await receive_soon(member, channel))["text"] == "hi"
+
+    await member.group_discard("room", channel)
+    assert await sender.transport.nodes_for("room") == set()
+
+    await sender.close()
+    await member.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_membership_of_a_silent_node_expires(monkeypatch):
+    """A node that stops refreshing its groups ages out"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    sender, member = make_redis_node(server), make_redis_node(server)
+    channel = await member.new_channel()
+    await member.group_add("room", channel)
+    assert await sender.transport.nodes_for("room") == {member.node_id}
+
+    later = time.time() + member.transport.refresh_interval * 3 + 1
+    monkeypatch.setattr("server.layers.transports.time.time", lambda: later)
+    assert await sender.transport.nodes_for("room") == set()
+
+    await sender.close()
+    await member.close()
@@ -0,0 +1,68 @@
+import io
+import json
+import logging
+import threading
+from Project.logging import BackgroundStreamHandler, EventSampler, StructuredFormatter, get_logger
+
+
+class BlockingStream(io.StringIO):
+    """Stream whose writes wait until `release` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, s):
+        self.release.wait()
+        return super().write(s)
+
+
+def make_logger(name, handler):
+    base = logging.getLogger(name)
+    base.handlers = [handler]
+    base.setLevel(logging.DEBUG)
+    base.propagate = False
+    return get_logger(name)
+
+
+def test_records_are_json_lines_with_fields():
+    """Events carry their name and keyword fields as top-level JSON keys"""
+    stream = io.StringIO()
+    handler = BackgroundStreamHandler(stream)
+    handler.setFormatter(StructuredFormatter())
+    logger = make_logger('test.logging.json', handler)
+
+    logger.info('connect', 'Guest connected', room='r1', user='alice')
+    handler.close()
+
+    entry = json.loads(stream.getvalue().strip())
+    assert entry['event'] == 'connect'
+    assert entry['msg'] == 'Guest connected'
+    assert entry['room'] == 'r1' and entry['user'] == 'alice'
+
+
+def test_sampler_rate_limits_per_event():
+    """A noisy event is capped while other events still pass"""
+    sampler = EventSampler({'noisy': {'rate': 1, 'burst': 3}})
+
+    def record(event):
+        return logging.makeLogRecord({'event': event})
+
+    passed = [sampler.filter(record('noisy')) for _ in range(10)]
+    assert passed.count(True) == 3
+    assert sampler.filter(record('other'))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Logging never blocks the caller, even when the writer is stuck"""
+    stream = BlockingStream()
+    handler = BackgroundStreamHandler(stream, queue_size=5)
+    handler.setFormatter(StructuredFormatter())
+    logger = make_logger('test.logging.drop', handler)
+
+    for i in range(50):
+        logger.info('spam', n=i)
+
+    assert handler.dropped > 0
+    stream.release.set()
+    handler.close()
@@ -0,0 +1,149 @@
+import pytest
+from channels.testing import WebsocketCommunicator
+from Project.asgi import application
+from server.room_history import RoomHistoryManager, room_history
+
+
+def make_manager(**kwargs):
+    params = {
+        'max_messages': 3,
+        'max_room_bytes': 1000,
+        'node_max_bytes': 10_000,
+        'inline_attachment_bytes': 100,
+    }
+    params.update(kwargs)
+    return RoomHistoryManager(**params)
+
+
+def test_ring_buffer_keeps_last_n_messages():
+    """Only the most recent max_messages entries are kept"""
+    history = make_manager()
+    for i in range(5):
+        history.record('room', f'm{i}', 'ch_alice', copy_text=f'text {i}')
+
+    texts = [m['copy_text'] for m in history.snapshot('room')]
+    assert texts == ['text 2', 'text 3', 'text 4']
+
+
+def test_duplicate_message_ids_are_recorded_once():
+    """Every local member sees the group event; only the first records it"""
+    history = make_manager()
+    assert history.record('room', 'm1', 'ch_alice', copy_text='hi')
+    assert not history.record('room', 'm1', 'ch_alice', copy_text='hi')
+    assert len(history.snapshot('room')) == 1
+
+
+def test_evicted_message_ids_are_not_recorded_again():
+    """A late copy of an evicted message is still a duplicate until it expires"""
+    now = [0.0]
+    history = make_manager(max_messages=1, dedup_seconds=60, clock=lambda: now[0])
+    history.record('room', 'm1', 'ch_alice', copy_text='first')
+    history.record('room', 'm2', 'ch_alice', copy_text='second')
+
+    assert not history.record('room', 'm1', 'ch_alice', copy_text='first')
+    assert [m['copy_text'] for m in history.snapshot('room')] == ['second']
+
+    now[0] = 61
+    assert history.record('room', 'm1', 'ch_alice', copy_text='first')
+    assert not history.evicted.get(('room', 'm1'))
+
+
+def test_message_over_the_room_budget_is_rejected():
+    """An oversized message is dropped without evicting the room"""
+    history = make_manager(max_messages=100, max_room_bytes=1000)
+    history.record('room', 'm1', 'ch_alice', copy_text='keep me')
+
+    assert not history.record('room', 'm2', 'ch_alice', file_name='f', file_data='z' * 1001)
+    assert [m['copy_text'] for m in history.snapshot('room')] == ['keep me']
+    assert history.attachments.current_bytes == 0
+    assert not history.record('empty', 'm3', 'ch_alice', copy_text='x' * 1001)
+    assert 'empty' not in history.rooms
+
+
+def test_room_byte_budget_evicts_oldest():
+    """A room never holds more than max_room_bytes of entries"""
+    history = make_manager(max_messages=100, max_room_bytes=50)
+    history.record('room', 'm1', 'ch_alice', copy_text='a' * 30)
+    history.record('room', 'm2', 'ch_alice', copy_text='b' * 30)
+
+    snapshot = history.snapshot('room')
+    assert [m['copy_text'] for m in snapshot] == ['b' * 30]
+    assert history.rooms['room'].current_bytes <= 50
+
+
+def test_large_attachments_are_stored_as_references():
+    """Large files stay out of the history frame and are fetched by ref"""
+    history = make_manager()
+    data = 'x' * 500
+    history.record('room', 'm1', 'ch_alice', file_name='big.bin', file_data=data)
+    history.record('room', 'm2', 'ch_alice', file_name='small.txt', file_data='tiny')
+
+    big, small = history.snapshot('room')
+    assert big['file_data'] is None
+    assert big['file_size'] == 500
+    assert small['file_data'] == 'tiny'
+
+    entry = history.get_attachment('room', big['file_ref'])
+    assert entry.file_data == data
+    assert entry.file_name == 'big.bin'
+
+
+def test_referenced_attachments_count_against_the_room():
+    """One room cannot fill the node budget with large attachments"""
+    history = make_manager(max_messages=100, max_room_bytes=1000)
+    for i in range(5):
+        history.record('room', f'm{i}', 'ch_alice', file_name='f', file_data=str(i) * 400)
+
+    assert [m['file_size'] for m in history.snapshot('room')] == [400, 400]
+    assert history.rooms['room'].current_bytes <= 1000
+    assert history.attachments.current_bytes == 800
+
+
+def test_identical_attachments_are_shared():
+    """The same file sent to two rooms is stored once"""
+    history = make_manager()
+    data = 'y' * 500
+    history.record('room-a', 'm1', 'ch_alice', file_name='f', file_data=data)
+    history.record('room-b', 'm2', 'ch_bob', file_name='f', file_data=data)
+    assert history.attachments.current_bytes == 500
+
+    history.drop_room('room-a')
+    assert history.attachments.current_bytes == 500
+    history.drop_room('room-b')
+    assert history.attachments.current_bytes == 0
+
+
+def test_node_cap_evicts_least_recently_active_room():
+    """The node-wide budget is enforced across rooms, idle rooms first"""
+    history = make_manager(node_max_bytes=100)
+    history.record('idle', 'm1', 'ch_alice', copy_text='a' * 60)
+    history.record('busy', 'm2', 'ch_bob', copy_text='b' * 60)
+
+    assert history.snapshot('idle') == []
+    assert len(history.snapshot('busy')) == 1
+    assert history.current_bytes <= 100
+
+
+@pytest.mark.asyncio
+async def test_late_joiner_receives_history_frame():
+    """A member joining after a copy message gets it in one history frame"""
+    room_history.drop_room('history-room')
+
+    alice = WebsocketCommunicator(application, '/ws/history-room/?guest=alice')
+    connected, _ = await alice.connect()
+    assert connected
+    await alice.receive_json_from()  # user_list_update
+
+    await alice.send_json_to({'type': 'copy', 'copy': 'hello'})
+    assert await alice.receive_nothing()
+
+    bob = WebsocketCommunicator(application, '/ws/history-room/?guest=bob')
+    await bob.connect()
+
+    frames = [await bob.receive_json_from() for _ in range(2)]
+    history_frame = next(f for f in frames if f['type'] == 'history')
+    assert [m['copy_text'] for m in history_frame['messages']] == ['hello']
+    assert history_frame['messages'][0]['f_user'] == 'alice'
+
+    await alice.disconnect()
+    await bob.disconnect()
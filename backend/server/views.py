@@ -0,0 +1,8 @@
+from django.http import JsonResponse
+from django.views import View
+from server.metrics import metrics
+
+
+class RealtimeMetricsView(View):
+    async def get(self, request):
+        return JsonResponse(metrics.snapshot())
@@ -0,0 +1,128 @@
+"""Profile picture ingestion and thumbnails, run from Celery tasks"""
+
+import io
+import os
+import logging
+
+import requests
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from user import config
+
+logger = logging.getLogger(__name__)
+
+# Retrying cannot fix these: the download is too large or not an image
+INVALID_IMAGE_ERRORS = (ValueError, UnidentifiedImageError, Image.DecompressionBombError)
+
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True},
+}
+
+
+def make_thumbnails(data, sizes=None):
+    """Square-crop image bytes and return {size: {format: bytes}}"""
+    sizes = config.USER_AVATAR_SIZES if sizes is None else sizes
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    thumbnails = {}
+    for size in sizes:
+        # Never upscale: a small source gives a smaller thumbnail
+        edge = min(size, *image.size)
+        thumbnail = ImageOps.fit(image, (edge, edge), Image.LANCZOS)
+        thumbnails[size] = {}
+        for name, options in FORMATS.items():
+            out = io.BytesIO()
+            thumbnail.save(out, **options)
+            thumbnails[size][name] = out.getvalue()
+    return thumbnails
+
+
+def build_profile_image_variants(user, thumbnails=None):
+    """Write thumbnails of user.prof_image next to it and record them"""
+    source = user.prof_image.name
+    if thumbnails is None:
+        with user.prof_image.open("rb") as f:
+            thumbnails = make_thumbnails(f.read())
+
+    storage = user.prof_image.storage
+    stem = os.path.splitext(source)[0]
+    sizes = {}
+    for size, formats in thumbnails.items():
+        sizes[str(size)] = {
+            name: storage.save(f"{stem}-{size}.{name}", ContentFile(data))
+            for name, data in formats.items()
+        }
+
+    previous = user.prof_image_variants or {}
+    user.prof_image_variants = {"source": source, "sizes": sizes}
+    user.save(update_fields=["prof_image_variants"])
+    _delete_variants(storage, previous, keep=sizes)
+
+
+def _delete_variants(storage, variants, keep):
+    # Thumbnails of a replaced (or rebuilt) image are otherwise never removed
+    kept = {name for formats in keep.values() for name in formats.values()}
+    for formats in (variants.get("sizes") or {}).values():
+        for name in formats.values():
+            if name not in kept:
+                try:
+                    storage.delete(name)
+                except Exception as e:
+                    logger.warning(f"Failed to delete thumbnail {name}: {e}")
+
+
+def download_image(url):
+    """Fetch an image, refusing anything over USER_AVATAR_MAX_BYTES"""
+    with requests.get(url, timeout=config.USER_AVATAR_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data += chunk
+            if len(data) > config.USER_AVATAR_MAX_BYTES:
+                raise ValueError(f"image larger than {config.USER_AVATAR_MAX_BYTES} bytes")
+    return bytes(data)
+
+
+def ingest_profile_image(user_id, url):
+    """Save a social profile picture for a user without one, then thumbnail it"""
+    from user.models import User
+
+    user = User.objects.filter(id=user_id).first()
+    if user is None or user.prof_image:
+        return False
+
+    data = download_image(url)
+    # Decode first: a file Pillow cannot read is never saved as the picture
+    thumbnails = make_thumbnails(data)
+    user.prof_image.save(f"{user.username}_social.jpg", ContentFile(data), save=False)
+    user.save(update_fields=["prof_image"])
+    build_profile_image_variants(user, thumbnails)
+    return True
+
+
+def _enqueue(task, *args):
+    # After commit, so the worker sees the row; a missing broker must not
+    # fail the request that triggered it
+    def send():
+        try:
+            task.delay(*args)
+        except Exception as e:
+            logger.error(f"Failed to queue {task.name}: {e}")
+
+    transaction.on_commit(send)
+
+
+def schedule_profile_image_ingestion(user, url):
+    from user.worker.tasks import ingest_profile_image_task
+
+    _enqueue(ingest_profile_image_task, user.id, url)
+
+
+def schedule_profile_image_variants(user):
+    from user.worker.tasks import build_profile_image_variants_task
+
+    _enqueue(build_profile_image_variants_task, user.id)
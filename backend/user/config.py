@@ -0,0 +1,18 @@
+from django.conf import settings
+
+# Google sign-in: userinfo lookups share one pooled HTTPS session (so the
+# TLS handshake is paid once per connection, not per login) and run on at
+# most POOL_SIZE threads. TIMEOUT is (connect, read). A validated token's
+# userinfo is cached for USERINFO_TTL seconds under a hash of the token.
+GOOGLE_POOL_SIZE = getattr(settings, 'GOOGLE_POOL_SIZE', 8)
+GOOGLE_TIMEOUT = getattr(settings, 'GOOGLE_TIMEOUT', (3.05, 5))
+GOOGLE_USERINFO_TTL = getattr(settings, 'GOOGLE_USERINFO_TTL', 60)
+
+# Profile pictures are resized in the background into square thumbnails of
+# these sizes (px), each as WebP and JPEG. get_profile_image_url serves
+# AVATAR_DEFAULT_SIZE unless asked for another size. Downloads larger than
+# AVATAR_MAX_BYTES are refused.
+USER_AVATAR_SIZES = getattr(settings, 'USER_AVATAR_SIZES', (64, 128, 256))
+USER_AVATAR_DEFAULT_SIZE = getattr(settings, 'USER_AVATAR_DEFAULT_SIZE', 128)
+USER_AVATAR_MAX_BYTES = getattr(settings, 'USER_AVATAR_MAX_BYTES', 10 * 1024 ** 2)
+USER_AVATAR_TIMEOUT = getattr(settings, 'USER_AVATAR_TIMEOUT', (3.05, 10))
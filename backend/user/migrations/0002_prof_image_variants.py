@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='prof_image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
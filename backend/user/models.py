@@ -11,6 +11,8 @@ from django.contrib.auth.models import (
 import random
 from django.templatetags.static import static
 
+from user import config
+
 
 default_images = [
     "defaults/default1.jpg",
@@ -90,18 +92,39 @@ class User(AbstractBaseUser, PermissionsMixin):
     prof_image = models.ImageField(
         null=True, upload_to=user_image_file_path, blank=True
     )
+    # Thumbnails of prof_image, built in the background:
+    # {"source": prof_image name, "sizes": {"64": {"webp": path, "jpeg": path}, ...}}
+    prof_image_variants = models.JSONField(default=dict, blank=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
 
-    def get_profile_image_url(self):
-        """Return the profile image URL or a random static default"""
-        if self.prof_image:
-            return self.prof_image.url
-        else:
+    def get_profile_image_variants(self):
+        """Return {size: {format: path}} for the current prof_image, if built"""
+        variants = self.prof_image_variants or {}
+        if not self.prof_image or variants.get("source") != self.prof_image.name:
+            return {}
+        return {int(size): formats for size, formats in variants.get("sizes", {}).items()}
+
+    def get_profile_image_url(self, size=None, image_format="webp"):
+        """
+        Return the URL of the smallest thumbnail at least `size` px wide
+        (the largest one otherwise), the original image while thumbnails
+        are not built yet, or a random static default
+        """
+        if not self.prof_image:
             return static(user_random_default_image_path())
 
+        variants = self.get_profile_image_variants()
+        if not variants:
+            return self.prof_image.url
+        size = size or config.USER_AVATAR_DEFAULT_SIZE
+        chosen = next((s for s in sorted(variants) if s >= size), max(variants))
+        formats = variants[chosen]
+        path = formats.get(image_format) or formats.get("jpeg")
+        return self.prof_image.storage.url(path)
+
     def __str__(self):
         return self.username
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from user.worker.tasks import send_email_task
+from user.avatars import schedule_profile_image_variants
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.encoding import smart_str, force_bytes
 
@@ -13,6 +14,7 @@ from django.utils.encoding import smart_str, force_bytes
 class UserSerializer(serializers.ModelSerializer):
     """serializer for user"""
     prof_image_url = serializers.SerializerMethodField()
+    prof_image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
@@ -25,15 +27,34 @@ class UserSerializer(serializers.ModelSerializer):
             "private_account",
             "prof_image",
             "prof_image_url",
+            "prof_image_variants",
         ]
         extra_kwargs = {"password": {"write_only": True}, "prof_image": {"write_only": True}}
 
     def get_prof_image_url(self, obj):
-        return obj.get_profile_image_url()
+        """Thumbnail for ?avatar_size= (px) and ?avatar_format=webp|jpeg"""
+        request = self.context.get("request")
+        params = request.query_params if request is not None else {}
+        try:
+            size = int(params.get("avatar_size", 0)) or None
+        except ValueError:
+            size = None
+        return obj.get_profile_image_url(size, params.get("avatar_format", "webp"))
+
+    def get_prof_image_variants(self, obj):
+        """{size: {format: url}}, for srcset; empty until thumbnails are built"""
+        storage = obj.prof_image.storage
+        return {
+            size: {name: storage.url(path) for name, path in formats.items()}
+            for size, formats in sorted(obj.get_profile_image_variants().items())
+        }
 
     def create(self, validated_data):
         """Create and return user with encrypted password"""
-        return get_user_model().objects.create_user(**validated_data)
+        user = get_user_model().objects.create_user(**validated_data)
+        if user.prof_image:
+            schedule_profile_image_variants(user)
+        return user
 
     def update(self, instance, validated_data):
         """Update and return user"""
@@ -44,6 +65,9 @@ class UserSerializer(serializers.ModelSerializer):
             user.set_password(password)
             user.save()
 
+        if validated_data.get("prof_image"):
+            schedule_profile_image_variants(user)
+
         return user
 
 
@@ -0,0 +1,121 @@
+"""Tests for profile picture ingestion and thumbnails"""
+
+import io
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from user.avatars import build_profile_image_variants, make_thumbnails
+from user.worker.tasks import ingest_profile_image_task
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes(size=(400, 300), fmt="JPEG"):
+    out = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(out, fmt)
+    return out.getvalue()
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(
+        email="test@example.com", username="testuser", password="testpass123", **params
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AvatarTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_thumbnails_are_square_and_never_upscaled(self):
+        thumbnails = make_thumbnails(image_bytes(), sizes=(64, 512))
+        for size, expected in ((64, 64), (512, 300)):
+            webp = Image.open(io.BytesIO(thumbnails[size]["webp"]))
+            jpeg = Image.open(io.BytesIO(thumbnails[size]["jpeg"]))
+            self.assertEqual((webp.format, webp.size), ("WEBP", (expected, expected)))
+            self.assertEqual((jpeg.format, jpeg.size), ("JPEG", (expected, expected)))
+
+    def test_profile_image_url_picks_a_variant(self):
+        user = create_user(prof_image=SimpleUploadedFile("me.jpg", image_bytes()))
+        original = user.get_profile_image_url()
+        self.assertTrue(original.endswith(".jpg"))
+
+        build_profile_image_variants(user)
+        self.assertTrue(user.get_profile_image_url().endswith("-128.webp"))
+        self.assertTrue(user.get_profile_image_url(100, "jpeg").endswith("-128.jpeg"))
+        self.assertTrue(user.get_profile_image_url(1000).endswith("-256.webp"))
+
+        # Variants of a replaced image are ignored
+        user.prof_image = SimpleUploadedFile("new.jpg", image_bytes())
+        user.save()
+        self.assertFalse(user.get_profile_image_url().endswith(".webp"))
+
+    @patch("user.avatars.requests.get")
+    def test_ingestion_downloads_and_thumbnails(self, mock_get):
+        response = MagicMock()
+        response.iter_content.return_value = [image_bytes()]
+        mock_get.return_value.__enter__.return_value = response
+        user = create_user()
+
+        self.assertTrue(ingest_profile_image_task.apply(args=(user.id, "http://pic")).get())
+        user.refresh_from_db()
+        self.assertTrue(user.prof_image.name.startswith("uploads/profile/testuser/"))
+        self.assertEqual(sorted(user.get_profile_image_variants()), [64, 128, 256])
+
+        # A picture the user already has is never replaced
+        self.assertFalse(ingest_profile_image_task.apply(args=(user.id, "http://pic")).get())
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("user.avatars.requests.get")
+    def test_undecodable_download_is_not_saved_or_retried(self, mock_get):
+        response = MagicMock()
+        response.iter_content.return_value = [b"<html>not an image</html>"]
+        mock_get.return_value.__enter__.return_value = response
+        user = create_user()
+
+        result = ingest_profile_image_task.apply(args=(user.id, "http://pic"))
+        self.assertEqual((result.state, result.get()), ("SUCCESS", False))
+        self.assertEqual(mock_get.call_count, 1)
+        user.refresh_from_db()
+        self.assertFalse(user.prof_image)
+
+    def test_thumbnails_of_a_replaced_image_are_deleted(self):
+        user = create_user(prof_image=SimpleUploadedFile("me.jpg", image_bytes()))
+        build_profile_image_variants(user)
+        storage = user.prof_image.storage
+        old = [name for formats in user.prof_image_variants["sizes"].values() for name in formats.values()]
+        self.assertTrue(all(storage.exists(name) for name in old))
+
+        user.prof_image = SimpleUploadedFile("new.jpg", image_bytes())
+        user.save()
+        build_profile_image_variants(user)
+        self.assertFalse(any(storage.exists(name) for name in old))
+        self.assertTrue(user.get_profile_image_url().endswith("-128.webp"))
+
+    @patch("user.worker.tasks.build_profile_image_variants_task.delay")
+    def test_upload_schedules_variants_and_serializer_returns_them(self, delay):
+        user = create_user()
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse("user:manageuser")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch(url, {"prof_image": SimpleUploadedFile("me.jpg", image_bytes())}, format="multipart")
+        delay.assert_called_once_with(user.id)
+
+        user.refresh_from_db()
+        build_profile_image_variants(user)
+        res = client.get(url, {"avatar_size": 64, "avatar_format": "jpeg"})
+        self.assertTrue(res.data["prof_image_url"].endswith("-64.jpeg"))
+        self.assertEqual(sorted(res.data["prof_image_variants"]), [64, 128, 256])
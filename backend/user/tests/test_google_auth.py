@@ -1,19 +1,29 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
 from unittest.mock import patch, MagicMock
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from user.utils import validate_google_token
+
 User = get_user_model()
 
 class GoogleLoginViewTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.url = reverse('user:google_login')
 
-    @patch('user.utils.requests.get')
-    def test_google_login_success(self, mock_get):
+    @patch('user.views.schedule_profile_image_ingestion')
+    @patch('user.utils.google_session.get')
+    def test_google_login_success(self, mock_get, schedule_ingestion):
         # Mock Google response
         mock_response = MagicMock()
         mock_response.ok = True
@@ -36,8 +46,10 @@ class GoogleLoginViewTest(TestCase):
         user = User.objects.get(email='test@example.com')
         self.assertEqual(user.username, 'test')
         self.assertEqual(user.name, 'Test User')
+        # The picture is fetched by a worker, after the response
+        schedule_ingestion.assert_called_once_with(user, 'http://example.com/pic.jpg')
 
-    @patch('user.utils.requests.get')
+    @patch('user.utils.google_session.get')
     def test_google_login_invalid_token(self, mock_get):
         # Mock Google response failure
         mock_response = MagicMock()
@@ -48,3 +60,54 @@ class GoogleLoginViewTest(TestCase):
         response = self.client.post(self.url, data)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def userinfo_response(**info):
+    response = MagicMock()
+    response.ok = True
+    response.json.return_value = info
+    return response
+
+
+class ValidateGoogleTokenTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch('user.utils.google_session.get')
+    def test_validated_tokens_are_cached(self, mock_get):
+        mock_get.return_value = userinfo_response(email='test@example.com')
+        with patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual(validate_google_token('tok'), {'email': 'test@example.com'})
+            self.assertEqual(validate_google_token('tok'), {'email': 'test@example.com'})
+        self.assertEqual(mock_get.call_count, 1)
+
+        key = 'google:userinfo:' + hashlib.sha256(b'tok').hexdigest()
+        self.assertIsNotNone(cache.get(key))
+        self.assertEqual(cache_set.call_count, 1)
+        for call in cache_set.call_args_list:
+            self.assertNotIn('tok', call.args[0])
+
+    @patch('user.utils.google_session.get')
+    def test_invalid_tokens_are_not_cached(self, mock_get):
+        mock_get.return_value = MagicMock(ok=False)
+        for _ in range(2):
+            with self.assertRaises(AuthenticationFailed):
+                validate_google_token('bad')
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch('user.utils.google_session.get')
+    def test_concurrent_validations_share_one_request(self, mock_get):
+        def slow_get(*args, **kwargs):
+            time.sleep(0.2)
+            return userinfo_response(email='test@example.com')
+        mock_get.side_effect = slow_get
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(validate_google_token('tok')))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(mock_get.call_count, 1)
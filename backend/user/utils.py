@@ -79,33 +79,70 @@ def send_email(link: str, to_email: str) -> bool:
     return bool(email.send(fail_silently=False))
 
 
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from django.conf import settings
+from requests.adapters import HTTPAdapter
+from django.core.cache import cache
 from rest_framework.exceptions import AuthenticationFailed
 
+from user import config
+
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
+
+# Shared by every login so connections to googleapis stay open between them
+google_session = requests.Session()
+google_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=config.GOOGLE_POOL_SIZE))
+
+_google_executor = ThreadPoolExecutor(max_workers=config.GOOGLE_POOL_SIZE, thread_name_prefix="google")
+_inflight = {}    # token hash -> Future
+_inflight_lock = threading.Lock()
+
+
+def _fetch_google_userinfo(token):
+    try:
+        # Pass token in Authorization header as Bearer token
+        headers = {'Authorization': f'Bearer {token}'}
+        response = google_session.get(GOOGLE_USERINFO_URL, headers=headers, timeout=config.GOOGLE_TIMEOUT)
+    except requests.exceptions.Timeout:
+        raise AuthenticationFailed("Google API request timed out. Please check your internet connection.")
+    except requests.exceptions.RequestException as e:
+        raise AuthenticationFailed(f"Google API request failed: {str(e)}")
+
+    if not response.ok:
+        raise AuthenticationFailed("Invalid Google token")
+
+    return response.json()
+
 
 def validate_google_token(token):
     """
     Validate the Google Access Token and return the user info.
+
+    Results are cached briefly by token hash, and concurrent calls with the
+    same token (double-submits, retries) share one request to Google.
     """
-    # Use UserInfo endpoint which accepts access_token
-    google_url = "https://www.googleapis.com/oauth2/v3/userinfo"
-    
-    # Use a session for better performance/connection pooling
-    with requests.Session() as session:
-        try:
-            # Pass token in Authorization header as Bearer token
-            headers = {'Authorization': f'Bearer {token}'}
-            response = session.get(google_url, headers=headers, timeout=10)
-        except requests.exceptions.Timeout:
-             raise AuthenticationFailed("Google API request timed out. Please check your internet connection.")
-        except requests.exceptions.RequestException as e:
-             raise AuthenticationFailed(f"Google API request failed: {str(e)}")
+    key = "google:userinfo:" + hashlib.sha256(token.encode()).hexdigest()
+    user_info = cache.get(key)
+    if user_info is not None:
+        return user_info
 
-    if not response.ok:
-        raise AuthenticationFailed("Invalid Google token")
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = _google_executor.submit(_fetch_google_userinfo, token)
+    if owner:
+        # Outside the lock: the callback runs at once if the call already finished
+        future.add_done_callback(lambda _: _forget_inflight(key))
 
-    user_info = response.json()
-    
+    user_info = future.result()
+    cache.set(key, user_info, config.GOOGLE_USERINFO_TTL)
     return user_info
 
+
+def _forget_inflight(key):
+    with _inflight_lock:
+        _inflight.pop(key, None)
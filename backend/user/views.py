@@ -70,6 +70,7 @@ class UpdateLastVisitView(APIView):
 
 
 from user.utils import validate_google_token
+from user.avatars import schedule_profile_image_ingestion
 from user.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
 from user.serializer import GoogleLoginSerializer
@@ -87,9 +88,7 @@ class GoogleLoginView(APIView):
 
     def post(self, request):
         import time
-        import requests
-        from django.core.files.base import ContentFile
-        
+
         start_time = time.time()
 
         serializer = self.serializer_class(data=request.data)
@@ -140,17 +139,8 @@ class GoogleLoginView(APIView):
                 return Response({'error': 'Failed to create user'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         if picture and not user.prof_image:
-            try:
-                # Add timeout to prevent hanging on network issues
-                img_response = requests.get(picture, timeout=10)
-                if img_response.status_code == 200:
-                    user.prof_image.save(
-                        f"{user.username}_social.jpg",
-                        ContentFile(img_response.content),
-                        save=True
-                    )
-            except Exception as e:
-                print(f"Failed to download profile image: {e}")
+            # Downloaded and thumbnailed by a worker, not on the login path
+            schedule_profile_image_ingestion(user, picture)
 
         db_end = time.time()
 
@@ -1,5 +1,9 @@
+import logging
+
 from celery import shared_task
 
+logger = logging.getLogger(__name__)
+
 
 @shared_task(
     bind=True, autoretry_for=(Exception,), max_retries=3, default_retry_delay=120
@@ -12,3 +16,34 @@ def send_email_task(self, link, to_email):
     if delivered == 0:
         raise Exception("SMTP delivery failed")
     return True
+
+
+@shared_task(
+    bind=True, autoretry_for=(Exception,), max_retries=3, default_retry_delay=60
+)
+def ingest_profile_image_task(self, user_id, url):
+    from user.avatars import INVALID_IMAGE_ERRORS, ingest_profile_image
+
+    try:
+        return ingest_profile_image(user_id, url)
+    except INVALID_IMAGE_ERRORS as e:
+        logger.warning(f"Not ingesting profile image of user {user_id}: {e}")
+        return False
+
+
+@shared_task(
+    bind=True, autoretry_for=(Exception,), max_retries=3, default_retry_delay=60
+)
+def build_profile_image_variants_task(self, user_id):
+    from user.avatars import INVALID_IMAGE_ERRORS, build_profile_image_variants
+    from user.models import User
+
+    user = User.objects.filter(id=user_id).first()
+    if user is None or not user.prof_image:
+        return False
+    try:
+        build_profile_image_variants(user)
+    except INVALID_IMAGE_ERRORS as e:
+        logger.warning(f"Not building thumbnails for user {user_id}: {e}")
+        return False
+    return True
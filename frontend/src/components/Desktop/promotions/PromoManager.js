@@ -1,5 +1,5 @@
 import * as THREE from 'three';
-import { fetchAds } from './PromoService';
+import { fetchAds, trackAdEvent } from './PromoService';
 import { CSS3DObject } from 'three/examples/jsm/renderers/CSS3DRenderer.js';
 
 export class PromoManager {
@@ -112,12 +112,17 @@ export class PromoManager {
                     video.loop = true;
                     video.playsInline = true;
 
+                    // One impression per assignment, not per loop
+                    video.addEventListener('playing', () => trackAdEvent('impression', ad), { once: true });
                     video.play().catch(e => console.warn('[PromoManager] Autoplay prevented:', e));
                     contentDiv.appendChild(video);
 
                     if (ad.clickUrl) {
                         contentDiv.style.cursor = 'pointer';
-                        contentDiv.onclick = () => window.open(ad.clickUrl, '_blank');
+                        contentDiv.onclick = () => {
+                            trackAdEvent('click', ad);
+                            window.open(ad.clickUrl, '_blank');
+                        };
                     }
                 } else {
                     contentDiv.innerHTML = `
@@ -1,6 +1,21 @@
+// Viewport and measured bandwidth, so the backend can pick a fitting
+// rendition instead of always sending the same file
+function clientHints() {
+    const params = new URLSearchParams({
+        vw: String(window.innerWidth),
+        vh: String(window.innerHeight),
+        dpr: String(window.devicePixelRatio || 1),
+    });
+    const downlink = navigator.connection?.downlink;
+    if (downlink) {
+        params.set('downlink', String(downlink));
+    }
+    return params;
+}
+
 export async function fetchAds() {
     try {
-        const response = await fetch(`${import.meta.env.VITE_API_URL}/api/adds/`);
+        const response = await fetch(`${import.meta.env.VITE_API_URL}/api/adds/?${clientHints()}`);
         if (!response.ok) {
             throw new Error(`Failed to fetch ads: ${response.status} ${response.statusText}`);
         }
@@ -11,3 +26,38 @@ export async function fetchAds() {
         return [];
     }
 }
+
+// Impressions and clicks are queued and sent in small batches; the backend
+// aggregates them in memory and returns immediately.
+const EVENT_FLUSH_MS = 5000;
+const EVENT_BATCH_MAX = 100;
+let pendingEvents = [];
+let flushTimer = null;
+
+export function trackAdEvent(type, ad) {
+    pendingEvents.push({ type, screen: ad.screen, creative: ad.creative || ad.videoUrl || '' });
+    if (pendingEvents.length >= EVENT_BATCH_MAX) {
+        flushAdEvents();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(flushAdEvents, EVENT_FLUSH_MS);
+    }
+}
+
+export function flushAdEvents() {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+    while (pendingEvents.length > 0) {
+        const events = pendingEvents.splice(0, EVENT_BATCH_MAX);
+        // keepalive lets the last batch go out while the page unloads
+        fetch(`${import.meta.env.VITE_API_URL}/api/adds/events/`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ events }),
+            keepalive: true,
+        }).catch((error) => console.warn('[PromoService] Error sending ad events:', error));
+    }
+}
+
+if (typeof window !== 'undefined') {
+    window.addEventListener('pagehide', flushAdEvents);
+}
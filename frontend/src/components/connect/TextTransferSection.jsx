@@ -1,15 +1,46 @@
 import { useState, useEffect, useRef } from "react";
-import { Send, Loader2, Copy, Check } from "lucide-react";
+import { Send, Loader2, Copy, Check, Paperclip } from "lucide-react";
 import "../../pages/eco2apps/connect/DataTransfer.css";
 
-export default function TextTransferSection({ messages = [], sendText }) {
+function downloadAttachment(fileData, fileName) {
+    const href = fileData.startsWith("data:")
+        ? fileData
+        : URL.createObjectURL(new Blob([fileData]));
+    const link = document.createElement("a");
+    link.href = href;
+    link.download = fileName || "attachment";
+    link.click();
+    if (href !== fileData) {
+        URL.revokeObjectURL(href);
+    }
+}
+
+export default function TextTransferSection({ messages = [], sendText, fetchAttachment }) {
     const [message, setMessage] = useState("");
     const [sending, setSending] = useState(false);
     const [spotlightId, setSpotlightId] = useState(null);
     const [copiedId, setCopiedId] = useState(null);
+    const [pendingRefs, setPendingRefs] = useState([]);
     const messagesEndRef = useRef(null);
     const chatContainerRef = useRef(null);
 
+    // Download attachments once their history_fetch reply has arrived
+    useEffect(() => {
+        if (pendingRefs.length === 0) return;
+        const arrived = messages.filter(msg => msg.file_ref && msg.file_data && pendingRefs.includes(msg.file_ref));
+        if (arrived.length === 0) return;
+        arrived.forEach(msg => downloadAttachment(msg.file_data, msg.file_name));
+        setPendingRefs(refs => refs.filter(ref => !arrived.some(msg => msg.file_ref === ref)));
+    }, [messages, pendingRefs]);
+
+    const handleOpenAttachment = (msg) => {
+        if (msg.file_data) {
+            downloadAttachment(msg.file_data, msg.file_name);
+        } else if (msg.file_ref && fetchAttachment?.(msg.file_ref)) {
+            setPendingRefs(refs => (refs.includes(msg.file_ref) ? refs : [...refs, msg.file_ref]));
+        }
+    };
+
     const scrollToBottom = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
     };
@@ -105,6 +136,19 @@ export default function TextTransferSection({ messages = [], sendText }) {
                                             <p className={`text-sm sm:text-base break-words whitespace-pre-wrap select-text cursor-text ${isReceived ? 'msg-received-text' : 'msg-sent-text'}`}>
                                                 {content}
                                             </p>
+                                            {msg.file_name && (
+                                                <button
+                                                    onClick={() => handleOpenAttachment(msg)}
+                                                    className="flex items-center gap-1.5 mt-1 text-sm underline"
+                                                    title="Download attachment"
+                                                >
+                                                    {pendingRefs.includes(msg.file_ref)
+                                                        ? <Loader2 className="w-3.5 h-3.5 animate-spin" />
+                                                        : <Paperclip className="w-3.5 h-3.5" />
+                                                    }
+                                                    {msg.file_name}
+                                                </button>
+                                            )}
                                         </div>
                                         <button
                                             onClick={() => handleCopy(content, msgId)}
@@ -71,6 +71,15 @@ export const useWebSocket = (roomCode) => {
                                 break;
 
                             case 'copy':
+                                if (data.file_ref) {
+                                    // Reply to history_fetch: fill in the history entry
+                                    setMessages(prev => prev.map(msg => (
+                                        msg.file_ref === data.file_ref
+                                            ? { ...msg, file_data: data.file_data }
+                                            : msg
+                                    )));
+                                    break;
+                                }
                                 setMessages(prev => [...prev, {
                                     type: 'copy',
                                     copy_text: data.copy_text,
@@ -81,6 +90,21 @@ export const useWebSocket = (roomCode) => {
                                 }]);
                                 break;
 
+                            case 'history':
+                                setMessages(prev => [
+                                    ...(data.messages || []).map(msg => ({
+                                        type: 'copy',
+                                        copy_text: msg.copy_text,
+                                        file_data: msg.file_data,
+                                        file_name: msg.file_name,
+                                        file_ref: msg.file_ref,
+                                        f_user: msg.f_user,
+                                        timestamp: new Date(msg.timestamp * 1000).toISOString()
+                                    })),
+                                    ...prev
+                                ]);
+                                break;
+
                             case 'progress':
                                 //console.log('Upload progress:', data);
                                 break;
@@ -197,6 +221,16 @@ export const useWebSocket = (roomCode) => {
         return false;
     };
 
+    // Large attachments arrive in history as a file_ref only; their data is
+    // fetched when the user opens them
+    const fetchAttachment = useCallback((ref) => {
+        if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+            wsRef.current.send(JSON.stringify({ type: 'history_fetch', ref }));
+            return true;
+        }
+        return false;
+    }, []);
+
     const setFileTransferCallbacks = useCallback((callbacks) => {
         fileTransferCallbacksRef.current = { ...fileTransferCallbacksRef.current, ...callbacks };
     }, []);
@@ -207,6 +241,7 @@ export const useWebSocket = (roomCode) => {
         messages,
         sendText,
         sendFile,
+        fetchAttachment,
         setFileTransferCallbacks,
         wsRef,
         isAuthenticated
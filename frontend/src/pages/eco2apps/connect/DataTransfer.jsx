@@ -40,6 +40,7 @@ export default function DataTransfer() {
         messages,
         sendText,
         sendFile,
+        fetchAttachment,
         wsRef,
         setFileTransferCallbacks,
         isAuthenticated
@@ -278,7 +279,7 @@ export default function DataTransfer() {
 
                 {/* Text Transfer Section */}
                 <div className={`${activeTransferTab === 'text' ? 'flex' : 'hidden'} lg:flex glass-card rounded-2xl p-4 overflow-hidden flex-col h-full lg:h-auto`} data-tour="text-transfer">
-                    <TextTransferSection messages={messages} sendText={sendText} />
+                    <TextTransferSection messages={messages} sendText={sendText} fetchAttachment={fetchAttachment} />
                 </div>
 
                 {/* File Transfer Section */}
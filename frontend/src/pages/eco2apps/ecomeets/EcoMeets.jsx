@@ -2,7 +2,7 @@ import { useRef, useState, useEffect, useCallback } from "react";
 import { useAuth } from "../../../context/AuthContext";
 import {
     Mic, MicOff, Video, VideoOff,
-    PhoneOff, PhoneCall, Loader,
+    PhoneOff, PhoneCall, Loader, SkipForward,
 } from "lucide-react";
 
 const SOCKET_URL = `${import.meta.env.VITE_API_SOCKET}/ws/ecomeets/random/`;
@@ -19,7 +19,46 @@ let myId = null;
 let myRole = null;
 let partnerId = null;
 
+// ICE candidates gathered within ICE_BATCH_MS go out as one message once
+// the server has granted the "ice_batch" capability
+const ICE_BATCH_MS = 10;
+let batchIce = false;
+let iceBuffer = [];
+let iceTimer = null;
+let heartbeatTimer = null;
+let nextReserved = false;
+
+// Optional matching hints; the server widens them if nobody matches
+function matchCriteria() {
+    return {
+        language: (navigator.language || "").split("-")[0],
+        region: (Intl.DateTimeFormat().resolvedOptions().timeZone || "").split("/")[0],
+    };
+}
+
+function flushIce() {
+    clearTimeout(iceTimer);
+    iceTimer = null;
+    if (iceBuffer.length && ws?.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify({ typeof: "ice_candidates", candidates: iceBuffer }));
+    }
+    iceBuffer = [];
+}
+
+function sendIce(candidate) {
+    if (ws?.readyState !== WebSocket.OPEN) return;
+    if (!batchIce) {
+        ws.send(JSON.stringify({ typeof: "ice_candidate", candidate }));
+        return;
+    }
+    iceBuffer.push(candidate);
+    if (!iceTimer) iceTimer = setTimeout(flushIce, ICE_BATCH_MS);
+}
+
 function closePC() {
+    clearTimeout(iceTimer);
+    iceTimer = null;
+    iceBuffer = [];
     if (!pc) return;
     pc.onicecandidate = pc.ontrack = pc.onconnectionstatechange = null;
     pc.close();
@@ -59,12 +98,7 @@ const EcoMeets = () => {
         }
 
         conn.onicecandidate = (e) => {
-            if (e.candidate && ws?.readyState === WebSocket.OPEN) {
-                ws.send(JSON.stringify({
-                    typeof: "ice_candidate",
-                    candidate: e.candidate,
-                }));
-            }
+            if (e.candidate) sendIce(e.candidate);
         };
 
         conn.ontrack = (e) => showRemote(e.streams[0]);
@@ -131,23 +165,36 @@ const EcoMeets = () => {
     }, []);
 
     // End call
-    const handleEndCall = useCallback((notify = true) => {
+    // With next, the server pairs us with the partner it held for us (or
+    // starts a search) in the same exchange
+    const handleEndCall = useCallback((notify = true, next = false) => {
         closePC();
         if (remoteRef.current) remoteRef.current.srcObject = null;
 
+        next = next && notify && ws?.readyState === WebSocket.OPEN;
         if (notify && ws?.readyState === WebSocket.OPEN) {
-            ws.send(JSON.stringify({ typeof: "endcall" }));
+            ws.send(JSON.stringify(next
+                ? { typeof: "endcall", next: true, criteria: matchCriteria() }
+                : { typeof: "endcall" }));
         }
 
         myRole = null;
         partnerId = null;
+        nextReserved = false;
         setInCall(false);
-        setSearching(false);
+        setSearching(next);
         setRemoteAudioMuted(false);
         setRemoteVideoOff(false);
-        setStatus("Ready");
+        setStatus(next ? "Finding next partner…" : "Ready");
     }, []);
 
+    // Ask the server to hold a partner as soon as "Next" looks likely
+    const reserveNext = () => {
+        if (nextReserved || ws?.readyState !== WebSocket.OPEN) return;
+        nextReserved = true;
+        ws.send(JSON.stringify({ typeof: "reserve_next", criteria: matchCriteria() }));
+    };
+
     // WS message handler
     const setupWS = useCallback((socket) => {
         socket.onmessage = (e) => {
@@ -156,6 +203,15 @@ const EcoMeets = () => {
             switch (d.typeof) {
                 case "welcome":
                     myId = d.userId;
+                    batchIce = (d.capabilities || []).includes("ice_batch");
+                    clearInterval(heartbeatTimer);
+                    if (d.heartbeatInterval) {
+                        heartbeatTimer = setInterval(() => {
+                            if (socket.readyState === WebSocket.OPEN) {
+                                socket.send(JSON.stringify({ typeof: "heartbeat" }));
+                            }
+                        }, d.heartbeatInterval * 1000);
+                    }
                     //console.log("My ID:", myId, "Name:", d.username);
                     setStatus("Ready");
                     break;
@@ -196,6 +252,10 @@ const EcoMeets = () => {
                     handleIce(d.candidate);
                     break;
 
+                case "ice_candidates":
+                    d.candidates.forEach(handleIce);
+                    break;
+
                 case "media_state":
                     setRemoteAudioMuted(d.audioMuted);
                     setRemoteVideoOff(d.videoOff);
@@ -253,13 +313,14 @@ const EcoMeets = () => {
                 //console.log("WS connected, sending auth…");
 
                 if (token) {
-                    socket.send(JSON.stringify({ type: "auth", token }));
+                    socket.send(JSON.stringify({ type: "auth", token, capabilities: ["ice_batch", "heartbeat"] }));
                 } else {
-                    socket.send(JSON.stringify({ type: "auth_guest" }));
+                    socket.send(JSON.stringify({ type: "auth_guest", capabilities: ["ice_batch", "heartbeat"] }));
                 }
             };
             socket.onerror = () => setStatus("Connection Error");
             socket.onclose = () => {
+                clearInterval(heartbeatTimer);
                 //console.log("WS closed")
             };
         })();
@@ -276,7 +337,7 @@ const EcoMeets = () => {
     // Controls 
     const findMatch = () => {
         if (!myId || !ws || ws.readyState !== WebSocket.OPEN) return;
-        ws.send(JSON.stringify({ typeof: "find_match" }));
+        ws.send(JSON.stringify({ typeof: "find_match", criteria: matchCriteria() }));
     };
 
     const cancelSearch = () => {
@@ -408,6 +469,17 @@ const EcoMeets = () => {
                             </button>
                         )}
 
+                        {inCall && (
+                            <button
+                                onMouseEnter={reserveNext}
+                                onFocus={reserveNext}
+                                onClick={() => handleEndCall(true, true)}
+                                className="bg-blue-600 hover:bg-blue-700 text-white px-2 py-2 rounded-full font-bold shadow-lg transition transform hover:scale-105 flex items-center gap-2"
+                            >
+                                <SkipForward className="w-5 h-5" />
+                            </button>
+                        )}
+
                         <div className="w-px h-8 bg-[var(--border-highlight)] mx-2" />
 
                         <button